@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_user_is_active_alter_user_is_staff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_upload',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
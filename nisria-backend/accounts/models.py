@@ -49,6 +49,10 @@ class User(AbstractUser):
         'profile_picture',  # Optional: name of the folder in Cloudinary
         folder='profile_pics', # Explicitly set the folder in Cloudinary
         null=True, blank=True)
+    # Upload state of `profile_picture` while it is processed in the background (core.pictures).
+    profile_picture_upload = models.JSONField(default=dict, blank=True, editable=False)
+    # {variant: {url, width, height, public_id}} of the stored picture sizes (core.pictures.PICTURE_VARIANTS).
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     location = models.CharField(max_length=100, blank=True, null=True)
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
@@ -2,17 +2,23 @@ from rest_framework import serializers
 from .models import User
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from core.pictures import AsyncPictureUploadMixin, PictureUploadStateField
+
+class UserSerializer(AsyncPictureUploadMixin, serializers.ModelSerializer):
+    profile_picture_upload = PictureUploadStateField()
+    profile_picture_variants = serializers.ReadOnlyField()
+    picture_fields = ('profile_picture',)
 
-class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'email', 'full_name', 'phone_number', 'role', 'profile_picture', 'location', 'date_created', 'date_updated']
+        fields = ['id', 'email', 'full_name', 'phone_number', 'role', 'profile_picture', 'profile_picture_upload', 'profile_picture_variants', 'location', 'date_created', 'date_updated']
         read_only_fields = ['id', 'date_created', 'date_updated', 'role']
 
 
-class RegisterUserSerializer(serializers.ModelSerializer):
+class RegisterUserSerializer(AsyncPictureUploadMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     profile_picture = serializers.ImageField(required=False, allow_null=True)
+    picture_fields = ('profile_picture',)
 
     class Meta:
         model = User
@@ -31,7 +37,9 @@ class RegisterUserSerializer(serializers.ModelSerializer):
             password=validated_data['password'],
             role=validated_data.get('role'), 
             location=validated_data.get('location'),
-            profile_picture=validated_data.get('profile_picture') # Add this
+            profile_picture=validated_data.get('profile_picture'), # Add this
+            # Set instead of profile_picture when a picture was posted (uploaded in the background)
+            profile_picture_upload=validated_data.get('profile_picture_upload', {})
         )
         return user
 
@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import DailyMetric
 
-# Register your models here.
+@admin.register(DailyMetric)
+class DailyMetricAdmin(admin.ModelAdmin):
+    list_display = ('metric', 'date', 'dimension', 'count', 'total')
+    list_filter = ('metric',)
+    date_hierarchy = 'date'
+    ordering = ('metric', '-date')
@@ -0,0 +1,33 @@
+from django.db.models import Count
+
+
+def grouped_counts(queryset, fields, **aggregates):
+    """
+    Runs a single GROUP BY over every breakdown column of a table.
+
+    Each returned row is one bucket (a distinct combination of `fields`) with
+    its row count plus any extra aggregates, e.g. Count('pk', filter=Q(...)).
+    Totals and per-field breakdowns are then folded from these rows in Python,
+    so a whole dashboard section costs one query per table.
+    """
+    return list(
+        queryset.order_by().values(*fields).annotate(count=Count('pk'), **aggregates)
+    )
+
+
+def total(rows, key='count'):
+    """ Sums an aggregate column across bucket rows. """
+    return sum(row[key] or 0 for row in rows)
+
+
+def breakdown(rows, field, key='count'):
+    """
+    Folds bucket rows into [{field: value, 'count': n}, ...] ordered by value,
+    matching the shape of values(field).annotate(count=Count('id')).order_by(field).
+    NULL values sort last, as they do in PostgreSQL.
+    """
+    counts = {}
+    for row in rows:
+        counts[row[field]] = counts.get(row[field], 0) + (row[key] or 0)
+    ordered = sorted(counts, key=lambda value: (value is None, value if value is not None else ''))
+    return [{field: value, 'count': counts[value]} for value in ordered]
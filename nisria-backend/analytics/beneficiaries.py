@@ -0,0 +1,117 @@
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.utils import timezone
+
+from divisions.models import (
+    EducationProgramDetail, MicroFundProgramDetail, RescueProgramDetail,
+    VocationalTrainingProgramTraineeDetail
+)
+
+AGE_BANDS = [
+    ('0-5', 0, 5),
+    ('6-12', 6, 12),
+    ('13-17', 13, 17),
+    ('18-24', 18, 24),
+    ('25-35', 25, 35),
+    ('36-50', 36, 50),
+    ('51+', 51, None),
+]
+UNKNOWN = 'unknown'
+STATUSES = ['active', 'exited']
+
+
+def _age_band():
+    whens = []
+    for label, low, high in AGE_BANDS:
+        condition = Q(age__gte=low) if high is None else Q(age__gte=low, age__lte=high)
+        whens.append(When(condition, then=Value(label)))
+    return Case(*whens, default=Value(UNKNOWN), output_field=CharField())
+
+
+def _status(exited):
+    return Case(When(exited, then=Value('exited')), default=Value('active'), output_field=CharField())
+
+
+def _beneficiary_sources():
+    """
+    (program label, model, path to the division name, exited condition) for
+    every beneficiary table. Evaluated per call since "exited" can depend on
+    today's date.
+    """
+    today = timezone.now().date()
+    return [
+        ('education', EducationProgramDetail, 'program__division__name',
+         Q(graduation_year__lt=today.year)),
+        ('microfund', MicroFundProgramDetail, 'program__division__name',
+         Q(is_active=False)),
+        ('rescue', RescueProgramDetail, 'program__division__name',
+         Q(date_of_exit__isnull=False)),
+        # Trainees reach their program through the trainer.
+        ('vocational', VocationalTrainingProgramTraineeDetail, 'trainer__program__division__name',
+         Q(end_date__lt=today)),
+    ]
+
+
+def beneficiary_statistics(division=None, start=None, end=None):
+    """
+    Counts beneficiaries across all programs in a single UNION ALL query.
+
+    Each branch groups one beneficiary table by (program, gender, age band,
+    active/exited status); the combined bucket rows are then folded into
+    totals and breakdowns overall and per program. `division` (a division
+    name) and the `start`/`end` dates (on created_at, inclusive) apply to
+    every branch.
+    """
+    branches = []
+    for program, model, division_path, exited in _beneficiary_sources():
+        queryset = model.objects.order_by()
+        if division:
+            queryset = queryset.filter(**{division_path: division})
+        if start:
+            queryset = queryset.filter(created_at__date__gte=start)
+        if end:
+            queryset = queryset.filter(created_at__date__lte=end)
+        branches.append(
+            queryset.annotate(
+                program_name=Value(program, output_field=CharField()),
+                age_band=_age_band(),
+                status=_status(exited),
+            ).values('program_name', 'gender', 'age_band', 'status').annotate(count=Count('pk'))
+        )
+    rows = branches[0].union(*branches[1:], all=True)
+
+    programs = [program for program, *_ in _beneficiary_sources()]
+    per_program = {program: _empty_statistics() for program in programs}
+    overall = _empty_statistics()
+    for row in rows:
+        for statistics in (overall, per_program[row['program_name']]):
+            statistics['total'] += row['count']
+            _add(statistics['by_gender'], row['gender'] or UNKNOWN, row['count'])
+            _add(statistics['by_age_band'], row['age_band'], row['count'])
+            _add(statistics['by_status'], row['status'], row['count'])
+
+    result = _as_lists(overall)
+    result['by_program'] = [{'program': program, 'count': per_program[program]['total']} for program in programs]
+    result['programs'] = {program: _as_lists(statistics) for program, statistics in per_program.items()}
+    return result
+
+
+def _empty_statistics():
+    return {
+        'total': 0,
+        'by_gender': {},
+        'by_age_band': {label: 0 for label, *_ in AGE_BANDS + [(UNKNOWN,)]},
+        'by_status': {status: 0 for status in STATUSES},
+    }
+
+
+def _add(counts, key, count):
+    counts[key] = counts.get(key, 0) + count
+
+
+def _as_lists(statistics):
+    return {
+        'total': statistics['total'],
+        'by_gender': [{'gender': gender, 'count': count} for gender, count in sorted(statistics['by_gender'].items())],
+        'by_age_band': [{'age_band': band, 'count': count} for band, count in statistics['by_age_band'].items()],
+        'by_status': [{'status': status, 'count': count} for status, count in statistics['by_status'].items()],
+    }
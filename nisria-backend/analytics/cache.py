@@ -0,0 +1,63 @@
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import get_model_versions
+from core.conditional import conditional_get
+from core.singleflight import registered_names, single_flight
+
+
+def analytics_cache_key(endpoint, request, models):
+    """
+    Builds the cache key for one analytics response.
+
+    The key covers the endpoint, the (order-independent) query parameters,
+    today's date (for "overdue"-style figures that change without a write) and
+    the current version of every model the endpoint reads. A write to any of
+    those models bumps its version, so the next request misses and recomputes.
+    """
+    params = sorted((key, tuple(sorted(values))) for key, values in request.query_params.lists())
+    versions = get_model_versions(*models)
+    fingerprint = repr((params, timezone.localdate().isoformat(), versions))
+    digest = hashlib.md5(fingerprint.encode('utf-8')).hexdigest()
+    return f"analytics:{endpoint}:{digest}"
+
+
+def cached_analytics(*models):
+    """
+    Caches the data of a successful analytics response.
+
+    `models` are the source models the view aggregates over; their version
+    stamps are bumped by core.signals whenever one of their rows is
+    saved, deleted, soft-deleted or restored. Cache misses are single-flight:
+    concurrent identical requests wait for one computation and share it, and
+    unchanged polls get 304 Not Modified from the same version stamps.
+    Goes under @api_view and @permission_classes so only authenticated
+    requests reach the cache.
+    """
+    def decorator(view_func):
+        flight_name = f"analytics.{view_func.__name__}"
+        registered_names.add(flight_name)
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key = analytics_cache_key(view_func.__name__, request, models)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            def compute():
+                response = view_func(request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    cache.set(key, response.data, timeout=settings.ANALYTICS_CACHE_TIMEOUT)
+                return response.data, response.status_code
+
+            data, status_code = single_flight(flight_name, key, compute)
+            return Response(data, status=status_code)
+        return conditional_get(*models)(wrapper)
+    return decorator
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from analytics.rollups import ROLLUPS, rebuild
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the DailyMetric analytics rollups from the source tables. "
+        "Use it to backfill after deploying new rollups or to repair drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--metric',
+            action='append',
+            dest='metrics',
+            choices=[rollup.metric for rollup in ROLLUPS],
+            help="Only rebuild this metric (can be repeated). Defaults to all metrics.",
+        )
+
+    def handle(self, *args, **options):
+        metrics = options['metrics']
+        rollups = [rollup for rollup in ROLLUPS if not metrics or rollup.metric in metrics]
+        if not rollups:
+            raise CommandError("No rollups to rebuild.")
+
+        bucket_count = rebuild(rollups)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(rollups)} metric(s) into {bucket_count} daily buckets."
+        ))
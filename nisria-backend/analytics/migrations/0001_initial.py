@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('metric', models.CharField(max_length=50)),
+                ('dimension', models.CharField(default='{}', max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'verbose_name': 'Daily Metric',
+                'verbose_name_plural': 'Daily Metrics',
+                'ordering': ['metric', 'date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailymetric',
+            constraint=models.UniqueConstraint(fields=('metric', 'date', 'dimension'), name='unique_daily_metric_bucket'),
+        ),
+    ]
@@ -1,3 +1,45 @@
+import json
+
 from django.db import models
 
-# Create your models here.
+
+class DailyMetric(models.Model):
+    """
+    One pre-aggregated analytics bucket: the number of live rows (and the sum
+    of an optional amount column) for a metric on a given day and dimension
+    combination, e.g. grants created on 2025-03-04 with status 'approved' and
+    organization type 'normal'.
+
+    Rows are kept current by analytics.signals as source rows are written and
+    can be rebuilt from scratch with `manage.py rebuild_daily_metrics`.
+    """
+    date = models.DateField()
+    metric = models.CharField(max_length=50)
+    # Canonical JSON of the dimension values (sorted keys), so each
+    # combination has a single, index-friendly string representation.
+    dimension = models.CharField(max_length=255, default='{}')
+    count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'date', 'dimension'], name='unique_daily_metric_bucket'),
+        ]
+        ordering = ['metric', 'date']
+        verbose_name = "Daily Metric"
+        verbose_name_plural = "Daily Metrics"
+
+    def __str__(self):
+        return f"{self.metric} {self.date} {self.dimension}: {self.count}"
+
+    @staticmethod
+    def encode_dimensions(values):
+        return json.dumps(values, sort_keys=True, default=str)
+
+    @staticmethod
+    def decode_dimensions(dimension):
+        return json.loads(dimension)
+
+    @property
+    def dimensions(self):
+        return self.decode_dimensions(self.dimension)
@@ -0,0 +1,229 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Count, DateTimeField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.cache import bump_model_version
+from documents.models import Document
+from divisions.models import (
+    EducationProgramDetail, MicroFundProgramDetail, RescueProgramDetail,
+    VocationalTrainingProgramTrainerDetail, VocationalTrainingProgramTraineeDetail
+)
+from task_manager.models import Task
+
+from .models import DailyMetric
+
+try:
+    from grants.models import Grant
+except ImportError:
+    Grant = None
+
+
+class Rollup:
+    """
+    Declares how one source model is pre-aggregated into DailyMetric rows.
+
+    - metric: DailyMetric.metric value the buckets are stored under.
+    - date_field: the model field that decides a row's bucket date.
+    - dimensions: fields grouped on (foreign keys are stored by id).
+    - conditions: boolean dimensions, {name: (Q, predicate)} where the Q is
+      used for rebuilds in SQL and predicate(row) for incremental updates.
+    - sum_field: optional numeric field accumulated into DailyMetric.total.
+
+    Only live rows are counted: soft-deleted rows leave their buckets and
+    re-enter them on restore.
+    """
+
+    def __init__(self, metric, model, date_field, dimensions=(), conditions=None, sum_field=None):
+        self.metric = metric
+        self.model = model
+        self.date_field = date_field
+        self.dimensions = list(dimensions)
+        self.conditions = conditions or {}
+        self.sum_field = sum_field
+        self.soft_deletable = hasattr(model, 'all_objects')
+
+    @property
+    def manager(self):
+        return self.model.all_objects if self.soft_deletable else self.model._default_manager
+
+    @property
+    def source_fields(self):
+        """ Columns needed to place a row in its bucket. """
+        fields = [self.date_field, *self.dimensions]
+        for condition, _ in self.conditions.values():
+            fields.extend(_condition_fields(condition))
+        if self.sum_field:
+            fields.append(self.sum_field)
+        if self.soft_deletable:
+            fields.append('is_deleted')
+        return list(dict.fromkeys(fields))
+
+    def row_from_instance(self, instance):
+        return {
+            name: getattr(instance, self.model._meta.get_field(name).attname)
+            for name in self.source_fields
+        }
+
+    def fetch_rows(self, pks):
+        return list(self.manager.filter(pk__in=pks).values(*self.source_fields))
+
+    def bucket(self, row):
+        """ Returns (date, dimension) for a source row, or None if it is not counted. """
+        if self.soft_deletable and row['is_deleted']:
+            return None
+        date = row[self.date_field]
+        if date is None:
+            return None
+        if isinstance(date, datetime.datetime):
+            date = timezone.localtime(date).date() if timezone.is_aware(date) else date.date()
+        values = {name: row[name] for name in self.dimensions}
+        for name, (_, predicate) in self.conditions.items():
+            values[name] = bool(predicate(row))
+        return date, DailyMetric.encode_dimensions(values)
+
+    def amount(self, row):
+        if not self.sum_field:
+            return Decimal('0')
+        return Decimal(row[self.sum_field] or 0)
+
+    def aggregate(self):
+        """ Computes every bucket of this rollup from the source table in one GROUP BY. """
+        date_expr = F(self.date_field)
+        if isinstance(self.model._meta.get_field(self.date_field), DateTimeField):
+            date_expr = TruncDate(self.date_field)
+        queryset = self.model._default_manager.order_by().filter(**{f"{self.date_field}__isnull": False})
+        annotations = {'bucket_date': date_expr}
+        for name, (condition, _) in self.conditions.items():
+            annotations[f"condition_{name}"] = ExpressionWrapper(condition, output_field=BooleanField())
+        aggregates = {'bucket_count': Count('pk')}
+        if self.sum_field:
+            aggregates['bucket_total'] = Sum(self.sum_field)
+        rows = queryset.annotate(**annotations).values(
+            'bucket_date', *self.dimensions, *(f"condition_{name}" for name in self.conditions)
+        ).annotate(**aggregates)
+        for row in rows:
+            values = {name: row[name] for name in self.dimensions}
+            for name in self.conditions:
+                values[name] = bool(row[f"condition_{name}"])
+            yield DailyMetric(
+                date=row['bucket_date'],
+                metric=self.metric,
+                dimension=DailyMetric.encode_dimensions(values),
+                count=row['bucket_count'],
+                total=row.get('bucket_total') or 0,
+            )
+
+
+def _condition_fields(condition):
+    """ Field names referenced by a Q object, e.g. Q(date_of_exit__isnull=False) -> ['date_of_exit']. """
+    fields = []
+    for child in condition.children:
+        if isinstance(child, Q):
+            fields.extend(_condition_fields(child))
+        else:
+            fields.append(child[0].split('__')[0])
+    return fields
+
+
+ROLLUPS = [
+    rollup for rollup in (
+        Rollup('grants', Grant, 'date_created', ['status', 'organization_type'], sum_field='amount_value') if Grant else None,
+        Rollup('documents', Document, 'date_uploaded', ['document_type', 'document_format', 'division']),
+        Rollup('tasks', Task, 'created_at', ['status', 'priority', 'is_grant_follow_up_task', 'assigned_to']),
+        # Tasks bucketed by due date, so "overdue" is a range read over past buckets.
+        Rollup('tasks_due', Task, 'due_date', ['status']),
+        Rollup('education', EducationProgramDetail, 'created_at', ['gender', 'grade']),
+        Rollup('microfund', MicroFundProgramDetail, 'created_at', ['gender', 'is_active']),
+        Rollup('rescue', RescueProgramDetail, 'created_at', ['gender'], conditions={
+            'exited': (Q(date_of_exit__isnull=False), lambda row: row['date_of_exit'] is not None),
+        }),
+        Rollup('vocational_trainers', VocationalTrainingProgramTrainerDetail, 'created_at', ['gender']),
+        Rollup('vocational_trainees', VocationalTrainingProgramTraineeDetail, 'created_at', ['gender', 'post_training_status']),
+    ) if rollup is not None
+]
+
+ROLLUPS_BY_MODEL = defaultdict(list)
+for _rollup in ROLLUPS:
+    ROLLUPS_BY_MODEL[_rollup.model].append(_rollup)
+ROLLUP_SOURCE_MODELS = list(ROLLUPS_BY_MODEL)
+
+
+def apply_deltas(deltas):
+    """
+    Adds {(metric, date, dimension): [count, total]} deltas to DailyMetric.
+
+    Each bucket is a single UPDATE ... SET count = count + n; the row is only
+    inserted the first time a bucket is seen. Runs inside the caller's
+    transaction, so rollups commit or roll back together with the source write.
+    """
+    for (metric, date, dimension), (count, amount) in deltas.items():
+        if not count and not amount:
+            continue
+        bucket = DailyMetric.objects.filter(metric=metric, date=date, dimension=dimension)
+        if bucket.update(count=F('count') + count, total=F('total') + amount):
+            continue
+        try:
+            with transaction.atomic():
+                DailyMetric.objects.create(metric=metric, date=date, dimension=dimension, count=count, total=amount)
+        except IntegrityError:
+            # Another writer created the bucket first.
+            bucket.update(count=F('count') + count, total=F('total') + amount)
+
+
+def collect_deltas(rollup, rows, sign, deltas=None):
+    """ Adds the contribution of `rows` (times `sign`) to a {bucket: [count, total]} mapping. """
+    deltas = {} if deltas is None else deltas
+    for row in rows:
+        bucket = rollup.bucket(row)
+        if bucket is None:
+            continue
+        delta = deltas.setdefault((rollup.metric, *bucket), [0, Decimal('0')])
+        delta[0] += sign
+        delta[1] += sign * rollup.amount(row)
+    return deltas
+
+
+def rebuild(rollups=None):
+    """ Replaces the DailyMetric rows of the given rollups with fresh aggregates. Returns the bucket count. """
+    rollups = ROLLUPS if rollups is None else rollups
+    created = 0
+    with transaction.atomic():
+        DailyMetric.objects.filter(metric__in=[rollup.metric for rollup in rollups]).delete()
+        for rollup in rollups:
+            created += len(DailyMetric.objects.bulk_create(rollup.aggregate(), batch_size=1000))
+            # Cached analytics built from the old buckets must not outlive them.
+            bump_model_version(rollup.model)
+    return created
+
+
+def read_metrics(*metrics, before=None):
+    """
+    Reads the buckets of several metrics in one query, collapsed over dates.
+
+    Returns {metric: [{**dimensions, 'count': n, 'total': amount}, ...]} with
+    empty buckets dropped, ready for aggregates.total()/breakdown(). `before`
+    maps a metric to a date its buckets must fall before (e.g. overdue tasks).
+    """
+    before = before or {}
+    query = Q(metric__in=[metric for metric in metrics if metric not in before])
+    for metric, date in before.items():
+        query |= Q(metric=metric, date__lt=date)
+    rows = DailyMetric.objects.filter(query).values('metric', 'dimension').annotate(
+        bucket_count=Sum('count'), bucket_total=Sum('total'),
+    ).order_by()
+
+    result = {metric: [] for metric in metrics}
+    for row in rows:
+        if not row['bucket_count']:
+            continue
+        result[row['metric']].append({
+            **DailyMetric.decode_dimensions(row['dimension']),
+            'count': row['bucket_count'],
+            'total': row['bucket_total'] or Decimal('0'),
+        })
+    return result
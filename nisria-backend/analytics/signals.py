@@ -0,0 +1,99 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from core.signals import bulk_created, soft_deleted, restored, pre_bulk_update, post_bulk_update
+
+from .rollups import ROLLUPS_BY_MODEL, apply_deltas, collect_deltas
+
+# Cache invalidation for analytics is handled by the model version stamps
+# that core.signals bumps on every write (see analytics.cache).
+
+
+# --- DailyMetric rollups ---
+# Source writes adjust their buckets by delta inside the writing transaction:
+# an update moves a row out of its previous bucket and into its new one.
+
+# Marks a save whose update_fields cannot move the row between buckets.
+_UNCHANGED = object()
+
+
+def remember_previous_buckets(sender, instance, raw=False, update_fields=None, **kwargs):
+    """ pre_save: loads the stored row so post_save can take it out of its old bucket. """
+    instance._rollup_previous = None
+    if instance._state.adding or raw:
+        return
+    fields = {name for rollup in ROLLUPS_BY_MODEL[sender] for name in rollup.source_fields}
+    if update_fields is not None and not fields.intersection(update_fields):
+        instance._rollup_previous = _UNCHANGED
+        return
+    instance._rollup_previous = sender._base_manager.filter(pk=instance.pk).values(*fields).first()
+
+
+def update_rollups_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    instance._rollup_previous = None
+    if previous is _UNCHANGED:
+        return
+    deltas = {}
+    for rollup in ROLLUPS_BY_MODEL[sender]:
+        if previous is not None:
+            deltas = collect_deltas(rollup, [previous], -1, deltas)
+        deltas = collect_deltas(rollup, [rollup.row_from_instance(instance)], 1, deltas)
+    apply_deltas(deltas)
+
+
+def update_rollups_on_delete(sender, instance, **kwargs):
+    deltas = {}
+    for rollup in ROLLUPS_BY_MODEL[sender]:
+        deltas = collect_deltas(rollup, [rollup.row_from_instance(instance)], -1, deltas)
+    apply_deltas(deltas)
+
+
+def _update_rollups_in_bulk(sender, pks, sign):
+    deltas = {}
+    for rollup in ROLLUPS_BY_MODEL[sender]:
+        # The rows already carry their new is_deleted flag; count them as
+        # live to find the buckets they leave (sign -1) or rejoin (sign +1).
+        rows = [dict(row, is_deleted=False) for row in rollup.fetch_rows(pks)]
+        deltas = collect_deltas(rollup, rows, sign, deltas)
+    apply_deltas(deltas)
+
+
+def update_rollups_on_soft_delete(sender, pks, **kwargs):
+    _update_rollups_in_bulk(sender, pks, -1)
+
+
+def update_rollups_on_restore(sender, pks, **kwargs):
+    _update_rollups_in_bulk(sender, pks, 1)
+
+
+def update_rollups_on_bulk_create(sender, pks, **kwargs):
+    _update_rollups_in_bulk(sender, pks, 1)
+
+
+def _shift_rollups(sender, pks, fields, sign):
+    """ Queryset updates: rows leave their buckets before the UPDATE and rejoin after it. """
+    deltas = {}
+    for rollup in ROLLUPS_BY_MODEL[sender]:
+        if not set(rollup.source_fields).intersection(fields):
+            continue
+        deltas = collect_deltas(rollup, rollup.fetch_rows(pks), sign, deltas)
+    apply_deltas(deltas)
+
+
+def update_rollups_before_bulk_update(sender, pks, fields, **kwargs):
+    _shift_rollups(sender, pks, fields, -1)
+
+
+def update_rollups_after_bulk_update(sender, pks, fields, **kwargs):
+    _shift_rollups(sender, pks, fields, 1)
+
+
+for model in ROLLUPS_BY_MODEL:
+    pre_save.connect(remember_previous_buckets, sender=model)
+    post_save.connect(update_rollups_on_save, sender=model)
+    post_delete.connect(update_rollups_on_delete, sender=model)
+    soft_deleted.connect(update_rollups_on_soft_delete, sender=model)
+    restored.connect(update_rollups_on_restore, sender=model)
+    bulk_created.connect(update_rollups_on_bulk_create, sender=model)
+    pre_bulk_update.connect(update_rollups_before_bulk_update, sender=model)
+    post_bulk_update.connect(update_rollups_after_bulk_update, sender=model)
@@ -0,0 +1,17 @@
+from celery import shared_task
+from django.core.management import call_command
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def rebuild_daily_metrics_task():
+    """
+    Celery task to run the rebuild_daily_metrics management command.
+    Rollups are maintained incrementally; the nightly rebuild only repairs
+    drift from writes that bypass signals (e.g. raw SQL or SET_NULL cascades).
+    """
+    logger.info(f"Celery task 'rebuild_daily_metrics_task' initiated at {timezone.now()}")
+    call_command('rebuild_daily_metrics')
+    logger.info(f"Celery task 'rebuild_daily_metrics_task' completed at {timezone.now()}")
@@ -1,3 +1,413 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from documents.models import Document
+from divisions.models import (
+    Division, Program, EducationProgramDetail, RescueProgramDetail,
+    VocationalTrainingProgramTrainerDetail, VocationalTrainingProgramTraineeDetail
+)
+from email_templates.models import EmailTemplates
+from grants.models import Grant
+from task_manager.models import Task
+
+from .models import DailyMetric
+from .timeseries import bucket_count
+from .rollups import rebuild
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DashboardAnalyticsTests(TestCase):
+    # Users, bank statement requests, divisions, programs and email templates
+    # are grouped live; everything else is one DailyMetric read, plus one
+    # lookup of the names behind tasks_per_user.
+    DASHBOARD_QUERIES = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        User.objects.create_user(
+            email='officer@nisria.co', full_name='Grant Officer', phone_number='0700000001',
+            password='pass', role='grant_officer', is_active=False
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        maisha = Division.objects.create(name='maisha', description='Maisha')
+        education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+        Program.objects.create(
+            name='microfund', description='Microfund', division=nisria,
+            monthly_budget=Decimal('50.00'), annual_budget=Decimal('600.00')
+        )
+        Program.objects.create(
+            name='rescue', description='Rescue', division=nisria,
+            monthly_budget=Decimal('10.00'), annual_budget=Decimal('120.00')
+        )
+        vocational = Program.objects.create(
+            name='vocational', description='Vocational', division=maisha,
+            monthly_budget=Decimal('10.00'), annual_budget=Decimal('120.00')
+        )
+        EducationProgramDetail.objects.create(program=education, student_name='A', gender='female', grade='Grade 5')
+        EducationProgramDetail.objects.create(program=education, student_name='B', gender='male', grade='Grade 5')
+        EducationProgramDetail.objects.create(program=education, student_name='C', gender='female', grade='Form 2')
+        trainer = VocationalTrainingProgramTrainerDetail.objects.create(
+            program=vocational, trainer_name='Trainer', gender='male', trainer_association='Assoc',
+            trainer_phone='0711', trainer_email='trainer@example.com'
+        )
+        VocationalTrainingProgramTraineeDetail.objects.create(
+            trainer=trainer, trainee_name='Trainee', gender='female', trainee_phone='0722',
+            trainee_email='trainee@example.com', post_training_status='employed'
+        )
+        Document.objects.create(
+            name='Statement', document_type='bank_statement', document_format='pdf',
+            document_link='https://example.com/a.pdf', division='nisria'
+        )
+        Grant.objects.create(
+            organization_name='Org A', amount_currency='KES', amount_value=Decimal('1000.00'),
+            contact_email='a@example.com', location='Nairobi', organization_type='normal', status='approved'
+        )
+        Grant.objects.create(
+            organization_name='Org B', amount_currency='KES', amount_value=Decimal('500.00'),
+            contact_email='b@example.com', location='Nairobi', organization_type='normal', status='denied'
+        )
+        yesterday = timezone.now().date() - timedelta(days=1)
+        # bulk_create keeps the assignment notification signal out of the test;
+        # it also skips the rollup signals, so rebuild the rollups afterwards.
+        Task.objects.bulk_create([
+            Task(title='Overdue', assigned_to=cls.user, due_date=yesterday, priority='high'),
+            Task(title='Done', assigned_to=cls.user, due_date=yesterday, status='completed'),
+            Task(title='Unassigned'),
+        ])
+        rebuild()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    def test_query_count_is_constant(self):
+        with self.assertNumQueries(self.DASHBOARD_QUERIES):
+            response = self.client.get(reverse('dashboard_analytics'))
+        self.assertEqual(response.status_code, 200)
+
+        # More rows in every table must not cost more queries.
+        education = Program.objects.get(name='education')
+        for i in range(5):
+            EducationProgramDetail.objects.create(program=education, student_name=f'Extra {i}', grade=f'Grade {i}')
+        EmailTemplates.objects.create(
+            name='Welcome', template_type=EmailTemplates.TEMPLATE_TYPE_CHOICES[0][0],
+            subject_template='Hi', body_template='Hello'
+        )
+        cache.clear()
+        with self.assertNumQueries(self.DASHBOARD_QUERIES):
+            self.client.get(reverse('dashboard_analytics'))
+
+    def test_dashboard_payload(self):
+        data = self.client.get(reverse('dashboard_analytics')).data
+
+        self.assertEqual(data['accounts'], {
+            'total_users': 2,
+            'users_by_role': [{'role': 'admin', 'count': 1}, {'role': 'grant_officer', 'count': 1}],
+            'active_users': 1,
+            'inactive_users': 1,
+        })
+        self.assertEqual(data['documents']['total_documents'], 1)
+        self.assertEqual(data['documents']['documents_by_type'], [{'document_type': 'bank_statement', 'count': 1}])
+
+        programs = data['divisions_programs']
+        self.assertEqual(programs['total_divisions'], 2)
+        self.assertEqual(programs['total_programs'], 4)
+        self.assertEqual(programs['total_annual_budget_all_programs'], '2040.00')
+        self.assertEqual(programs['education_program'], {
+            'total_students': 3,
+            'students_by_gender': [{'gender': 'female', 'count': 2}, {'gender': 'male', 'count': 1}],
+            'students_by_grade': [{'grade': 'Form 2', 'count': 1}, {'grade': 'Grade 5', 'count': 2}],
+        })
+        self.assertEqual(programs['vocational_program']['trainees_by_status'], [{'post_training_status': 'employed', 'count': 1}])
+
+        self.assertEqual(data['grants']['total_grants'], 2)
+        self.assertEqual(data['grants']['total_amount_requested'], '1500.00')
+        self.assertEqual(data['grants']['total_amount_approved'], '1000.00')
+
+        tasks = data['task_manager']
+        self.assertEqual(tasks['total_tasks'], 3)
+        self.assertEqual(tasks['overdue_tasks'], 1)
+        self.assertEqual(tasks['tasks_per_user'], [
+            {'user_id': self.user.id, 'user_full_name': 'Admin User', 'task_count': 2},
+        ])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AnalyticsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        cls.document = Document.objects.create(
+            name='Statement', document_type='bank_statement', document_format='pdf',
+            document_link='https://example.com/a.pdf', division='nisria'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    def get_document_types(self, **params):
+        return self.client.get(reverse('document_types_analytics'), params).data
+
+    def test_repeat_request_is_served_from_cache(self):
+        self.get_document_types()
+        with self.assertNumQueries(0):
+            data = self.get_document_types()
+        self.assertEqual(data, [{'document_type': 'bank_statement', 'count': 1}])
+
+    def test_query_params_are_part_of_the_key(self):
+        self.get_document_types()
+        with self.assertNumQueries(1):
+            self.get_document_types(division='maisha')
+
+    def test_save_invalidates(self):
+        self.get_document_types()
+        with self.captureOnCommitCallbacks(execute=True):
+            Document.objects.create(
+                name='Report', document_type='impact_report', document_format='pdf',
+                document_link='https://example.com/b.pdf', division='nisria'
+            )
+        self.assertEqual(len(self.get_document_types()), 2)
+
+    def test_soft_delete_and_restore_invalidate(self):
+        self.get_document_types()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document.soft_delete(self.user)
+        self.assertEqual(self.get_document_types(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Document.objects.archives().restore()
+        self.assertEqual(self.get_document_types(), [{'document_type': 'bank_statement', 'count': 1}])
+
+    def test_unrelated_write_keeps_cache(self):
+        self.get_document_types()
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(title='Unrelated')
+        with self.assertNumQueries(0):
+            self.get_document_types()
+
+
+class DailyMetricRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.program = Program.objects.create(
+            name='rescue', description='Rescue', division=nisria,
+            monthly_budget=Decimal('10.00'), annual_budget=Decimal('120.00')
+        )
+
+    def snapshot(self):
+        return sorted(
+            DailyMetric.objects.filter(count__gt=0).values_list('metric', 'date', 'dimension', 'count', 'total')
+        )
+
+    def assert_matches_rebuild(self):
+        incremental = self.snapshot()
+        rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_incremental_updates_match_rebuild(self):
+        grant = Grant.objects.create(
+            organization_name='Org A', amount_currency='KES', amount_value=Decimal('1000.00'),
+            contact_email='a@example.com', location='Nairobi', organization_type='normal', status='applied'
+        )
+        child = RescueProgramDetail.objects.create(program=self.program, child_name='Child', age=9, gender='male')
+        other = RescueProgramDetail.objects.create(program=self.program, child_name='Other', age=7, gender='female')
+        self.assert_matches_rebuild()
+
+        grant.status = 'approved'
+        grant.amount_value = Decimal('800.00')
+        grant.save()
+        child.date_of_exit = timezone.now().date()
+        child.save(update_fields=['date_of_exit'])
+        other.save(update_fields=['background'])  # Leaves every bucket alone
+        self.assert_matches_rebuild()
+
+        other.soft_delete(self.user)
+        grant.soft_delete(self.user)
+        self.assert_matches_rebuild()
+
+        RescueProgramDetail.objects.archives().restore()
+        child.delete()
+        self.assert_matches_rebuild()
+
+    def test_rollup_tracks_status_change(self):
+        grant = Grant.objects.create(
+            organization_name='Org A', amount_currency='KES', amount_value=Decimal('1000.00'),
+            contact_email='a@example.com', location='Nairobi', organization_type='normal', status='applied'
+        )
+        grant.status = 'denied'
+        grant.save(update_fields=['status'])
+
+        statuses = {
+            DailyMetric.decode_dimensions(dimension)['status']: count
+            for dimension, count in DailyMetric.objects.filter(metric='grants').values_list('dimension', 'count')
+        }
+        self.assertEqual(statuses, {'applied': 0, 'denied': 1})
+
+    def test_rebuild_command(self):
+        RescueProgramDetail.objects.create(program=self.program, child_name='Child', age=9)
+        DailyMetric.objects.all().delete()
+        call_command('rebuild_daily_metrics', '--metric', 'rescue', stdout=StringIO())
+        self.assertEqual(DailyMetric.objects.get(metric='rescue').count, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TimeSeriesAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        DailyMetric.objects.bulk_create([
+            DailyMetric(metric='grants', date='2025-01-06', dimension=DailyMetric.encode_dimensions(
+                {'status': 'approved', 'organization_type': 'normal'}), count=2, total=Decimal('300.00')),
+            DailyMetric(metric='grants', date='2025-01-22', dimension=DailyMetric.encode_dimensions(
+                {'status': 'pending', 'organization_type': 'normal'}), count=1, total=Decimal('50.00')),
+            DailyMetric(metric='grants', date='2025-06-01', dimension=DailyMetric.encode_dimensions(
+                {'status': 'pending', 'organization_type': 'normal'}), count=5, total=Decimal('10.00')),
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    def get_series(self, **params):
+        return self.client.get(reverse('time_series_analytics'), params)
+
+    def test_weekly_buckets_are_zero_filled(self):
+        response = self.get_series(metric='grants', start='2025-01-01', end='2025-01-31', granularity='week')
+        self.assertEqual(response.status_code, 200)
+        [series] = response.data['series']
+        self.assertIsNone(series['group'])
+        self.assertEqual(series['points'], [
+            {'period': '2024-12-30', 'count': 0, 'total': '0.00'},
+            {'period': '2025-01-06', 'count': 2, 'total': '300.00'},
+            {'period': '2025-01-13', 'count': 0, 'total': '0.00'},
+            {'period': '2025-01-20', 'count': 1, 'total': '50.00'},
+            {'period': '2025-01-27', 'count': 0, 'total': '0.00'},
+        ])
+
+    def test_group_by_dimension(self):
+        response = self.get_series(metric='grants', start='2025-01-01', end='2025-03-31', granularity='quarter', group_by='status')
+        self.assertEqual(response.data['series'], [
+            {'group': 'approved', 'points': [{'period': '2025-01-01', 'count': 2, 'total': '300.00'}]},
+            {'group': 'pending', 'points': [{'period': '2025-01-01', 'count': 1, 'total': '50.00'}]},
+        ])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get_series(metric='unknown').status_code, 400)
+        self.assertEqual(self.get_series(metric='grants', granularity='year').status_code, 400)
+        self.assertEqual(self.get_series(metric='grants', group_by='amount_value').status_code, 400)
+        self.assertEqual(self.get_series(metric='grants', start='2025-02-01', end='2025-01-01').status_code, 400)
+        self.assertEqual(self.get_series(metric='grants', start='not-a-date').status_code, 400)
+        self.assertEqual(self.get_series(metric='grants', start='2000-01-01', end='2025-01-01').status_code, 400)
+
+    def test_calendar_limits_are_a_bad_request(self):
+        self.assertEqual(self.get_series(metric='grants', start='0001-01-01', end='9999-12-30').status_code, 400)
+        self.assertEqual(self.get_series(metric='grants', end='0001-01-05').status_code, 400)
+
+    def test_last_buckets_of_the_calendar(self):
+        for granularity in ('day', 'week', 'month', 'quarter'):
+            response = self.get_series(metric='grants', start='9999-12-20', end='9999-12-31', granularity=granularity)
+            self.assertEqual(response.status_code, 200, granularity)
+        self.assertEqual(bucket_count(date(1, 1, 1), date(9999, 12, 31), 'day'), 3652059)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BeneficiaryStatisticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        maisha = Division.objects.create(name='maisha', description='Maisha')
+        education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+        rescue = Program.objects.create(
+            name='rescue', description='Rescue', division=nisria,
+            monthly_budget=Decimal('10.00'), annual_budget=Decimal('120.00')
+        )
+        vocational = Program.objects.create(
+            name='vocational', description='Vocational', division=maisha,
+            monthly_budget=Decimal('10.00'), annual_budget=Decimal('120.00')
+        )
+        EducationProgramDetail.objects.create(program=education, student_name='A', gender='female', age=10)
+        EducationProgramDetail.objects.create(program=education, student_name='B', gender='male', age=15, graduation_year=2000)
+        RescueProgramDetail.objects.create(program=rescue, child_name='C', age=4, date_of_exit=timezone.now().date())
+        trainer = VocationalTrainingProgramTrainerDetail.objects.create(
+            program=vocational, trainer_name='Trainer', trainer_association='Assoc',
+            trainer_phone='0711', trainer_email='trainer@example.com'
+        )
+        VocationalTrainingProgramTraineeDetail.objects.create(
+            trainer=trainer, trainee_name='Trainee', gender='female', age=20, trainee_phone='0722',
+            trainee_email='trainee@example.com'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    def test_statistics_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('beneficiary_statistics_analytics'))
+        data = response.data
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(data['by_program'], [
+            {'program': 'education', 'count': 2},
+            {'program': 'microfund', 'count': 0},
+            {'program': 'rescue', 'count': 1},
+            {'program': 'vocational', 'count': 1},
+        ])
+        self.assertEqual(data['by_gender'], [
+            {'gender': 'female', 'count': 2}, {'gender': 'male', 'count': 1}, {'gender': 'unknown', 'count': 1},
+        ])
+        self.assertEqual(data['by_status'], [{'status': 'active', 'count': 2}, {'status': 'exited', 'count': 2}])
+        bands = {item['age_band']: item['count'] for item in data['by_age_band']}
+        self.assertEqual((bands['0-5'], bands['6-12'], bands['13-17'], bands['18-24']), (1, 1, 1, 1))
+        self.assertEqual(data['programs']['rescue']['by_status'], [{'status': 'active', 'count': 0}, {'status': 'exited', 'count': 1}])
+
+    def test_division_filter_applies_to_every_program(self):
+        data = self.client.get(reverse('beneficiary_statistics_analytics'), {'division': 'maisha'}).data
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['programs']['vocational']['total'], 1)
+
+    def test_filtered_counts_by_program(self):
+        data = self.client.get(reverse('beneficiaries_by_program_analytics'), {'division': 'nisria'}).data
+        self.assertEqual([item['count'] for item in data], [2, 0, 1, 0])
+        self.assertEqual(self.client.get(reverse('beneficiaries_by_program_analytics'), {'division': 'x'}).status_code, 400)
@@ -0,0 +1,100 @@
+import datetime
+
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncWeek
+
+from .models import DailyMetric
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+}
+
+# Zero-filling a long range at a fine granularity would produce huge payloads.
+MAX_BUCKETS = 1000
+
+
+def bucket_start(date, granularity):
+    """ Truncates a date the same way the database Trunc* functions do (weeks start on Monday). """
+    if granularity == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if granularity == 'month':
+        return date.replace(day=1)
+    if granularity == 'quarter':
+        return date.replace(month=3 * ((date.month - 1) // 3) + 1, day=1)
+    return date
+
+
+def next_bucket(date, granularity):
+    if granularity == 'day':
+        return date + datetime.timedelta(days=1)
+    if granularity == 'week':
+        return date + datetime.timedelta(weeks=1)
+    months = 1 if granularity == 'month' else 3
+    month = date.month - 1 + months
+    return date.replace(year=date.year + month // 12, month=month % 12 + 1)
+
+
+def bucket_count(start, end, granularity):
+    """ The number of buckets between start and end (inclusive), counted without building them. """
+    first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    if granularity in ('day', 'week'):
+        return (last - first).days // (7 if granularity == 'week' else 1) + 1
+    months = (last.year - first.year) * 12 + last.month - first.month
+    return months // (1 if granularity == 'month' else 3) + 1
+
+
+def bucket_range(start, end, granularity):
+    """ Every bucket start between start and end (inclusive), in order. """
+    count = bucket_count(start, end, granularity)
+    buckets = [bucket_start(start, granularity)]
+    # No bucket is computed past the last one, which may be the last the calendar has.
+    while len(buckets) < count:
+        buckets.append(next_bucket(buckets[-1], granularity))
+    return buckets
+
+
+def build_series(rollup, start, end, granularity, group_by=None):
+    """
+    Aggregates one rollup metric into zero-filled time buckets.
+
+    The date range is applied as `metric = ... AND date BETWEEN ...` on
+    DailyMetric, which the (metric, date, dimension) unique index serves, so
+    the cost follows the number of days in range rather than source rows.
+    Returns a list of {'group': value, 'points': [...]} series; without
+    group_by there is a single series with group None.
+    """
+    rows = DailyMetric.objects.filter(
+        metric=rollup.metric, date__gte=start, date__lte=end,
+    ).annotate(
+        period=GRANULARITIES[granularity]('date'),
+    ).values('period', 'dimension').annotate(
+        period_count=Sum('count'), period_total=Sum('total'),
+    ).order_by()
+
+    buckets = bucket_range(start, end, granularity)
+    series = {}
+    for row in rows:
+        if not row['period_count'] and not row['period_total']:
+            continue  # Bucket emptied by deletes
+        group = DailyMetric.decode_dimensions(row['dimension'])[group_by] if group_by else None
+        points = series.setdefault(group, {bucket: [0, 0] for bucket in buckets})
+        point = points[row['period']]
+        point[0] += row['period_count'] or 0
+        point[1] += row['period_total'] or 0
+    if not series and not group_by:
+        series[None] = {bucket: [0, 0] for bucket in buckets}
+
+    ordered_groups = sorted(series, key=lambda value: (value is None, str(value)))
+    result = []
+    for group in ordered_groups:
+        points = []
+        for bucket, (count, amount) in series[group].items():
+            point = {'period': bucket.isoformat(), 'count': count}
+            if rollup.sum_field:
+                point['total'] = f"{amount:.2f}"
+            points.append(point)
+        result.append({'group': group, 'points': points})
+    return result
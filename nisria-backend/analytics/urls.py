@@ -4,9 +4,12 @@ from . import views
 urlpatterns = [
     path('', views.dashboard_analytics, name='dashboard_analytics'), 
     path('growth/grants-per-week/', views.grant_growth_analytics_weekly, name='grant_growth_weekly'), 
+    path('timeseries/', views.time_series_analytics, name='time_series_analytics'),
     path('types/grants-by-organization-type/', views.grant_types_analytics, name='grant_types_analytics'),
     path('types/documents-by-type/', views.document_types_analytics, name='document_types_analytics'),
     path('users/by-role/', views.user_roles_analytics, name='user_roles_analytics'),
     path('users/by-location/', views.user_location_analytics, name='user_location_analytics'),
     path('beneficiaries/by-program/', views.beneficiaries_by_program_analytics, name='beneficiaries_by_program_analytics'),
+    path('coalescing/stats/', views.request_coalescing_stats, name='request_coalescing_stats'),
+    path('beneficiaries/statistics/', views.beneficiary_statistics_analytics, name='beneficiary_statistics_analytics'),
 ]
\ No newline at end of file
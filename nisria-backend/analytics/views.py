@@ -1,6 +1,10 @@
+import datetime
+
 from django.db.models import Count, Sum, Q, F, Avg, DecimalField
 from django.db.models.functions import Coalesce, TruncWeek 
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from decimal import Decimal
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated 
 from rest_framework.response import Response # Import Response
@@ -15,6 +19,14 @@ from divisions.models import (
 )
 from email_templates.models import EmailTemplates
 from task_manager.models import Task
+from core.singleflight import get_stats as get_single_flight_stats
+
+from .aggregates import grouped_counts, breakdown, total
+from .beneficiaries import beneficiary_statistics
+from .cache import cached_analytics
+from .models import DailyMetric
+from .rollups import ROLLUPS, ROLLUP_SOURCE_MODELS, read_metrics
+from .timeseries import GRANULARITIES, MAX_BUCKETS, bucket_count, build_series
 
 try:
     from grants.models import Grant
@@ -23,26 +35,31 @@ except ImportError:
     GRANTS_APP_AVAILABLE = False
     Grant = None 
 
+# Source models for cached_analytics; Grant only counts when the app exists.
+GRANT_SOURCES = (Grant,) if GRANTS_APP_AVAILABLE else ()
+DETAIL_SOURCES = (
+    EducationProgramDetail, MicroFundProgramDetail, RescueProgramDetail,
+    VocationalTrainingProgramTrainerDetail, VocationalTrainingProgramTraineeDetail,
+)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated]) 
+@cached_analytics(*GRANT_SOURCES)
 def grant_growth_analytics_weekly(request):
     """
     Provides data on the number of grants uploaded per week.
-    Groups grants by their 'date_created' field.
+    Groups the daily 'grants' rollup (bucketed by the grant's 'date_created') into weeks.
     """
     if not GRANTS_APP_AVAILABLE or Grant is None:
         return Response({'error': 'Grants app or Grant model not found.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    # Use 'date_created' field from the Grant model for the timestamp
-    timestamp_field = 'date_created'  
-
-    weekly_grant_counts = Grant.objects.annotate(
-        week_start=TruncWeek(timestamp_field)
+    weekly_grant_counts = DailyMetric.objects.filter(metric='grants').annotate(
+        week_start=TruncWeek('date')
     ).values(
         'week_start'  # Group by the starting date of the week
     ).annotate(
-        grant_count=Count('id')  # Count grants in each group
-    ).order_by('week_start') # Order by week chronologically
+        grant_count=Sum('count')  # Add up the daily buckets of each week
+    ).filter(grant_count__gt=0).order_by('week_start') # Order by week chronologically
 
     data = [
         {'week_start': item['week_start'].strftime('%Y-%m-%d') if item['week_start'] else None, 'grant_count': item['grant_count']}
@@ -52,33 +69,22 @@ def grant_growth_analytics_weekly(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_analytics(*GRANT_SOURCES)
 def grant_types_analytics(request):
     """
     Provides a count of grants for each organization_type.
+    Read from the 'grants' rollup, so the cost depends on the number of buckets, not grants.
     """
     if not GRANTS_APP_AVAILABLE or Grant is None:
         return Response({'error': 'Grants app or Grant model not found.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    # Assuming your Grant model has an 'organization_type' field
-    # and 'ORG_TYPE_CHOICES' defined on the model.
-    # We'll use the actual values stored in the database for grouping.
-    grant_type_counts = Grant.objects.values(
-        'organization_type'  # Group by the organization_type field
-    ).annotate(
-        count=Count('id')  # Count grants in each group
-    ).order_by('organization_type') # Optional: order by type for consistency
-
-    # Format the data for the response
-    # If you want to display the "human-readable" choice display name,
-    # you would need to iterate and map, but for raw counts, this is fine.
-    data = [
-        {'organization_type': item['organization_type'], 'count': item['count']}
-        for item in grant_type_counts
-    ]
-    return Response(data)
+    # This returns the internal value of organization_type (e.g., 'grant_awarder').
+    grant_rows = read_metrics('grants')['grants']
+    return Response(breakdown(grant_rows, 'organization_type'))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_analytics(Document)
 def document_types_analytics(request):
     """
     Provides a count of documents for each document_type.
@@ -104,6 +110,7 @@ def document_types_analytics(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_analytics(AccountUser)
 def user_roles_analytics(request):
     """
     Provides a count of users for each role.
@@ -127,6 +134,7 @@ def user_roles_analytics(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_analytics(AccountUser)
 def user_location_analytics(request):
     """
     Provides a count of users for each location.
@@ -148,110 +156,250 @@ def user_location_analytics(request):
     data = [{'location': item['location'], 'count': item['count']} for item in user_location_counts]
     return Response(data)
 
+def parse_beneficiary_filters(request):
+    """
+    Reads the optional division/start/end filters shared by the beneficiary endpoints.
+    Returns (filters, error_response).
+    """
+    division = request.query_params.get('division') or None
+    if division is not None and division not in dict(Division.NAME_FIELD_CHOICES):
+        return None, Response(
+            {'error': f"'division' must be one of: {', '.join(dict(Division.NAME_FIELD_CHOICES))}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    dates = {}
+    for param in ('start', 'end'):
+        value = request.query_params.get(param)
+        try:
+            dates[param] = parse_date(value) if value else None
+        except ValueError:
+            dates[param] = None
+        if value and dates[param] is None:
+            return None, Response({'error': f"'{param}' must be a valid date (YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
+    return {'division': division, **dates}, None
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_analytics(*DETAIL_SOURCES, Division, Program)
 def beneficiaries_by_program_analytics(request):
     """
     Provides a count of beneficiaries for each main program.
+    Optional query params: division (nisria/maisha), start and end (YYYY-MM-DD, on created_at).
     """
-    # This approach correctly sums up all beneficiaries for a program type.
+    filters, error = parse_beneficiary_filters(request)
+    if error:
+        return error
+
+    if any(filters.values()):
+        # Filtered counts come from the combined UNION ALL statistics query.
+        counts = {item['program']: item['count'] for item in beneficiary_statistics(**filters)['by_program']}
+    else:
+        # One query over the per-program rollups instead of a COUNT per table.
+        rollups = read_metrics('education', 'microfund', 'rescue', 'vocational_trainees')
+        counts = {
+            'education': total(rollups['education']),
+            'microfund': total(rollups['microfund']),
+            'rescue': total(rollups['rescue']),
+            'vocational': total(rollups['vocational_trainees']),
+        }
     data = [
-        {"program": "Education", "count": EducationProgramDetail.objects.count()},
-        {"program": "Micro-Fund", "count": MicroFundProgramDetail.objects.count()},
-        {"program": "Rescue", "count": RescueProgramDetail.objects.count()},
+        {"program": "Education", "count": counts['education']},
+        {"program": "Micro-Fund", "count": counts['microfund']},
+        {"program": "Rescue", "count": counts['rescue']},
         # For vocational, we count the trainees directly.
-        {"program": "Vocational Training", "count": VocationalTrainingProgramTraineeDetail.objects.count()},
+        {"program": "Vocational Training", "count": counts['vocational']},
     ]
 
     return Response(data)
 
-# Helper function to get counts by a specific field
-def get_counts_by_field(queryset, field_name):
-    """ Helper to get counts grouped by a specific field. """
-    return queryset.values(field_name).annotate(count=Count('id')).order_by(field_name)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_analytics(*DETAIL_SOURCES, Division, Program)
+def beneficiary_statistics_analytics(request):
+    """
+    Provides beneficiary totals with gender, age-band and active/exited
+    breakdowns, overall and per program, from a single UNION ALL query.
+    Optional query params: division (nisria/maisha), start and end (YYYY-MM-DD, on created_at).
+    """
+    filters, error = parse_beneficiary_filters(request)
+    if error:
+        return error
+    return Response(beneficiary_statistics(**filters))
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_analytics(*ROLLUP_SOURCE_MODELS)
+def time_series_analytics(request):
+    """
+    Provides a zero-filled time series for one metric.
+    Query params:
+      - metric: a DailyMetric rollup, e.g. grants, documents, tasks, tasks_due,
+        education, microfund, rescue, vocational_trainers, vocational_trainees.
+      - start / end: YYYY-MM-DD, inclusive (defaults to the last 90 days).
+      - granularity: day, week, month or quarter (default day).
+      - group_by: optional dimension of the metric, e.g. status for grants.
+    """
+    rollups = {rollup.metric: rollup for rollup in ROLLUPS}
+    rollup = rollups.get(request.query_params.get('metric'))
+    if rollup is None:
+        return Response(
+            {'error': f"'metric' must be one of: {', '.join(rollups)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    granularity = request.query_params.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return Response(
+            {'error': f"'granularity' must be one of: {', '.join(GRANULARITIES)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    group_by = request.query_params.get('group_by') or None
+    group_fields = [*rollup.dimensions, *rollup.conditions]
+    if group_by is not None and group_by not in group_fields:
+        return Response(
+            {'error': f"'group_by' for {rollup.metric} must be one of: {', '.join(group_fields)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        end = parse_date(request.query_params['end']) if 'end' in request.query_params else timezone.localdate()
+        start = parse_date(request.query_params['start']) if 'start' in request.query_params else end - datetime.timedelta(days=89)
+    except (ValueError, OverflowError):
+        start = end = None
+    if start is None or end is None:
+        return Response({'error': "'start' and 'end' must be valid dates (YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({'error': "'start' must not be after 'end'."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        buckets = bucket_count(start, end, granularity)
+    except (ValueError, OverflowError):
+        # Weeks starting before 0001-01-01
+        buckets = MAX_BUCKETS + 1
+    if buckets > MAX_BUCKETS:
+        return Response(
+            {'error': f"Range too large for '{granularity}' granularity (max {MAX_BUCKETS} buckets)."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({
+        'metric': rollup.metric,
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group_by': group_by,
+        'series': build_series(rollup, start, end, granularity, group_by),
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def request_coalescing_stats(request):
+    """
+    Reports how often concurrent identical requests were coalesced, per endpoint:
+    leader (computed the result), coalesced (shared the leader's result) and
+    fallback (computed alone after the leader failed or timed out).
+    """
+    return Response(get_single_flight_stats())
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated]) 
+@cached_analytics(
+    AccountUser, Document, BankStatementAccessRequest, Division, Program,
+    *DETAIL_SOURCES, EmailTemplates, *GRANT_SOURCES, Task,
+)
 def dashboard_analytics(request):
     """
     Provides aggregated data from various apps for the dashboard.
+    Grants, documents, tasks and beneficiaries come from the DailyMetric
+    rollups in a single query; the small remaining tables are read with one
+    GROUP BY each. Totals and per-field breakdowns are folded in Python.
     """
     today = timezone.now().date()
     analytics_data = {}
+    rollups = read_metrics(
+        'documents', 'education', 'microfund', 'rescue', 'vocational_trainers', 'vocational_trainees',
+        'tasks', 'tasks_due', *(['grants'] if GRANTS_APP_AVAILABLE else []),
+        before={'tasks_due': today},  # Only buckets that are already past due
+    )
 
     # --- Accounts Analytics ---
-    total_users = AccountUser.objects.count()
-    users_by_role = list(get_counts_by_field(AccountUser.objects.all(), 'role'))
-    active_users = AccountUser.objects.filter(is_active=True).count()
+    user_rows = grouped_counts(AccountUser.objects.all(), ['role', 'is_active'])
+    total_users = total(user_rows)
+    active_users = sum(row['count'] for row in user_rows if row['is_active'])
     
     analytics_data['accounts'] = {
         'total_users': total_users,
-        'users_by_role': users_by_role,
+        'users_by_role': breakdown(user_rows, 'role'),
         'active_users': active_users,
         'inactive_users': total_users - active_users,
     }
 
     # --- Documents Analytics ---
-    total_documents = Document.objects.count()
-    documents_by_type = list(get_counts_by_field(Document.objects.all(), 'document_type'))
-    documents_by_format = list(get_counts_by_field(Document.objects.all(), 'document_format'))
     # Assuming 'division' in Document model is a CharField storing the division name directly
-    documents_by_division_origin = list(get_counts_by_field(Document.objects.all(), 'division'))
-    
-    total_bs_requests = BankStatementAccessRequest.objects.count()
-    granted_bs_requests = BankStatementAccessRequest.objects.filter(is_granted=True).count()
+    document_rows = rollups['documents']
+    bs_requests = BankStatementAccessRequest.objects.aggregate(
+        total=Count('pk'),
+        granted=Count('pk', filter=Q(is_granted=True)),
+    )
     
     analytics_data['documents'] = {
-        'total_documents': total_documents,
-        'documents_by_type': documents_by_type,
-        'documents_by_format': documents_by_format,
-        'documents_by_division_origin': documents_by_division_origin,
+        'total_documents': total(document_rows),
+        'documents_by_type': breakdown(document_rows, 'document_type'),
+        'documents_by_format': breakdown(document_rows, 'document_format'),
+        'documents_by_division_origin': breakdown(document_rows, 'division'),
         'bank_statement_access': {
-            'total_requests': total_bs_requests,
-            'granted_requests': granted_bs_requests,
-            'pending_requests': total_bs_requests - granted_bs_requests,
+            'total_requests': bs_requests['total'],
+            'granted_requests': bs_requests['granted'],
+            'pending_requests': bs_requests['total'] - bs_requests['granted'],
         }
     }
 
     # --- Divisions & Programs Analytics ---
-    total_divisions = Division.objects.count()
-    total_programs = Program.objects.count()
-    programs_per_division_qs = Division.objects.annotate(program_count=Count('program')).values('name', 'program_count')
-    
-    # Sum of all program annual budgets
-    total_annual_budget_all_programs = Program.objects.aggregate(
-        total=Coalesce(Sum('annual_budget'), 0, output_field=DecimalField())
-    )['total']
-
+    programs_per_division = list(
+        Division.objects.annotate(program_count=Count('program')).values('name', 'program_count')
+    )
+    # Program count and the sum of all program annual budgets
+    program_totals = Program.objects.aggregate(
+        total=Count('pk'),
+        total_annual_budget=Coalesce(Sum('annual_budget'), 0, output_field=DecimalField()),
+    )
+
+    education_rows = rollups['education']
     education_stats = {
-        'total_students': EducationProgramDetail.objects.count(),
-        'students_by_gender': list(get_counts_by_field(EducationProgramDetail.objects.all(), 'gender')),
-        'students_by_grade': list(get_counts_by_field(EducationProgramDetail.objects.all(), 'grade')), # Corrected from education_level
+        'total_students': total(education_rows),
+        'students_by_gender': breakdown(education_rows, 'gender'),
+        'students_by_grade': breakdown(education_rows, 'grade'),
     }
+    microfund_rows = rollups['microfund']
     microfund_stats = {
-        'total_beneficiaries': MicroFundProgramDetail.objects.count(),
-        'beneficiaries_by_gender': list(get_counts_by_field(MicroFundProgramDetail.objects.all(), 'gender')),
-        'active_beneficiaries': MicroFundProgramDetail.objects.filter(is_active=True).count(),
+        'total_beneficiaries': total(microfund_rows),
+        'beneficiaries_by_gender': breakdown(microfund_rows, 'gender'),
+        'active_beneficiaries': sum(row['count'] for row in microfund_rows if row['is_active']),
     }
+    rescue_rows = rollups['rescue']
+    total_children = total(rescue_rows)
+    children_exited = sum(row['count'] for row in rescue_rows if row['exited'])
     rescue_stats = {
-        'total_children': RescueProgramDetail.objects.count(),
-        'children_by_gender': list(get_counts_by_field(RescueProgramDetail.objects.all(), 'gender')),
-        'children_exited': RescueProgramDetail.objects.filter(date_of_exit__isnull=False).count(), # Corrected from is_reunited
-        'children_under_care': RescueProgramDetail.objects.filter(date_of_exit__isnull=True).count(), # Corrected from under_care
+        'total_children': total_children,
+        'children_by_gender': breakdown(rescue_rows, 'gender'),
+        'children_exited': children_exited,
+        'children_under_care': total_children - children_exited,
     }
+    trainer_rows = rollups['vocational_trainers']
+    trainee_rows = rollups['vocational_trainees']
     vocational_stats = {
-        'total_trainers': VocationalTrainingProgramTrainerDetail.objects.count(),
-        'trainers_by_gender': list(get_counts_by_field(VocationalTrainingProgramTrainerDetail.objects.all(), 'gender')),
-        'total_trainees': VocationalTrainingProgramTraineeDetail.objects.count(),
-        'trainees_by_gender': list(get_counts_by_field(VocationalTrainingProgramTraineeDetail.objects.all(), 'gender')),
-        'trainees_by_status': list(get_counts_by_field(VocationalTrainingProgramTraineeDetail.objects.all(), 'post_training_status')), # Corrected from under_training
+        'total_trainers': total(trainer_rows),
+        'trainers_by_gender': breakdown(trainer_rows, 'gender'),
+        'total_trainees': total(trainee_rows),
+        'trainees_by_gender': breakdown(trainee_rows, 'gender'),
+        'trainees_by_status': breakdown(trainee_rows, 'post_training_status'),
     }
 
     analytics_data['divisions_programs'] = {
-        'total_divisions': total_divisions,
-        'total_programs': total_programs,
-        'programs_per_division': list(programs_per_division_qs),
-        'total_annual_budget_all_programs': f"{total_annual_budget_all_programs:.2f}",
+        'total_divisions': len(programs_per_division),
+        'total_programs': program_totals['total'],
+        'programs_per_division': programs_per_division,
+        'total_annual_budget_all_programs': f"{program_totals['total_annual_budget']:.2f}",
         'education_program': education_stats,
         'microfund_program': microfund_stats,
         'rescue_program': rescue_stats,
@@ -259,34 +407,25 @@ def dashboard_analytics(request):
     }
 
     # --- Email Templates Analytics ---
-    total_email_templates = EmailTemplates.objects.count()
-    templates_by_type = list(get_counts_by_field(EmailTemplates.objects.all(), 'template_type'))
+    template_rows = grouped_counts(EmailTemplates.objects.all(), ['template_type'])
     analytics_data['email_templates'] = {
-        'total_templates': total_email_templates,
-        'templates_by_type': templates_by_type,
+        'total_templates': total(template_rows),
+        'templates_by_type': breakdown(template_rows, 'template_type'),
     }
 
     # --- Grants Analytics ---
     if GRANTS_APP_AVAILABLE and Grant is not None:
         try:
-            total_grants = Grant.objects.count()
-            # Ensure Grant model has 'status', 'amount_requested', 'amount_approved' fields
-            grants_by_status = list(get_counts_by_field(Grant.objects.all(), 'status'))
-            
-            # Use 'amount_value' as indicated by the error message.
-            # For total_amount_requested, sum 'amount_value' for all grants.
-            total_amount_requested = Grant.objects.aggregate(
-                total=Coalesce(Sum('amount_value'), 0, output_field=DecimalField())
-            )['total']
-            # For total_amount_approved, sum 'amount_value' for grants with an 'approved' status.
-            # You might need to adjust 'approved' to match the exact status value in your Grant model.
-            total_amount_approved = Grant.objects.filter(status='approved').aggregate(
-                total=Coalesce(Sum('amount_value'), 0, output_field=DecimalField())
-            )['total']
+            # The 'grants' rollup accumulates 'amount_value' into each bucket's total.
+            grant_rows = rollups['grants']
+            # total_amount_requested sums 'amount_value' over all grants,
+            # total_amount_approved only over grants with an 'approved' status.
+            total_amount_requested = Decimal(total(grant_rows, 'total'))
+            total_amount_approved = Decimal(total([row for row in grant_rows if row['status'] == 'approved'], 'total'))
             
             analytics_data['grants'] = {
-                'total_grants': total_grants,
-                'grants_by_status': grants_by_status,
+                'total_grants': total(grant_rows),
+                'grants_by_status': breakdown(grant_rows, 'status'),
                 'total_amount_requested': f"{total_amount_requested:.2f}",
                 'total_amount_approved': f"{total_amount_approved:.2f}",
             }
@@ -296,33 +435,29 @@ def dashboard_analytics(request):
         analytics_data['grants'] = {'error': 'Grants app or Grant model not found.'}
 
     # --- Task Manager Analytics ---
-    total_tasks = Task.objects.count()
-    tasks_by_status = list(get_counts_by_field(Task.objects.all(), 'status'))
-    tasks_by_priority = list(get_counts_by_field(Task.objects.all(), 'priority'))
-    overdue_tasks = Task.objects.filter(
-        Q(due_date__lt=today) & ~Q(status='completed')
-    ).count()
-    
+    task_rows = rollups['tasks']
+    # 'tasks_due' buckets tasks by due date and was read only up to yesterday.
+    overdue_tasks = sum(row['count'] for row in rollups['tasks_due'] if row['status'] != 'completed')
+
     tasks_per_user_data = []
-    if total_tasks > 0: # Avoid query if no tasks
-        tasks_per_user_raw = Task.objects.filter(assigned_to__isnull=False).values('assigned_to').annotate(count=Count('id'))
-        user_ids_for_tasks = [item['assigned_to'] for item in tasks_per_user_raw]
-        if user_ids_for_tasks:
-            user_map = {user.id: user.full_name for user in AccountUser.objects.filter(id__in=user_ids_for_tasks)}
-            tasks_per_user_data = [
-                {'user_id': item['assigned_to'], 'user_full_name': user_map.get(item['assigned_to']), 'task_count': item['count']}
-                for item in tasks_per_user_raw if user_map.get(item['assigned_to'])
-            ]
-    
-    grant_follow_up_tasks = Task.objects.filter(is_grant_follow_up_task=True).count()
+    assigned_counts = {}
+    for row in task_rows:
+        if row['assigned_to']:
+            assigned_counts[row['assigned_to']] = assigned_counts.get(row['assigned_to'], 0) + row['count']
+    if assigned_counts:
+        user_names = AccountUser.objects.filter(id__in=assigned_counts).values_list('id', 'full_name')
+        tasks_per_user_data = [
+            {'user_id': user_id, 'user_full_name': full_name, 'task_count': assigned_counts[str(user_id)]}
+            for user_id, full_name in user_names if full_name
+        ]
 
     analytics_data['task_manager'] = {
-        'total_tasks': total_tasks,
-        'tasks_by_status': tasks_by_status,
-        'tasks_by_priority': tasks_by_priority,
+        'total_tasks': total(task_rows),
+        'tasks_by_status': breakdown(task_rows, 'status'),
+        'tasks_by_priority': breakdown(task_rows, 'priority'),
         'overdue_tasks': overdue_tasks,
         'tasks_per_user': tasks_per_user_data,
-        'grant_follow_up_tasks': grant_follow_up_tasks,
+        'grant_follow_up_tasks': sum(row['count'] for row in task_rows if row['is_grant_follow_up_task']),
     }
 
     return Response(analytics_data)
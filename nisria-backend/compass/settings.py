@@ -309,6 +309,15 @@ CLOUDINARY_STORAGE = {
 }
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+# Posted pictures are spooled here and pushed to Cloudinary by a Celery task
+# (core.pictures). The spool directory must be shared with the workers.
+PICTURE_UPLOADS = {
+    'SPOOL_STORAGE': 'django.core.files.storage.FileSystemStorage',
+    'SPOOL_OPTIONS': {'location': config('PICTURE_SPOOL_DIR', default=os.path.join(BASE_DIR, 'upload-spool'))},
+    'BACKEND': 'core.pictures.CloudinaryPictureBackend',
+    'BACKEND_OPTIONS': {},
+}
+
 # ============================================================================
 # REST FRAMEWORK CONFIGURATION
 # ============================================================================
@@ -378,8 +387,42 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'core.tasks.cleanup_expired_recycle_bin_items',
         'schedule': crontab(hour=0, minute=0), # Runs daily at midnight
     },
+    'rebuild-daily-metrics-nightly': {
+        'task': 'analytics.tasks.rebuild_daily_metrics_task',
+        'schedule': crontab(minute='50', hour='3'),
+    },
+    'purge-sync-tombstones-daily': {
+        'task': 'core.tasks.purge_sync_tombstones',
+        'schedule': crontab(minute='20', hour='4'),
+    },
+}
+
+# ============================================================================
+# CACHE CONFIGURATION
+# ============================================================================
+# Shares the Redis instance used by Celery unless CACHE_URL points elsewhere.
+# IGNORE_EXCEPTIONS turns an unreachable Redis into cache misses, so the API
+# keeps answering from the database instead of failing.
+CACHE_URL = config('CACHE_URL', default=REDIS_URL)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': CACHE_URL,
+        'KEY_PREFIX': 'compass',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'IGNORE_EXCEPTIONS': True,
+            'SOCKET_CONNECT_TIMEOUT': 2,
+            'SOCKET_TIMEOUT': 2,
+        },
+    }
 }
 
+# Analytics responses are keyed on per-model version stamps, so writes
+# invalidate them immediately; the timeout only bounds memory use.
+ANALYTICS_CACHE_TIMEOUT = config('ANALYTICS_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
 # ============================================================================
 # SWAGGER SETTINGS
 # ============================================================================
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        import core.signals # noqa
+        from django.apps import apps
+        from .cache import versioned_models
+        from .pictures import connect_picture_cleanup
+        from .signals import connect_sync_tombstone_signals, connect_version_signals
+        # Views register the models they read through version stamps; load
+        # them in every process (workers too, whose writes must bump them).
+        autodiscover_modules('views')
+        connect_version_signals(versioned_models)
+        connect_sync_tombstone_signals(apps.get_models())
+        connect_picture_cleanup(apps.get_models())
@@ -0,0 +1,120 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+# Models whose version stamps something reads (conditional_get,
+# cached_analytics, LocalVersionedCache). Only writes to these bump a
+# version; core.apps connects the signals once every app's views are loaded.
+versioned_models = set()
+
+
+def track_model_versions(*models):
+    """ Registers models read through their version stamps, so their writes bump them. """
+    from django.apps import apps
+    new = set(models) - versioned_models
+    versioned_models.update(new)
+    if apps.ready:
+        # Registered after start-up (e.g. a lazily imported view).
+        from .signals import connect_version_signals
+        connect_version_signals(new)
+
+
+def model_version_key(model):
+    """ Cache key holding the current data version of a model. """
+    return f"model-version:{model._meta.label_lower}"
+
+
+def get_model_versions(*models):
+    """
+    Returns the current version stamp of each model, in the order given.
+
+    Versions live in the cache, so a flushed or evicted stamp is simply
+    re-seeded with a fresh value; anything cached under the old stamp then
+    becomes unreachable rather than stale.
+    """
+    keys = [model_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        seed = time.time_ns()
+        for key in missing:
+            cache.add(key, seed, timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump_model_version(model):
+    """
+    Moves a model to a new version once the current transaction commits.
+
+    Bumping on commit (instead of immediately) stops a concurrent reader from
+    caching pre-commit rows under the new version. Outside a transaction the
+    bump happens right away.
+    """
+    key = model_version_key(model)
+    transaction.on_commit(lambda: cache.set(key, time.time_ns(), timeout=None))
+
+
+class LocalVersionedCache:
+    """
+    A dict cache kept in this process for small, rarely written tables
+    (e.g. resolving a division and program type to its Program row).
+
+    Entries are valid while the given models keep their version stamp:
+    writes in this process clear the cache (again when they commit), and writes in
+    other processes are noticed by re-reading the shared version stamps at
+    most every `check_interval` seconds. Between checks a hit costs no
+    query and no cache round trip.
+    """
+
+    def __init__(self, *models, check_interval=5.0):
+        from .signals import soft_deleted, restored, post_bulk_update, purged
+        from django.db.models.signals import post_save, post_delete
+
+        track_model_versions(*models)
+        self.models = models
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._versions = None
+        self._checked_at = 0.0
+        for model in models:
+            for signal in (post_save, post_delete, soft_deleted, restored, post_bulk_update, purged):
+                signal.connect(self._on_write, sender=model, weak=False)
+
+    def _on_write(self, **kwargs):
+        # Now, so the writing request sees its own change, and again on
+        # commit, in case another thread cached the old row in between.
+        self.clear()
+        transaction.on_commit(self.clear)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._versions = None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._versions is not None and now - self._checked_at < self.check_interval:
+            return
+        versions = get_model_versions(*self.models)
+        with self._lock:
+            if versions != self._versions:
+                self._entries = {}
+                self._versions = versions
+            self._checked_at = now
+
+    def get_or_set(self, key, compute):
+        self._refresh()
+        entries = self._entries
+        if key in entries:
+            return entries[key]
+        value = compute()
+        with self._lock:
+            # A clear() that ran meanwhile must not be undone with a stale value.
+            if entries is self._entries:
+                entries[key] = value
+        return value
@@ -0,0 +1,67 @@
+import functools
+import hashlib
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from .cache import get_model_versions, track_model_versions
+
+
+def conditional_etag(request, models):
+    """
+    Returns the ETag for a GET of `request`, or None.
+
+    Validators come from the cache version stamps of the models behind the
+    response (bumped on every write by core.signals), so computing them costs
+    a cache read and no SQL. The ETag also covers the full path and the user,
+    since list contents depend on query params and on who is asking, and
+    today's date, for date-relative figures such as overdue tasks. If the
+    stamps are unavailable (cache down) no ETag is issued, as a stale 304 is
+    worse than a full response.
+
+    No Last-Modified is sent: a date in whole seconds could not cover the
+    path, the user or the day, so If-Modified-Since alone would get stale
+    304s.
+    """
+    versions = get_model_versions(*models)
+    if not all(versions):
+        return None
+    user = request.user
+    fingerprint = repr((
+        request.get_full_path(), getattr(user, 'pk', None), getattr(user, 'role', None),
+        timezone.localdate().isoformat(), versions,
+    ))
+    return '"%s"' % hashlib.md5(fingerprint.encode('utf-8')).hexdigest()
+
+
+def conditional_get(*models):
+    """
+    Adds an ETag to GET responses and answers unchanged polls with
+    304 Not Modified before the view queries or serializes anything.
+
+    `models` are every model the response is built from (including the ones
+    pulled in by nested serializer fields). Goes under @api_view and
+    @permission_classes; other methods pass straight through.
+    """
+    track_model_versions(*models)
+
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            etag = conditional_etag(request, models)
+            if etag is None:
+                return view_func(request, *args, **kwargs)
+
+            not_modified = get_conditional_response(request, etag=etag)
+            response = not_modified or view_func(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                # Revalidate on every poll; per-user content must not sit in shared caches.
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
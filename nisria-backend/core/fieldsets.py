@@ -0,0 +1,129 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+FIELDS_QUERY_PARAM = 'fields'
+EXCLUDE_QUERY_PARAM = 'exclude'
+
+
+class SparseFieldsetMixin:
+    """
+    ModelSerializer mixin accepting a `fields` keyword: only the named fields
+    are kept (None keeps them all). Works with many=True, where the keyword
+    reaches the child serializer.
+
+    `field_sources` maps fields whose source the model cannot reveal (method
+    fields, properties) to the model fields they read, so the queryset can
+    still be projected when they are requested.
+    """
+    field_sources = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def _parse(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def requested_fields(request, serializer):
+    """
+    Reads ?fields= or ?exclude= (comma separated) and returns the names of
+    the readable serializer fields to keep, or None when neither is given.
+    Unknown names are a 400 so a typo does not silently return less.
+    """
+    fields = request.query_params.get(FIELDS_QUERY_PARAM)
+    exclude = request.query_params.get(EXCLUDE_QUERY_PARAM)
+    if fields is None and exclude is None:
+        return None
+    if fields is not None and exclude is not None:
+        raise serializers.ValidationError({FIELDS_QUERY_PARAM: ["Use either 'fields' or 'exclude', not both."]})
+
+    readable = [name for name, field in serializer.fields.items() if not field.write_only]
+    param = FIELDS_QUERY_PARAM if fields is not None else EXCLUDE_QUERY_PARAM
+    names = _parse(fields if fields is not None else exclude)
+    unknown = [name for name in names if name not in readable]
+    if unknown:
+        raise serializers.ValidationError({param: [f"Unknown fields: {', '.join(unknown)}."]})
+    if fields is not None:
+        return [name for name in readable if name in names]
+    return [name for name in readable if name not in names]
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        if name.startswith('get_') and name.endswith('_display'):
+            return _model_field(model, name[len('get_'):-len('_display')])
+        return None
+
+
+def _columns(serializer, name, field):
+    """
+    Returns (columns, select_related) a serializer field reads, as only()
+    lookups, or None when that cannot be determined.
+    """
+    model = serializer.Meta.model
+    if name in serializer.field_sources:
+        return set(serializer.field_sources[name]), set()
+    if field.source == '*':
+        return None
+    attrs = field.source_attrs
+    model_field = _model_field(model, attrs[0])
+    if model_field is None:
+        return None
+    if not model_field.concrete or model_field.many_to_many:
+        # Reverse and many-to-many relations are loaded by their own queries.
+        return set(), set()
+    if model_field.is_relation and len(attrs) == 2:
+        related_field = _model_field(model_field.related_model, attrs[1])
+        if related_field is not None and related_field.concrete and not related_field.is_relation:
+            return {f'{attrs[0]}__{related_field.name}'}, {attrs[0]}
+    return {model_field.name}, set()
+
+
+def project(queryset, serializer, fields):
+    """
+    Restricts `queryset` to the columns the `fields` of `serializer` read,
+    with only() (and select_related() for one-hop lookups such as
+    created_by.full_name). Relations the queryset already joins but no kept
+    field reads are dropped from select_related(). Returns the queryset
+    unchanged if any kept field reads something that cannot be traced.
+    """
+    model = queryset.model
+    columns = {model._meta.pk.name}
+    joins = set()
+    for name in fields:
+        traced = _columns(serializer, name, serializer.fields[name])
+        if traced is None:
+            return queryset
+        columns |= traced[0]
+        joins |= traced[1]
+    # Keyset pagination reads the ordering field of the last row.
+    latest = model._meta.get_latest_by or 'created_at'
+    if _model_field(model, latest) is not None:
+        columns.add(latest)
+
+    selected = queryset.query.select_related
+    if isinstance(selected, dict):
+        wanted = {lookup.split('__')[0] for lookup in columns}
+        joins |= {relation for relation in selected if relation in wanted}
+        queryset = queryset.select_related(None)
+    if joins:
+        queryset = queryset.select_related(*joins)
+    return queryset.only(*columns)
+
+
+def sparse_fieldset(request, queryset, serializer_class):
+    """
+    Applies ?fields=/?exclude= to a list endpoint: returns the projected
+    queryset and the `fields` keyword for the serializer.
+    """
+    serializer = serializer_class(context={'request': request})
+    fields = requested_fields(request, serializer)
+    if fields is None:
+        return queryset, None
+    return project(queryset, serializer, fields), fields
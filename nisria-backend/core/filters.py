@@ -0,0 +1,26 @@
+import django_filters
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+
+from .models import RecycleBinItem
+
+
+class RecycleBinItemFilter(django_filters.FilterSet):
+    model = django_filters.CharFilter(method='filter_model', label="Model name, e.g. 'grant' or 'grants.grant'; comma separated for several")
+    deleted_by = django_filters.UUIDFilter(field_name='deleted_by')
+    deleted_after = django_filters.IsoDateTimeFilter(field_name='deleted_at', lookup_expr='gte')
+    deleted_before = django_filters.IsoDateTimeFilter(field_name='deleted_at', lookup_expr='lte')
+
+    def filter_model(self, queryset, name, value):
+        names = {part.strip().lower() for part in value.split(',') if part.strip()}
+        # Content types come from ContentType's own cache, so the filter stays a plain content_type_id IN (...).
+        content_type_ids = [
+            ContentType.objects.get_for_model(model).pk
+            for model in apps.get_models()
+            if model._meta.model_name in names or model._meta.label_lower in names
+        ]
+        return queryset.filter(content_type_id__in=content_type_ids)
+
+    class Meta:
+        model = RecycleBinItem
+        fields = ['model', 'deleted_by', 'deleted_after', 'deleted_before']
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_synctombstone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recyclebinitem',
+            index=models.Index(condition=models.Q(('restored_at__isnull', True)), fields=['deleted_at', 'id'], name='recycle_bin_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recyclebinitem',
+            index=models.Index(condition=models.Q(('restored_at__isnull', True)), fields=['content_type', 'deleted_at', 'id'], name='recycle_bin_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recyclebinitem',
+            index=models.Index(condition=models.Q(('restored_at__isnull', True)), fields=['deleted_by', 'deleted_at', 'id'], name='recycle_bin_deleter_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import zlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def pack_snapshot(data):
+    """ core.snapshots.pack_snapshot as of this migration. """
+    stored, blobs = {}, {}
+    for name, value in data.items():
+        if isinstance(value, str) and len(value) >= 1024:
+            raw = value.encode()
+            digest = hashlib.sha256(raw).hexdigest()
+            blobs[digest] = zlib.compress(raw, 6)
+            value = {'$blob': digest}
+        stored[name] = value
+    return zlib.compress(json.dumps(stored, separators=(',', ':')).encode(), 6), blobs
+
+
+def pack_original_data(apps, schema_editor):
+    RecycleBinItem = apps.get_model('core', 'RecycleBinItem')
+    SnapshotBlob = apps.get_model('core', 'SnapshotBlob')
+    Through = RecycleBinItem.blobs.through
+    pks = list(RecycleBinItem.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(pks), BATCH_SIZE):
+        items = list(RecycleBinItem.objects.filter(pk__in=pks[start:start + BATCH_SIZE]).only('pk', 'original_data'))
+        blobs, links = {}, []
+        for item in items:
+            item.snapshot, item_blobs = pack_snapshot(item.original_data)
+            blobs.update(item_blobs)
+            links += [Through(recyclebinitem_id=item.pk, snapshotblob_id=digest) for digest in item_blobs]
+        SnapshotBlob.objects.bulk_create(
+            [SnapshotBlob(digest=digest, data=data) for digest, data in blobs.items()], ignore_conflicts=True
+        )
+        RecycleBinItem.objects.bulk_update(items, ['snapshot'])
+        Through.objects.bulk_create(links)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_recyclebinitem_recycle_bin_deleted_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recyclebinitem',
+            name='snapshot',
+            field=models.BinaryField(default=b'', help_text="The deleted item's data as compressed JSON."),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recyclebinitem',
+            name='blobs',
+            field=models.ManyToManyField(blank=True, related_name='items', to='core.snapshotblob'),
+        ),
+        migrations.RunPython(pack_original_data, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Separate from 0004: PostgreSQL cannot alter a table in the transaction
+    # that wrote rows with deferred foreign key checks against it.
+
+    dependencies = [
+        ('core', '0004_snapshotblob_recyclebinitem_snapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='recyclebinitem',
+            name='original_data',
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.25 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_remove_recyclebinitem_original_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synctombstone',
+            name='scope',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['content_type', 'scope', 'deleted_at', 'id'], name='sync_tombstone_scope_idx'),
+        ),
+    ]
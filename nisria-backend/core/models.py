@@ -1,10 +1,57 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.backends.utils import names_digest
+from django.db.models.signals import class_prepared
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
+from django.utils.functional import cached_property
 from decimal import Decimal # Import Decimal
 import uuid, datetime # Import datetime
+from .signals import soft_deleted, restored, pre_bulk_update, post_bulk_update
+from .snapshots import pack_snapshot, unpack_snapshot
+
+# How long deleted items stay in the recycle bin before the cleanup task purges them.
+RECYCLE_BIN_RETENTION = datetime.timedelta(days=70)
+# Soft-delete bookkeeping is not part of a recycle bin snapshot.
+SNAPSHOT_EXCLUDED_FIELDS = ('is_deleted', 'deleted_at')
+# How long hard deletes are remembered for delta sync (core.sync); older sync tokens must resync.
+SYNC_TOMBSTONE_RETENTION = datetime.timedelta(days=90)
+
+
+def auto_now_fields(model):
+    """ Names of the auto_now timestamps of `model`, which UPDATE statements do not refresh on their own. """
+    return [
+        field.name for field in model._meta.concrete_fields
+        if isinstance(field, models.DateTimeField) and field.auto_now
+    ]
+
+
+def snapshot_value(field, value):
+    """ Converts one field value for a RecycleBinItem snapshot (JSON). """
+    if isinstance(value, models.Model): # Handle ForeignKey fields
+        value = value.pk
+    if isinstance(value, timezone.datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool, list, dict)):
+        return value
+    # Custom field types (e.g. CloudinaryField resources) store their database form.
+    return field.get_prep_value(value)
+
+class SnapshotBlob(models.Model):
+    """ A long text of recycle bin snapshots, compressed and stored once per content (core.snapshots). """
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+
+    def __str__(self):
+        return self.digest
+
 
 class RecycleBinItem(models.Model):
     content_type = models.ForeignKey(
@@ -20,7 +67,9 @@ class RecycleBinItem(models.Model):
     )
     # content_object = GenericForeignKey('content_type', 'object_id') # We might not use this directly if the object is truly gone or to avoid fetching it.
 
-    original_data = models.JSONField(help_text="A JSON representation of the deleted item's data.")
+    # The deleted item's data, packed by core.snapshots; read it through original_data.
+    snapshot = models.BinaryField(help_text="The deleted item's data as compressed JSON.")
+    blobs = models.ManyToManyField(SnapshotBlob, blank=True, related_name='items')
     deleted_at = models.DateTimeField(default=timezone.now)
     deleted_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -45,13 +94,20 @@ class RecycleBinItem(models.Model):
         ordering = ['-deleted_at']
         verbose_name = "Recycle Bin Item"
         verbose_name_plural = "Recycle Bin Items"
+        # The bin listing (core.views) reads items still in the bin, newest first,
+        # optionally for one model or one deleter.
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], condition=models.Q(restored_at__isnull=True), name='recycle_bin_deleted_idx'),
+            models.Index(fields=['content_type', 'deleted_at', 'id'], condition=models.Q(restored_at__isnull=True), name='recycle_bin_model_idx'),
+            models.Index(fields=['deleted_by', 'deleted_at', 'id'], condition=models.Q(restored_at__isnull=True), name='recycle_bin_deleter_idx'),
+        ]
 
     def __str__(self):
         return f"Deleted {self.content_type.model} (ID: {self.object_id_int or self.object_id_uuid}) at {self.deleted_at}"
 
     def save(self, *args, **kwargs):
         if not self.expires_at:
-            self.expires_at = timezone.now() + timezone.timedelta(days=70)
+            self.expires_at = timezone.now() + RECYCLE_BIN_RETENTION
         super().save(*args, **kwargs)
 
     @property
@@ -62,6 +118,15 @@ class RecycleBinItem(models.Model):
     def is_expired(self):
         return timezone.now() >= self.expires_at
 
+    @cached_property
+    def original_data(self):
+        """ The deleted item's data, decoded on first access. """
+        def load_blobs(digests):
+            if 'blobs' in getattr(self, '_prefetched_objects_cache', {}):
+                return {blob.digest: blob.data for blob in self.blobs.all()}
+            return dict(SnapshotBlob.objects.filter(digest__in=digests).values_list('digest', 'data'))
+        return unpack_snapshot(self.snapshot, load_blobs)
+
     def get_original_object(self):
         """Tries to fetch the original object if it still exists (e.g., soft-deleted)."""
         ModelClass = self.content_type.model_class()
@@ -74,20 +139,147 @@ class RecycleBinItem(models.Model):
         except ModelClass.DoesNotExist:
             return None
 
+def bulk_create_bin_items(items, snapshots, using=None):
+    """
+    Saves new RecycleBinItems with their snapshots (dicts of field values),
+    packed by core.snapshots. Long texts not stored yet are added to
+    SnapshotBlob and the items are linked to theirs: at most four queries,
+    however many items. Runs in the caller's transaction. Returns the items.
+    """
+    blobs, links = {}, []
+    for item, data in zip(items, snapshots):
+        item.snapshot, item_blobs = pack_snapshot(data)
+        blobs.update(item_blobs)
+        links.append(list(item_blobs))
+    if blobs:
+        # Locked until the items are linked, so purge_orphan_snapshot_blobs (core.purge)
+        # cannot remove a text that is reused here; it skips locked rows.
+        stored = set(
+            SnapshotBlob.objects.using(using).filter(digest__in=blobs).select_for_update()
+            .values_list('digest', flat=True)
+        )
+        # ignore_conflicts: another transaction may store the same text meanwhile.
+        SnapshotBlob.objects.using(using).bulk_create(
+            [SnapshotBlob(digest=digest, data=data) for digest, data in blobs.items() if digest not in stored],
+            ignore_conflicts=True,
+        )
+    items = RecycleBinItem.objects.using(using).bulk_create(items)
+    through = RecycleBinItem.blobs.through
+    rows = [through(recyclebinitem_id=item.pk, snapshotblob_id=digest) for item, digests in zip(items, links) for digest in digests]
+    if rows:
+        through.objects.using(using).bulk_create(rows)
+    return items
+
+
+class SyncTombstone(models.Model):
+    """
+    A row of a model with `sync_tombstones = True` that was hard-deleted or
+    left a scope, kept so delta sync (core.sync) can tell clients it is
+    gone. Soft-deleted rows need none: they keep their own deleted_at.
+
+    `scope` is the value the row's `sync_scope` field had (e.g. the
+    assignee's id), so each client is only told about rows it could see.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=64)
+    scope = models.CharField(max_length=64, blank=True, default='')
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'deleted_at', 'id'], name='sync_tombstone_idx'),
+            models.Index(fields=['content_type', 'scope', 'deleted_at', 'id'], name='sync_tombstone_scope_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tombstone of {self.content_type.model} {self.object_id} ({self.deleted_at})"
+
 class SoftDeleteQuerySet(models.QuerySet):
     def delete(self, user=None):
         # This is for bulk delete. Individual delete is handled by the model's delete method.
+        # Returns (rows, {model label: rows}) either way, like QuerySet.delete().
         if user and user.role != 'super_admin':
-            for obj in self:
-                obj.soft_delete(user)
-        else:
-            super().delete()
+            count = self.soft_delete(user)
+            return count, {self.model._meta.label: count}
+        return super().delete()
 
     def hard_delete(self):
         super().delete()
+
+    def soft_delete(self, user=None):
+        """
+        Moves the live rows of the queryset to the recycle bin in bulk: one
+        values() snapshot, one bulk_create of RecycleBinItem rows and one
+        UPDATE, in a single transaction. Sends core.signals.soft_deleted and
+        returns the number of rows moved.
+        """
+        model = self.model
+        fields = [field for field in model._meta.concrete_fields if field.name not in SNAPSHOT_EXCLUDED_FIELDS]
+        pk_name = model._meta.pk.attname
+        with transaction.atomic(using=self.db):
+            rows = list(
+                self.filter(is_deleted=False).select_for_update(of=('self',))
+                .values(*[field.attname for field in fields])
+            )
+            if not rows:
+                return 0
+            now = timezone.now()
+            content_type = ContentType.objects.get_for_model(model)
+            bulk_create_bin_items([
+                RecycleBinItem(
+                    content_type=content_type,
+                    object_id_int=row[pk_name] if isinstance(row[pk_name], int) else None,
+                    object_id_uuid=row[pk_name] if not isinstance(row[pk_name], int) else None,
+                    deleted_by=user,
+                    deleted_at=now,
+                    expires_at=now + RECYCLE_BIN_RETENTION,
+                )
+                for row in rows
+            ], [{field.name: snapshot_value(field, row[field.attname]) for field in fields} for row in rows], using=self.db)
+            pks = [row[pk_name] for row in rows]
+            model._base_manager.using(self.db).filter(pk__in=pks).update(is_deleted=True, deleted_at=now)
+            soft_deleted.send(sender=model, pks=pks, user=user)
+        return len(pks)
+
+    def update_with_signals(self, **changes):
+        """
+        update() that sends core.signals.pre_bulk_update/post_bulk_update
+        around the UPDATE, so caches and rollups follow the change. Costs one
+        query for the affected pks on top of the UPDATE.
+        """
+        model = self.model
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            if not pks:
+                return 0
+            pre_bulk_update.send(sender=model, pks=pks, fields=list(changes))
+            count = model._base_manager.using(self.db).filter(pk__in=pks).update(**changes)
+            post_bulk_update.send(sender=model, pks=pks, fields=list(changes))
+        return count
         
-    def restore(self):
-        return self.update(is_deleted=False, deleted_at=None)
+    def restore(self, user=None):
+        """
+        Brings the soft-deleted rows of the queryset back in bulk: one UPDATE
+        of the rows and one of their open recycle bin entries, which are
+        marked restored (by `user`), in a single transaction. Sends
+        core.signals.restored and returns the number of rows restored.
+        """
+        model = self.model
+        with transaction.atomic(using=self.db):
+            pks = list(self.filter(is_deleted=True).select_for_update(of=('self',)).values_list('pk', flat=True))
+            if not pks:
+                return 0
+            # Restored rows count as updated, so delta sync sends them again.
+            now = timezone.now()
+            count = model._base_manager.using(self.db).filter(pk__in=pks).update(
+                is_deleted=False, deleted_at=None, **{name: now for name in auto_now_fields(model)}
+            )
+            object_ids = {'object_id_int__in': pks} if isinstance(pks[0], int) else {'object_id_uuid__in': pks}
+            RecycleBinItem.objects.using(self.db).filter(
+                content_type=ContentType.objects.get_for_model(model), restored_at__isnull=True, **object_ids
+            ).update(restored_at=now, restored_by=user)
+            restored.send(sender=model, pks=pks)
+        return count
 
 class SoftDeleteManager(models.Manager):
     def get_queryset(self):
@@ -107,6 +299,14 @@ class SoftDeleteModel(models.Model):
     objects = SoftDeleteManager()
     all_objects = models.Manager()  # To access all items, including soft-deleted ones
 
+    # Column lists indexed for the default manager's live rows (partial
+    # indexes WHERE is_deleted = false) and for the archive views and the
+    # delta-sync deleted stream (WHERE is_deleted = true); see
+    # soft_delete_indexes(). List the columns the views filter by, then the
+    # ones they order by, then 'id' for keyset pagination.
+    live_indexes = ()
+    archive_indexes = (('deleted_at', 'id'),)
+
     class Meta:
         abstract = True
 
@@ -114,42 +314,26 @@ class SoftDeleteModel(models.Model):
         """Prepares data for JSON serialization for the Recycle Bin."""
         data = {}
         for field in self._meta.fields:
-            if field.name in ['is_deleted', 'deleted_at']: # Don't store these in original_data
+            if field.name in SNAPSHOT_EXCLUDED_FIELDS: # Don't store these in the snapshot
                 continue
-            value = getattr(self, field.name)
-
-            if isinstance(value, models.Model): # Handle ForeignKey fields
-                # Get the primary key of the related object
-                pk_value = value.pk
-                # Check if the primary key is a UUID and convert to string if so
-                if isinstance(pk_value, uuid.UUID):
-                    data[field.name] = str(pk_value)
-                else:
-                    data[field.name] = pk_value
-            elif isinstance(value, timezone.datetime):
-                data[field.name] = value.isoformat()
-            elif isinstance(value, uuid.UUID): # Handle UUID fields
-                 data[field.name] = str(value)
-            elif isinstance(value, Decimal): # Handle Decimal fields
-                data[field.name] = str(value) # Convert Decimal to string
-            elif isinstance(value, datetime.date): # Handle date fields
-                data[field.name] = value.isoformat()
-            else: # Handle other serializable types
-                data[field.name] = value
+            data[field.name] = snapshot_value(field, getattr(self, field.attname))
         return data
 
 
     def soft_delete(self, user):
-        RecycleBinItem.objects.create(
-            content_type=ContentType.objects.get_for_model(self.__class__),
-            object_id_int=self.pk if isinstance(self.pk, int) else None,
-            object_id_uuid=self.pk if not isinstance(self.pk, int) else None,
-            original_data=self._get_serializable_data(),
-            deleted_by=user
-        )
-        self.is_deleted = True
-        self.deleted_at = timezone.now()
-        self.save(update_fields=['is_deleted', 'deleted_at'])
+        now = timezone.now()
+        with transaction.atomic():
+            bulk_create_bin_items([RecycleBinItem(
+                content_type=ContentType.objects.get_for_model(self.__class__),
+                object_id_int=self.pk if isinstance(self.pk, int) else None,
+                object_id_uuid=self.pk if not isinstance(self.pk, int) else None,
+                deleted_by=user,
+                deleted_at=now,
+                expires_at=now + RECYCLE_BIN_RETENTION,
+            )], [self._get_serializable_data()])
+            self.is_deleted = True
+            self.deleted_at = now
+            self.save(update_fields=['is_deleted', 'deleted_at'])
 
     def delete(self, using=None, keep_parents=False, user=None):
         if user and getattr(user, 'role', None) != 'super_admin':
@@ -158,14 +342,40 @@ class SoftDeleteModel(models.Model):
             # Superadmin or no user context implies hard delete
             super().delete(using=using, keep_parents=keep_parents)
 
-    def restore(self):
+    def restore(self, user=None):
         self.is_deleted = False
         self.deleted_at = None
-        self.save(update_fields=['is_deleted', 'deleted_at'])
+        self.save(update_fields=['is_deleted', 'deleted_at', *auto_now_fields(self.__class__)])
         # Mark as restored in RecycleBin
         RecycleBinItem.objects.filter(
             content_type=ContentType.objects.get_for_model(self.__class__),
             object_id_int=self.pk if isinstance(self.pk, int) else None,
             object_id_uuid=self.pk if not isinstance(self.pk, int) else None,
             restored_at__isnull=True
-        ).update(restored_at=timezone.now()) # restored_by would need user context
+        ).update(restored_at=timezone.now(), restored_by=user)
+
+
+def soft_delete_indexes(model):
+    """ The partial indexes declared by `model.live_indexes` and `model.archive_indexes`. """
+    indexes = []
+    for kind, specs, deleted in (('live', model.live_indexes, False), ('arch', model.archive_indexes, True)):
+        for fields in specs:
+            digest = names_digest(model._meta.db_table, *fields, kind, length=6)
+            indexes.append(models.Index(
+                fields=list(fields), condition=models.Q(is_deleted=deleted),
+                name=f"{model._meta.model_name[:10]}_{fields[0][:6]}_{digest}_{kind}",
+            ))
+    return indexes
+
+
+def add_soft_delete_indexes(sender, **kwargs):
+    # Added to Meta.indexes as each model class is built, so makemigrations
+    # picks them up for new SoftDeleteModel subclasses too.
+    meta = sender._meta
+    if issubclass(sender, SoftDeleteModel) and not meta.abstract and not meta.proxy:
+        meta.indexes = [*meta.indexes, *soft_delete_indexes(sender)]
+        # The migration autodetector only reads indexes declared in Meta.
+        meta.original_attrs['indexes'] = meta.indexes
+
+
+class_prepared.connect(add_soft_delete_indexes)
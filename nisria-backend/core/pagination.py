@@ -0,0 +1,112 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Without `?cursor=` this is plain page-number pagination, so existing
+    clients keep working. `?cursor=` (empty for the first page) switches to
+    keyset pagination: rows come newest first, ordered by
+    (ordering_field, id), and each page continues after the last row of the
+    previous one with a `WHERE (ts, id) < (last_ts, last_id)` condition
+    instead of COUNT(*) + OFFSET. Page 500 therefore costs the same as page 1,
+    given an index on (ordering_field, id). The response is
+    {"next": url-or-null, "results": [...]}.
+
+    ordering_field defaults to the model's Meta.get_latest_by, then
+    'created_at'. Subclasses with keyset_by_default use keyset pagination
+    even without `?cursor=`.
+
+    Keyset pages are in time order, so `?cursor=` is rejected for querysets
+    ranked by relevance (annotated with `rank_annotation`, as
+    divisions.search.search does): those are paged by page number.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    rank_annotation = 'search_rank'
+    keyset_by_default = False
+
+    def __init__(self, ordering_field=None):
+        self.ordering_field = ordering_field
+        self.keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.keyset_by_default and self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view=view)
+
+        if self.rank_annotation in queryset.query.annotations:
+            raise serializers.ValidationError({
+                self.cursor_query_param: ["Search results are ranked; page them with `page` instead of a cursor."]
+            })
+
+        self.keyset = True
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        field = self.ordering_field or queryset.model._meta.get_latest_by or 'created_at'
+
+        queryset = queryset.order_by(f'-{field}', '-pk')
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param, ''), queryset.model)
+        if position is not None:
+            timestamp, pk = position
+            # The redundant `field <= timestamp` gives the database a plain
+            # range on the (field, id) index to scan from.
+            queryset = queryset.filter(**{f'{field}__lte': timestamp}).filter(
+                Q(**{f'{field}__lt': timestamp}) | Q(pk__lt=pk)
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        page = rows[:self.page_size]
+        self.next_position = None
+        if len(rows) > self.page_size:
+            last = page[-1]
+            self.next_position = (getattr(last, field), last.pk)
+        return page
+
+    def decode_cursor(self, cursor, model):
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            timestamp, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            timestamp = parse_datetime(timestamp)
+            pk = model._meta.pk.to_python(pk)
+        except (TypeError, ValueError, ValidationError, UnicodeError):
+            raise NotFound('Invalid cursor.')
+        if timestamp is None:
+            raise NotFound('Invalid cursor.')
+        return timestamp, pk
+
+    def encode_cursor(self, position):
+        timestamp, pk = position
+        payload = json.dumps([timestamp.isoformat(), str(pk)])
+        return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii').rstrip('=')
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
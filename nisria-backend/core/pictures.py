@@ -0,0 +1,377 @@
+"""
+Picture uploads handled off the request.
+
+A picture posted with a record (a CloudinaryField such as `pictures` or
+`profile_picture`) is written to a spool storage and the record is saved
+with `<field>_upload = {"status": "pending", ...}`. The Celery task
+core.tasks.process_picture_upload then renders the PICTURE_VARIANTS with
+Pillow, pushes each to the picture backend (Cloudinary in production) and
+stores them on the record: the 'full' variant in the picture field and the
+URL, size and backend public_id of every variant in `<field>_variants`, so
+responses list them without building URLs. The request itself only costs a
+local file write.
+
+Variants are pushed smallest first; a retried task skips those an earlier
+attempt stored (kept in the upload state). Variants a record no longer
+uses (replaced, cleared, an upload that was superseded or failed, the
+record hard-deleted) are deleted from the backend by the Celery task
+core.tasks.delete_stored_pictures once the change commits.
+
+Both storages are pluggable through settings.PICTURE_UPLOADS:
+
+- SPOOL_STORAGE / SPOOL_OPTIONS: a Django Storage class (dotted path) and
+  its arguments for the spooled originals. It must be reachable by the
+  API processes and the Celery workers.
+- BACKEND / BACKEND_OPTIONS: the class pushing processed pictures, e.g.
+  CloudinaryPictureBackend, or FileSystemPictureBackend as a local
+  stand-in for development and tests.
+"""
+import io
+import logging
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+from .models import auto_now_fields
+
+logger = logging.getLogger(__name__)
+
+# Longest side of each stored variant, in pixels, largest last. Pictures
+# are only scaled down, so a small upload can make identical variants.
+PICTURE_VARIANTS = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 2048,
+}
+PICTURE_JPEG_QUALITY = 82
+
+DEFAULT_PICTURE_UPLOADS = {
+    'SPOOL_STORAGE': 'django.core.files.storage.FileSystemStorage',
+    'SPOOL_OPTIONS': {'location': os.path.join(settings.BASE_DIR, 'upload-spool')},
+    'BACKEND': 'core.pictures.CloudinaryPictureBackend',
+    'BACKEND_OPTIONS': {},
+}
+
+
+class PictureError(Exception):
+    """ The spooled file is not a usable image; retrying will not help. """
+
+
+def _conf(name):
+    return getattr(settings, 'PICTURE_UPLOADS', {}).get(name, DEFAULT_PICTURE_UPLOADS[name])
+
+
+def get_spool_storage():
+    return import_string(_conf('SPOOL_STORAGE'))(**_conf('SPOOL_OPTIONS'))
+
+
+def get_picture_backend():
+    return import_string(_conf('BACKEND'))(**_conf('BACKEND_OPTIONS'))
+
+
+class CloudinaryPictureBackend:
+    """ Uploads to Cloudinary with the options declared on the CloudinaryField (folder, ...). """
+
+    def save(self, field, instance, content):
+        from cloudinary import uploader
+
+        options = {"type": field.type, "resource_type": field.resource_type}
+        options.update({key: value(instance) if callable(value) else value for key, value in field.options.items()})
+        return uploader.upload_resource(content, **options)
+
+    def url(self, value):
+        return value.build_url(secure=True)
+
+    def public_id(self, value):
+        return value.public_id
+
+    def delete(self, public_ids):
+        from cloudinary import api
+        api.delete_resources(list(public_ids))
+
+
+class FileSystemPictureBackend:
+    """ Keeps pictures in a local directory, under the field's Cloudinary folder. """
+
+    def __init__(self, location=None, base_url='/media/pictures/'):
+        from django.core.files.storage import FileSystemStorage
+        self.storage = FileSystemStorage(
+            location=location or os.path.join(settings.MEDIA_ROOT, 'pictures'), base_url=base_url
+        )
+
+    def save(self, field, instance, content):
+        folder = field.options.get('folder') or field.name
+        return self.storage.save(f"{folder}/{content.name}", content)
+
+    def url(self, value):
+        return self.storage.url(value)
+
+    def public_id(self, value):
+        return value
+
+    def delete(self, public_ids):
+        for name in public_ids:
+            self.storage.delete(name)
+
+
+def upload_state_field(field_name):
+    """ Name of the JSONField holding the upload state of a picture field. """
+    return f"{field_name}_upload"
+
+
+def variants_field(field_name):
+    """ Name of the JSONField holding the stored variants of a picture field. """
+    return f"{field_name}_variants"
+
+
+def picture_fields(model):
+    """ Names of the picture fields of `model` whose variants are stored (core.pictures). """
+    names = {field.name for field in model._meta.concrete_fields}
+    return [name for name in names if variants_field(name) in names and upload_state_field(name) in names]
+
+
+def variant_public_ids(variants):
+    """ Backend public_ids of stored variants ({variant: {..., public_id}}); older entries have none. """
+    return [variant['public_id'] for variant in (variants or {}).values() if variant.get('public_id')]
+
+
+def delete_pictures_on_commit(public_ids):
+    """ Deletes pictures from the backend, in the background, once the current transaction commits. """
+    from .tasks import delete_stored_pictures
+
+    public_ids = list(public_ids)
+    if public_ids:
+        transaction.on_commit(lambda: delete_stored_pictures.delay(public_ids))
+
+
+def delete_pictures_of_deleted_record(sender, instance, **kwargs):
+    """ post_delete for models with picture fields (connected by core.apps). """
+    for field_name in picture_fields(sender):
+        delete_pictures_on_commit(variant_public_ids(getattr(instance, variants_field(field_name))))
+
+
+def connect_picture_cleanup(models):
+    for model in models:
+        if picture_fields(model):
+            post_delete.connect(delete_pictures_of_deleted_record, sender=model, dispatch_uid=f"pictures:{model._meta.label}")
+
+
+def stored_picture_url(instance, field_name):
+    """
+    URL of a record's full-size picture: the stored 'full' variant, or for
+    pictures uploaded before variants existed, the Cloudinary URL.
+    """
+    full = (getattr(instance, variants_field(field_name)) or {}).get('full')
+    if full:
+        return full['url']
+    picture = getattr(instance, field_name)
+    if picture and hasattr(picture, 'url'):
+        return picture.url
+    return None
+
+
+def render_variants(file):
+    """
+    Returns {variant: (jpeg_bytes, width, height)} for PICTURE_VARIANTS:
+    EXIF orientation applied, transparency flattened onto white, each
+    scaled down to fit its size. The file is decoded once; each variant is
+    scaled from the next larger one.
+    """
+    from PIL import Image, ImageOps
+
+    variants = {}
+    try:
+        with Image.open(file) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, 'white')
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+            for name, size in sorted(PICTURE_VARIANTS.items(), key=lambda item: -item[1]):
+                image = image.copy()
+                image.thumbnail((size, size), Image.LANCZOS)
+                output = io.BytesIO()
+                image.save(output, 'JPEG', quality=PICTURE_JPEG_QUALITY, optimize=True, progressive=True)
+                variants[name] = (output.getvalue(), image.width, image.height)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise PictureError(str(exc))
+    return variants
+
+
+def spool_picture(model, uploaded_file):
+    """ Writes an uploaded file to the spool storage and returns its spool name. """
+    extension = os.path.splitext(uploaded_file.name or '')[1].lower()[:10]
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+    return get_spool_storage().save(f"{model._meta.label_lower}/{uuid.uuid4().hex}{extension}", uploaded_file)
+
+
+def _update_state(model, pk, field_name, spool_name, from_statuses, state, **values):
+    """
+    Moves the upload `spool_name` of a record from one of `from_statuses` to
+    `state`, setting any other `values` with it. Does nothing (and returns
+    False) if the record is gone, a newer upload replaced this one, or the
+    upload is no longer in one of `from_statuses`. A 'processing' state
+    keeps the variants stored so far; variants it replaces are deleted from
+    the backend.
+    """
+    state_field = upload_state_field(field_name)
+    with transaction.atomic():
+        instance = model._base_manager.select_for_update().filter(pk=pk).first()
+        current = getattr(instance, state_field, None) or {}
+        if current.get('spool') != spool_name or current.get('status') not in from_statuses:
+            return False
+        if variants_field(field_name) in values:
+            delete_pictures_on_commit(variant_public_ids(getattr(instance, variants_field(field_name))))
+        for name, value in values.items():
+            setattr(instance, name, value)
+        if state['status'] == 'processing' and current.get('stored'):
+            state = {'stored': current['stored'], **state}
+        setattr(instance, state_field, {**state, 'spool': spool_name, 'updated_at': timezone.now().isoformat()})
+        instance.save(update_fields=[state_field, *values, *auto_now_fields(model)])
+    return True
+
+
+def run_picture_upload(model, pk, field_name, spool_name, final_attempt=True):
+    """
+    Processes one spooled picture and stores it on the record. Returns the
+    resulting status. Backend errors are re-raised while attempts remain so
+    the task can retry; the spooled file is kept until then.
+    """
+    storage = get_spool_storage()
+    field = model._meta.get_field(field_name)
+    # 'processing' again when a failed push is retried.
+    if not _update_state(model, pk, field_name, spool_name, ('pending', 'processing'), {'status': 'processing'}):
+        logger.info(f"Picture upload {spool_name} was superseded, already done or its record deleted.")
+        storage.delete(spool_name)
+        return 'superseded'
+
+    try:
+        with storage.open(spool_name, 'rb') as spooled:
+            rendered = render_variants(spooled)
+    except (PictureError, FileNotFoundError) as exc:
+        logger.warning(f"Picture upload {spool_name} is not a readable image: {exc}")
+        _update_state(model, pk, field_name, spool_name, ('processing',), {'status': 'failed', 'error': "The file is not a readable image."})
+        storage.delete(spool_name)
+        return 'failed'
+
+    instance = model._base_manager.filter(pk=pk).first()
+    if instance is None:
+        logger.info(f"Picture upload {spool_name} lost its record while rendering.")
+        storage.delete(spool_name)
+        return 'superseded'
+    backend = get_picture_backend()
+    stem = os.path.splitext(os.path.basename(spool_name))[0]
+    # Variants an earlier attempt stored; 'full' goes last, so it is never among them.
+    variants = dict((getattr(instance, upload_state_field(field_name)) or {}).get('stored') or {})
+    full = None
+    try:
+        for variant in sorted(rendered, key=PICTURE_VARIANTS.get):
+            if variant in variants:
+                continue
+            content, width, height = rendered[variant]
+            value = backend.save(field, instance, ContentFile(content, name=f"{stem}_{variant}.jpg"))
+            variants[variant] = {'url': backend.url(value), 'width': width, 'height': height, 'public_id': backend.public_id(value)}
+            if variant == 'full':
+                full = value
+    except Exception:
+        if not final_attempt:
+            _update_state(model, pk, field_name, spool_name, ('processing',), {'status': 'processing', 'stored': variants})
+            raise
+        logger.exception(f"Picture upload {spool_name} could not be stored.")
+        _update_state(model, pk, field_name, spool_name, ('processing',), {'status': 'failed', 'error': "The picture could not be stored; please upload it again."})
+        delete_pictures_on_commit(variant_public_ids(variants))
+        storage.delete(spool_name)
+        return 'failed'
+
+    stored = _update_state(
+        model, pk, field_name, spool_name, ('processing',), {'status': 'completed'},
+        **{field.attname: full, variants_field(field_name): variants}
+    )
+    if not stored:
+        delete_pictures_on_commit(variant_public_ids(variants))
+    storage.delete(spool_name)
+    return 'completed' if stored else 'superseded'
+
+
+class PictureUploadStateField(serializers.ReadOnlyField):
+    """ The public part of a `<field>_upload` state: status and error, or None if nothing was uploaded. """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return {'status': value.get('status'), 'error': value.get('error')}
+
+
+class AsyncPictureUploadMixin:
+    """
+    ModelSerializer mixin taking the files posted to `picture_fields` out of
+    the save: each is spooled, the record is saved with a pending upload
+    state, and the processing task is queued once the transaction commits.
+    Posting null clears the picture and its variants and cancels a pending
+    upload. Updates keep the picture columns the processing task wrote
+    meanwhile, unless the request sets them.
+    """
+    picture_fields = ()
+
+    def update(self, instance, validated_data):
+        # ModelSerializer.update() saves every column; re-read the ones the
+        # task writes, under the lock it takes, so a stale copy is not put back.
+        columns = [
+            name for field_name in self.picture_fields
+            for name in (instance._meta.get_field(field_name).attname, upload_state_field(field_name), variants_field(field_name))
+            if name not in validated_data
+        ]
+        with transaction.atomic():
+            if columns:
+                current = type(instance)._base_manager.select_for_update().filter(pk=instance.pk).values(*columns).first()
+                for name, value in (current or {}).items():
+                    setattr(instance, name, value)
+            return super().update(instance, validated_data)
+
+    def save(self, **kwargs):
+        from .tasks import process_picture_upload
+
+        model = self.Meta.model
+        validated_data = self.validated_data
+        spooled, cleared = [], []
+        for field_name in self.picture_fields:
+            if field_name not in validated_data:
+                continue
+            value = validated_data[field_name]
+            if isinstance(value, UploadedFile):
+                spool_name = spool_picture(model, value)
+                spooled.append((field_name, spool_name))
+                del validated_data[field_name]
+                validated_data[upload_state_field(field_name)] = {'status': 'pending', 'spool': spool_name}
+            elif not value:
+                validated_data[upload_state_field(field_name)] = {}
+                validated_data[variants_field(field_name)] = {}
+                if self.instance is not None:
+                    cleared.append(getattr(self.instance, variants_field(field_name)))
+
+        try:
+            instance = super().save(**kwargs)
+        except Exception:
+            storage = get_spool_storage()
+            for _, spool_name in spooled:
+                storage.delete(spool_name)
+            raise
+
+        for variants in cleared:
+            delete_pictures_on_commit(variant_public_ids(variants))
+        for field_name, spool_name in spooled:
+            args = (model._meta.label, str(instance.pk), field_name, spool_name)
+            transaction.on_commit(lambda args=args: process_picture_upload.delay(*args))
+        return instance
@@ -0,0 +1,156 @@
+"""
+Permanent deletion of expired recycle-bin items.
+
+Expired items are purged by content type, in chunks of their oldest
+items. Each chunk is its own short transaction: the original rows are
+deleted with one `DELETE ... WHERE pk IN (...)` and their bin rows with
+another. Only originals still soft-deleted are removed, so a row brought
+back outside the bin survives and only its stale bin entry goes.
+
+A raw DELETE sends no post_delete, so each chunk sends
+core.signals.purged instead (cache versions, sync tombstones). Models
+that other rows depend on (CASCADE, SET_NULL, ...) are deleted through
+Django's collector instead, one chunk at a time, which follows the
+relations and sends post_delete per row; so are models with stored
+pictures, whose post_delete removes them from the picture backend.
+
+A run stops at its row or time budget and reports whether it finished;
+the rest is left for the next run. It ends by removing the snapshot texts
+(core.snapshots) no bin item refers to any more.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, models, transaction
+from django.utils import timezone
+
+from .models import RecycleBinItem, SnapshotBlob, SoftDeleteModel
+from .pictures import picture_fields
+from .signals import purged
+
+logger = logging.getLogger(__name__)
+
+PURGE_CHUNK_SIZE = 500
+PURGE_MAX_ROWS = 20000
+PURGE_TIME_BUDGET = 60  # seconds
+
+
+def raw_delete(queryset):
+    """
+    Deletes the rows of `queryset` with one DELETE and returns how many: no
+    collector, so no cascades, no signals and no per-row queries. Callers
+    make sure nothing depends on the rows (_has_dependents) and send
+    core.signals.purged themselves.
+
+    Wraps QuerySet._raw_delete(), the private method behind Django's own
+    fast deletes; it is called nowhere else, and RawDeleteTests pins what is
+    relied on here so a Django upgrade that changes it fails loudly.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def _has_dependents(model):
+    """
+    Whether deleting rows of `model` must touch other rows: cascades,
+    SET_NULL and the like, many-to-many through rows (its own fields' and
+    those of other models pointing at it) and generic relations.
+    """
+    meta = model._meta
+    return bool(meta.many_to_many) or any(field.is_relation for field in meta.private_fields) or any(
+        relation.many_to_many or relation.on_delete not in (None, models.DO_NOTHING) for relation in meta.related_objects
+    )
+
+
+def delete_originals(model, object_ids, using):
+    """ Deletes the rows of `model` among `object_ids`; returns {model label: rows deleted}. """
+    queryset = model._base_manager.using(using).filter(pk__in=object_ids)
+    if issubclass(model, SoftDeleteModel):
+        queryset = queryset.filter(is_deleted=True)
+    if _has_dependents(model) or picture_fields(model):
+        _, counts = queryset.delete()
+        return counts
+    extra = {}
+    if getattr(model, 'sync_scope', None):
+        # Sync tombstones are keyed by the scope the rows were in.
+        rows = list(queryset.select_for_update().values_list('pk', model._meta.get_field(model.sync_scope).attname))
+        pks, extra['scopes'] = [pk for pk, _ in rows], [scope for _, scope in rows]
+    else:
+        pks = list(queryset.select_for_update().values_list('pk', flat=True))
+    if not pks:
+        return {}
+    count = raw_delete(model._base_manager.using(using).filter(pk__in=pks))
+    purged.send(sender=model, pks=pks, **extra)
+    return {model._meta.label: count}
+
+
+def delete_bin_items(queryset, using):
+    """ Deletes the RecycleBinItems of `queryset` and their snapshot links with two raw DELETEs. """
+    pks = list(queryset.values_list('pk', flat=True))
+    if not pks:
+        return 0
+    raw_delete(RecycleBinItem.blobs.through.objects.using(using).filter(recyclebinitem_id__in=pks))
+    count = raw_delete(RecycleBinItem.objects.using(using).filter(pk__in=pks))
+    purged.send(sender=RecycleBinItem, pks=pks)
+    return count
+
+
+def purge_orphan_snapshot_blobs(limit, using='default'):
+    """ Deletes up to `limit` snapshot texts no bin item refers to; returns how many. """
+    with transaction.atomic(using=using):
+        # Texts being reused by a new snapshot are locked (bulk_create_bin_items) and skipped;
+        # one it waits for after they are locked here is stored again.
+        orphans = list(
+            SnapshotBlob.objects.using(using).filter(items=None).select_for_update(skip_locked=True, of=('self',))
+            .values_list('pk', flat=True)[:limit]
+        )
+        if not orphans:
+            return 0
+        # Checked again by the DELETE, in case a new snapshot took one of them up.
+        return raw_delete(SnapshotBlob.objects.using(using).filter(pk__in=orphans, items=None))
+
+
+def purge_expired_recycle_bin_items(now=None, chunk_size=PURGE_CHUNK_SIZE, max_rows=PURGE_MAX_ROWS, time_budget=PURGE_TIME_BUDGET, using='default'):
+    """
+    Permanently deletes recycle-bin items that expired by `now`, with
+    their original rows, until done or until `max_rows` bin items or
+    `time_budget` seconds are spent.
+
+    Returns {"purged": {model label: rows}, "items": bin items removed,
+    "failed": [model labels skipped after an error], "complete": bool}.
+    """
+    now = now or timezone.now()
+    deadline = time.monotonic() + time_budget
+    expired = RecycleBinItem.objects.using(using).filter(expires_at__lte=now, restored_at__isnull=True)
+    counts, failed, items = Counter(), [], 0
+
+    content_type_ids = list(expired.order_by().values_list('content_type', flat=True).distinct())
+    for content_type_id in content_type_ids:
+        model = ContentType.objects.db_manager(using).get_for_id(content_type_id).model_class()
+        label = model._meta.label if model else f"content type {content_type_id}"
+        while True:
+            if items >= max_rows or time.monotonic() >= deadline:
+                return {"purged": dict(counts), "items": items, "failed": failed, "complete": False}
+            chunk = list(
+                expired.filter(content_type_id=content_type_id).order_by('pk')
+                .values_list('pk', 'object_id_int', 'object_id_uuid')[:min(chunk_size, max_rows - items)]
+            )
+            if not chunk:
+                break
+            bin_pks = [pk for pk, _, _ in chunk]
+            try:
+                with transaction.atomic(using=using):
+                    if model is not None:
+                        object_ids = [int_id if int_id is not None else uuid_id for _, int_id, uuid_id in chunk]
+                        counts.update(delete_originals(model, object_ids, using))
+                    delete_bin_items(RecycleBinItem.objects.using(using).filter(pk__in=bin_pks, restored_at__isnull=True), using)
+            except DatabaseError:
+                # e.g. a PROTECT foreign key; the other models are still purged.
+                logger.exception(f"Could not purge expired recycle bin items of {label}.")
+                failed.append(label)
+                break
+            items += len(chunk)
+
+    purge_orphan_snapshot_blobs(max_rows, using)
+    return {"purged": dict(counts), "items": items, "failed": failed, "complete": True}
@@ -0,0 +1,66 @@
+"""
+Batch restore and permanent delete of recycle bin items.
+
+The selected items are locked and grouped by content type; each model then
+costs a constant number of statements however many of its items were
+selected (SoftDeleteQuerySet.restore(), or core.purge's deletes), and the
+whole batch runs in one transaction.
+"""
+from collections import Counter, defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from .models import RecycleBinItem, SoftDeleteModel
+from .purge import delete_bin_items, delete_originals
+
+
+def _group_by_model(items, using):
+    """ Locks the open items of `items`; returns their pks and {model (or None): [object ids]}. """
+    rows = list(
+        items.filter(restored_at__isnull=True).select_for_update(of=('self',)).order_by()
+        .values_list('pk', 'content_type_id', 'object_id_int', 'object_id_uuid')
+    )
+    groups = defaultdict(list)
+    for _, content_type_id, int_id, uuid_id in rows:
+        model = ContentType.objects.db_manager(using).get_for_id(content_type_id).model_class()
+        groups[model].append(int_id if int_id is not None else uuid_id)
+    return [pk for pk, _, _, _ in rows], groups
+
+
+def restore_bin_items(items, user, using='default'):
+    """
+    Restores the originals of the open RecycleBinItems in `items` and marks
+    those entries restored by `user`. Entries whose original is gone or no
+    longer deleted stay in the bin and are counted as missing.
+
+    Returns {"restored": rows, "by_model": {model label: rows}, "missing": items}.
+    """
+    counts = Counter()
+    with transaction.atomic(using=using):
+        pks, groups = _group_by_model(items, using)
+        for model, object_ids in groups.items():
+            if model is None or not issubclass(model, SoftDeleteModel):
+                continue
+            restored = model.objects.db_manager(using).archives().filter(pk__in=object_ids).restore(user=user)
+            if restored:
+                counts[model._meta.label] = restored
+    total = sum(counts.values())
+    return {"restored": total, "by_model": dict(counts), "missing": len(pks) - total}
+
+
+def delete_bin_items_permanently(items, using='default'):
+    """
+    Hard-deletes the originals of the open RecycleBinItems in `items` (those
+    still soft-deleted) and removes the entries.
+
+    Returns {"deleted": items, "by_model": {model label: rows}}.
+    """
+    counts = Counter()
+    with transaction.atomic(using=using):
+        pks, groups = _group_by_model(items, using)
+        for model, object_ids in groups.items():
+            if model is not None:
+                counts.update(delete_originals(model, object_ids, using))
+        deleted = delete_bin_items(RecycleBinItem.objects.using(using).filter(pk__in=pks), using)
+    return {"deleted": deleted, "by_model": dict(counts)}
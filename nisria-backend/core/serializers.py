@@ -1,14 +1,24 @@
 from rest_framework import serializers
 from django.contrib.contenttypes.models import ContentType
 from .models import RecycleBinItem
+from .fieldsets import SparseFieldsetMixin
 from django.conf import settings
 
 User = settings.AUTH_USER_MODEL
 
-class RecycleBinItemSerializer(serializers.ModelSerializer):
+class RecycleBinItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     content_type_name = serializers.SerializerMethodField()
     deleted_by_email = serializers.SerializerMethodField(method_name='get_deleted_by_user_identifier')
     actual_object_id_display = serializers.CharField(source='actual_object_id', read_only=True)
+    # Decoded from the packed snapshot (core.snapshots); listings leave it out unless asked.
+    original_data = serializers.ReadOnlyField()
+    field_sources = {
+        'original_data': ['snapshot'],
+        'content_type_name': ['content_type'],
+        'deleted_by_email': ['deleted_by'],
+        'actual_object_id_display': ['object_id_int', 'object_id_uuid'],
+        'is_expired': ['expires_at'],
+    }
 
     class Meta:
         model = RecycleBinItem
@@ -0,0 +1,139 @@
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import Signal
+
+# Queryset-level soft delete and restore write with a plain UPDATE, and
+# bulk_create skips save(), so no post_save is sent for the affected rows.
+# These signals let caches and rollups follow those writes; single-instance
+# soft_delete()/restore() go through save() and are covered by post_save.
+
+# Sent after rows of `sender` were moved to the recycle bin in bulk.
+# Arguments: pks (list), user.
+soft_deleted = Signal()
+
+# Sent after rows of `sender` were brought back from the recycle bin in bulk.
+# Arguments: pks (list).
+restored = Signal()
+
+# Sent after rows of `sender` were inserted with bulk_create.
+# Arguments: pks (list).
+bulk_created = Signal()
+
+# Sent after rows of `sender` were removed with a raw DELETE, which sends
+# no post_delete (core.purge). Arguments: pks (list), and scopes (the
+# values of the model's `sync_scope` field, in pks order) if it has one.
+purged = Signal()
+
+# Sent before and after a queryset update of rows of `sender`
+# (SoftDeleteQuerySet.update_with_signals), inside its transaction.
+# Arguments: pks (list), fields (list of updated field names).
+pre_bulk_update = Signal()
+post_bulk_update = Signal()
+
+
+# --- Model version stamps (core.cache) ---
+# Every write to a model whose versions are read (core.cache.versioned_models)
+# moves it to a new cache version, so cached responses and conditional-GET
+# validators keyed on versions never outlive it. The receivers are connected
+# per model: a receiver for every sender would cost a cache write per save
+# anywhere, and a post_delete listener rules out Django's fast delete.
+
+VERSION_SIGNALS = (post_save, post_delete, soft_deleted, restored, bulk_created, post_bulk_update, purged)
+
+
+def bump_version_on_write(sender, **kwargs):
+    from .cache import bump_model_version
+    bump_model_version(sender)
+
+
+def bump_version_on_m2m_change(sender, instance, action, model, **kwargs):
+    from .cache import bump_model_version, versioned_models
+    if action.startswith('post_'):
+        for changed in (instance.__class__, model):
+            if changed in versioned_models:
+                bump_model_version(changed)
+
+
+def connect_version_signals(models):
+    """ Connects the version bumps for `models` and the many-to-many tables they use. """
+    for model in models:
+        for signal in VERSION_SIGNALS:
+            signal.connect(bump_version_on_write, sender=model, dispatch_uid=f"version:{model._meta.label}")
+        relations = [field.remote_field for field in model._meta.many_to_many] + [
+            relation for relation in model._meta.related_objects if relation.many_to_many
+        ]
+        for relation in relations:
+            through = relation.through
+            m2m_changed.connect(bump_version_on_m2m_change, sender=through, dispatch_uid=f"version:{through._meta.label}")
+
+
+# --- Sync tombstones (core.sync) ---
+# Hard deletes of models that opt in with `sync_tombstones = True` are
+# remembered; connected per model (core.apps) to keep fast delete elsewhere.
+# Models that name a `sync_scope` field (e.g. the assignee) have their
+# tombstones keyed by its value, and also get one, keyed by the old value,
+# when a write changes it: the row then leaves the scope of whoever could
+# see it before.
+
+def _scope_attname(model):
+    return model._meta.get_field(model.sync_scope).attname
+
+
+def _scope_value(value):
+    return '' if value is None else str(value)
+
+
+def _create_tombstones(model, rows):
+    """ rows: (pk, scope value) pairs. """
+    from django.contrib.contenttypes.models import ContentType
+    from .models import SyncTombstone
+    content_type = ContentType.objects.get_for_model(model)
+    SyncTombstone.objects.bulk_create([
+        SyncTombstone(content_type=content_type, object_id=str(pk), scope=_scope_value(scope)) for pk, scope in rows
+    ])
+
+
+def record_sync_tombstone(sender, instance, **kwargs):
+    scope = getattr(instance, _scope_attname(sender)) if getattr(sender, 'sync_scope', None) else None
+    _create_tombstones(sender, [(instance.pk, scope)])
+
+
+def record_sync_tombstones(sender, pks, scopes=None, **kwargs):
+    """ record_sync_tombstone for rows removed in bulk; `scopes` lines up with `pks`. """
+    _create_tombstones(sender, zip(pks, scopes or [None] * len(pks)))
+
+
+def remember_previous_scope(sender, instance, raw=False, update_fields=None, **kwargs):
+    """ pre_save: loads the stored scope so post_save can tell whether the row left it. """
+    instance._sync_previous_scope = None
+    if instance._state.adding or raw or (update_fields is not None and sender.sync_scope not in update_fields):
+        return
+    instance._sync_previous_scope = sender._base_manager.filter(pk=instance.pk).values_list(_scope_attname(sender), flat=True).first()
+
+
+def record_scope_exit(sender, instance, **kwargs):
+    previous = getattr(instance, '_sync_previous_scope', None)
+    instance._sync_previous_scope = None
+    if previous is not None and previous != getattr(instance, _scope_attname(sender)):
+        _create_tombstones(sender, [(instance.pk, previous)])
+
+
+def record_scope_exits(sender, pks, fields, **kwargs):
+    """ pre_bulk_update: rows whose scope field is updated may leave their scope. """
+    attname = _scope_attname(sender)
+    if sender.sync_scope in fields or attname in fields:
+        # Rows that keep their scope are filtered out when read (core.sync).
+        _create_tombstones(sender, sender._base_manager.filter(pk__in=pks).values_list('pk', attname))
+
+
+def connect_sync_tombstone_signals(models):
+    """ Connects the tombstone receivers for those of `models` with `sync_tombstones = True`. """
+    for model in models:
+        if not getattr(model, 'sync_tombstones', False):
+            continue
+        uid = f"tombstone:{model._meta.label}"
+        post_delete.connect(record_sync_tombstone, sender=model, dispatch_uid=uid)
+        purged.connect(record_sync_tombstones, sender=model, dispatch_uid=uid)
+        if getattr(model, 'sync_scope', None):
+            pre_save.connect(remember_previous_scope, sender=model, dispatch_uid=uid)
+            post_save.connect(record_scope_exit, sender=model, dispatch_uid=uid)
+            pre_bulk_update.connect(record_scope_exits, sender=model, dispatch_uid=uid)
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+import time
+import uuid
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ('leader', 'coalesced', 'fallback')
+
+# Names seen by this process, so the stats endpoint knows which counters to read.
+registered_names = set()
+
+
+def _stats_key(name, outcome):
+    return f"singleflight:stats:{name}:{outcome}"
+
+
+def _record(name, outcome):
+    key = _stats_key(name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First event for this counter (incr needs an existing key).
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def single_flight(name, key, compute, result_timeout=15, lock_timeout=60, wait=20, poll_interval=0.05):
+    """
+    Runs compute() once for concurrent callers sharing the same key.
+
+    The first caller takes a cache lock (cache.add is atomic in Redis), runs
+    compute() and publishes the value under a short-lived result key. Callers
+    arriving meanwhile, or within result_timeout seconds after, read that key
+    and return the shared value instead of repeating the work. If the leader
+    fails, the wait runs out or the cache is unreachable, callers fall back to
+    computing for themselves.
+
+    Outcomes are counted per `name` (leader / coalesced / fallback); see
+    get_stats().
+    """
+    registered_names.add(name)
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    lock_key = f"singleflight:lock:{name}:{digest}"
+    result_key = f"singleflight:result:{name}:{digest}"
+
+    # A computation that finished moments ago is still shared.
+    value = cache.get(result_key)
+    if value is not None:
+        _record(name, 'coalesced')
+        return value
+
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=lock_timeout):
+        try:
+            # The previous leader may have published between our read and the add.
+            value = cache.get(result_key)
+            if value is not None:
+                _record(name, 'coalesced')
+                return value
+            value = compute()
+            cache.set(result_key, value, timeout=result_timeout)
+            _record(name, 'leader')
+            return value
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        value = cache.get(result_key)
+        if value is not None:
+            _record(name, 'coalesced')
+            return value
+        if cache.get(lock_key) is None:
+            # The leader finished without publishing (it failed) or the cache
+            # is down; check for a result one last time, then stop waiting.
+            value = cache.get(result_key)
+            if value is not None:
+                _record(name, 'coalesced')
+                return value
+            break
+        time.sleep(poll_interval)
+
+    logger.warning(f"Single-flight '{name}' fell back to computing without the leader's result.")
+    _record(name, 'fallback')
+    return compute()
+
+
+def get_stats():
+    """ Returns {name: {'leader': n, 'coalesced': n, 'fallback': n}} for every known name. """
+    names = sorted(registered_names)
+    keys = {_stats_key(name, outcome): (name, outcome) for name in names for outcome in OUTCOMES}
+    values = cache.get_many(list(keys))
+    stats = {name: {outcome: 0 for outcome in OUTCOMES} for name in names}
+    for key, count in values.items():
+        name, outcome = keys[key]
+        stats[name][outcome] = count
+    return stats
+
@@ -0,0 +1,58 @@
+"""
+Storage format of recycle bin snapshots.
+
+A snapshot (the field values of a deleted row, as snapshot_value() makes
+them) is stored as zlib-compressed JSON in RecycleBinItem.snapshot. Text
+values of SNAPSHOT_BLOB_MIN_LENGTH characters or more (narratives, notes)
+are taken out and replaced by {"$blob": "<sha256>"}; each distinct text is
+stored once, compressed, as a SnapshotBlob, so deleting the same record
+again after a restore adds no copy of its long texts.
+
+Snapshots are decoded when RecycleBinItem.original_data is first read
+(restore, preview), never by listings.
+"""
+import hashlib
+import json
+import zlib
+
+SNAPSHOT_BLOB_MIN_LENGTH = 1024
+SNAPSHOT_COMPRESSION_LEVEL = 6
+_BLOB_KEY = '$blob'
+
+
+def _blob_digest(value):
+    if isinstance(value, dict) and len(value) == 1:
+        return value.get(_BLOB_KEY)
+    return None
+
+
+def pack_snapshot(data):
+    """
+    Returns (packed, blobs): the compressed snapshot and
+    {digest: compressed text} of the texts it refers to.
+    """
+    stored, blobs = {}, {}
+    for name, value in data.items():
+        if isinstance(value, str) and len(value) >= SNAPSHOT_BLOB_MIN_LENGTH:
+            raw = value.encode()
+            digest = hashlib.sha256(raw).hexdigest()
+            blobs[digest] = zlib.compress(raw, SNAPSHOT_COMPRESSION_LEVEL)
+            value = {_BLOB_KEY: digest}
+        stored[name] = value
+    packed = zlib.compress(json.dumps(stored, separators=(',', ':')).encode(), SNAPSHOT_COMPRESSION_LEVEL)
+    return packed, blobs
+
+
+def unpack_snapshot(packed, load_blobs):
+    """
+    Decodes a packed snapshot. `load_blobs(digests)` returns {digest:
+    compressed text} for the texts it refers to; it is not called when
+    there are none.
+    """
+    data = json.loads(zlib.decompress(bytes(packed)))
+    references = {name: _blob_digest(value) for name, value in data.items() if _blob_digest(value)}
+    if references:
+        blobs = load_blobs(set(references.values()))
+        for name, digest in references.items():
+            data[name] = zlib.decompress(bytes(blobs[digest])).decode()
+    return data
@@ -0,0 +1,197 @@
+"""
+Delta sync: "changes since <token>" for list endpoints.
+
+A client starts without a token and receives every live row in its scope.
+Each response carries a `token` to send next time; the next call returns
+only the rows created or updated since (`changed`) and the ids of rows
+deleted since (`deleted`). Tokens are opaque, signed positions in three
+streams, each read in (timestamp, pk) order through an index:
+
+- changed: live rows, by the model's updated timestamp
+- deleted: soft-deleted rows, by deleted_at (SoftDeleteModel only)
+- removed: SyncTombstone rows, by deleted_at, for hard deletes of models
+  with `sync_tombstones = True`
+
+A stream reads at most `limit` rows per call; `has_more` tells the client
+to call again with the new token straight away.
+
+Timestamps are taken when a row is written, not when its transaction
+commits, so a slow transaction can commit a row stamped before a position
+that was already handed out. A caught-up stream therefore restarts
+SYNC_OVERLAP behind the clock: rows from the last minute are sent again,
+and clients apply changes idempotently (upsert or delete by id).
+
+Tombstones of models with a `sync_scope` field are keyed by its value,
+and a row that leaves a scope (e.g. a task reassigned away from a user)
+gets one keyed by the scope it left; views pass `tombstone_scope` to read
+only the tombstones of the scopes the client can see. A tombstoned row
+that is (again) in the client's scope is not reported deleted. Tombstones
+are purged after
+SYNC_TOMBSTONE_RETENTION, so older tokens get a 410 and must sync again
+from scratch.
+"""
+import datetime
+
+from django.contrib.contenttypes.models import ContentType
+from django.core import signing
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from drf_yasg import openapi
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .fieldsets import sparse_fieldset
+from .models import SYNC_TOMBSTONE_RETENTION, SoftDeleteModel, SyncTombstone
+
+SYNC_TOKEN_PARAM = 'token'
+SYNC_LIMIT_PARAM = 'limit'
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+SYNC_OVERLAP = datetime.timedelta(minutes=1)
+_TOKEN_SALT = 'core.sync'
+
+SYNC_QUERY_PARAMETERS = [
+    openapi.Parameter(SYNC_TOKEN_PARAM, openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Token from the previous sync response; omit for a full sync."),
+    openapi.Parameter(SYNC_LIMIT_PARAM, openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description=f"Rows per stream and call (default {SYNC_PAGE_SIZE}, at most {SYNC_MAX_PAGE_SIZE})."),
+    openapi.Parameter('fields', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Comma-separated fields to return for changed rows."),
+]
+
+
+class SyncTokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "The sync token is too old; sync again without a token."
+    default_code = 'sync_token_expired'
+
+
+def _invalid_token():
+    return serializers.ValidationError({SYNC_TOKEN_PARAM: ["Invalid sync token."]})
+
+
+def _encode(family, positions):
+    return signing.dumps({
+        'f': family,
+        'p': {name: [timestamp.isoformat(), None if pk is None else str(pk)] for name, (timestamp, pk) in positions.items()},
+    }, salt=_TOKEN_SALT, compress=True)
+
+
+def _decode(token, family, pk_fields):
+    try:
+        payload = signing.loads(token, salt=_TOKEN_SALT)
+        if payload['f'] != family or set(payload['p']) != set(pk_fields):
+            raise _invalid_token()
+        positions = {}
+        for name, (timestamp, pk) in payload['p'].items():
+            timestamp = parse_datetime(timestamp)
+            if timestamp is None:
+                raise _invalid_token()
+            positions[name] = (timestamp, None if pk is None else pk_fields[name].to_python(pk))
+        return positions
+    except (signing.BadSignature, KeyError, TypeError, ValueError, DjangoValidationError):
+        raise _invalid_token()
+
+
+def _page_size(request):
+    value = request.query_params.get(SYNC_LIMIT_PARAM)
+    if value is None:
+        return SYNC_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise serializers.ValidationError({SYNC_LIMIT_PARAM: ["Must be a positive integer."]})
+    return min(limit, SYNC_MAX_PAGE_SIZE)
+
+
+def _after(queryset, field, position):
+    """ Rows past `position`: (timestamp, pk), or (timestamp, None) for everything from timestamp on. """
+    if position is None:
+        return queryset
+    timestamp, pk = position
+    # The plain range lets the database start from the (field, id) index.
+    queryset = queryset.filter(**{f'{field}__gte': timestamp})
+    if pk is None:
+        return queryset
+    return queryset.filter(Q(**{f'{field}__gt': timestamp}) | Q(pk__gt=pk))
+
+
+def _read(queryset, field, position, limit, restart):
+    """
+    Reads one page of a stream. Returns (rows, next_position, has_more); a
+    caught-up stream continues from `restart`.
+    """
+    rows = list(_after(queryset, field, position).order_by(field, 'pk')[:limit + 1])
+    if len(rows) <= limit:
+        return rows, restart, False
+    rows = rows[:limit]
+    last = rows[-1]
+    if isinstance(last, tuple):
+        return rows, last[:2], True
+    return rows, (getattr(last, field), last.pk), True
+
+
+def sync_response(request, queryset, serializer_class, updated_field, context=None, tombstone_scope=None):
+    """
+    Answers a delta-sync request for `queryset`: every row in the client's
+    scope, soft-deleted ones included (e.g. `Model.all_objects.filter(...)`).
+    `updated_field` is the model's auto_now timestamp. `tombstone_scope` is
+    a Q on SyncTombstone.scope selecting the scopes the client can see (all
+    by default). Honours ?fields= and ?exclude= for the changed rows.
+
+    Returns {"changed": [...], "deleted": [ids], "token": "...", "has_more": bool}.
+    """
+    model = queryset.model
+    family = model._meta.label_lower
+    soft_delete = issubclass(model, SoftDeleteModel)
+    pk_fields = {'changed': model._meta.pk, 'removed': SyncTombstone._meta.pk}
+    if soft_delete:
+        pk_fields['deleted'] = model._meta.pk
+
+    now = timezone.now()
+    restart = (now - SYNC_OVERLAP, None)
+    token = request.query_params.get(SYNC_TOKEN_PARAM)
+    if token:
+        positions = _decode(token, family, pk_fields)
+        if positions['removed'][0] < now - SYNC_TOMBSTONE_RETENTION:
+            raise SyncTokenExpired()
+    else:
+        # A full sync sends every live row; deletions before it do not matter.
+        positions = {name: restart for name in pk_fields}
+        positions['changed'] = None
+    limit = _page_size(request)
+
+    live = queryset.filter(is_deleted=False) if soft_delete else queryset
+    live, fields = sparse_fieldset(request, live, serializer_class)
+    next_positions = {}
+    changed, next_positions['changed'], has_more = _read(live, updated_field, positions['changed'], limit, restart)
+
+    deleted = []
+    if soft_delete:
+        rows, next_positions['deleted'], more = _read(
+            queryset.filter(is_deleted=True).values_list('deleted_at', 'pk'), 'deleted_at', positions['deleted'], limit, restart
+        )
+        deleted += [pk for _, pk in rows]
+        has_more |= more
+    tombstones = SyncTombstone.objects.filter(content_type=ContentType.objects.get_for_model(model))
+    if tombstone_scope is not None:
+        tombstones = tombstones.filter(tombstone_scope)
+    rows, next_positions['removed'], more = _read(
+        tombstones.values_list('deleted_at', 'pk', 'object_id'), 'deleted_at', positions['removed'], limit, restart
+    )
+    removed = list(dict.fromkeys(model._meta.pk.to_python(object_id) for _, _, object_id in rows))
+    if removed:
+        # Rows that left a scope and came back, or that the client still sees through another one.
+        visible = set(live.filter(pk__in=removed).values_list('pk', flat=True))
+        deleted += [pk for pk in removed if pk not in visible and pk not in deleted]
+    has_more |= more
+
+    serializer = serializer_class(changed, many=True, context={'request': request, **(context or {})}, fields=fields)
+    return Response({
+        'changed': serializer.data,
+        'deleted': deleted,
+        'token': _encode(family, next_positions),
+        'has_more': has_more,
+    })
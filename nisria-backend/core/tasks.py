@@ -1,33 +1,60 @@
 # /home/manasseh/Documents/Zindua-Software-Dev/final-capstone/nisria-backend/core/tasks.py
 from celery import shared_task
 from django.utils import timezone
-from .models import RecycleBinItem
+from .models import SyncTombstone, SYNC_TOMBSTONE_RETENTION
+from .purge import purge_expired_recycle_bin_items
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Seconds between purge runs while expired items remain beyond one run's budget.
+RECYCLE_BIN_PURGE_PAUSE = 60
+
+
 @shared_task
 def cleanup_expired_recycle_bin_items():
-    expired_items = RecycleBinItem.objects.filter(
-        expires_at__lte=timezone.now(),
-        restored_at__isnull=True
-    )
-    count = 0
-    for item in expired_items:
-        try:
-            original_object = item.get_original_object()
-            if original_object:
-                # Perform a hard delete (assuming superadmin context for tasks or a specific hard_delete method)
-                if hasattr(original_object, 'hard_delete'): # Ideal
-                    original_object.hard_delete()
-                else: # Fallback, assumes delete() without user context is hard delete
-                    original_object.delete() 
-            
-            # Delete the recycle bin entry itself after processing the original
-            item.delete()
-            count += 1
-        except Exception as e:
-            logger.error(f"Error permanently deleting expired item {item.id} (Original ID: {item.actual_object_id}, Type: {item.content_type.model}): {e}")
-    logger.info(f"Permanently deleted {count} expired items from the recycle bin.")
-    return f"Permanently deleted {count} expired items."
+    result = purge_expired_recycle_bin_items()
+    purged = ", ".join(f"{label}: {count}" for label, count in sorted(result['purged'].items())) or "none"
+    logger.info(f"Permanently deleted {result['items']} expired items from the recycle bin ({purged}).")
+    if result['failed']:
+        logger.error(f"Expired recycle bin items of {', '.join(result['failed'])} could not be purged.")
+    if not result['complete']:
+        # Out of budget: continue shortly in a new run rather than holding on.
+        cleanup_expired_recycle_bin_items.apply_async(countdown=RECYCLE_BIN_PURGE_PAUSE)
+    return result
+
+
+@shared_task
+def purge_sync_tombstones():
+    # Sync tokens older than the retention get a 410 and resync, so these are no longer read.
+    count, _ = SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - SYNC_TOMBSTONE_RETENTION).delete()
+    logger.info(f"Purged {count} sync tombstones.")
+    return count
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def process_picture_upload(self, model_label, pk, field_name, spool_name):
+    from django.apps import apps
+    from .pictures import run_picture_upload
+
+    model = apps.get_model(model_label)
+    final_attempt = self.request.retries >= self.max_retries
+    try:
+        return run_picture_upload(model, pk, field_name, spool_name, final_attempt=final_attempt)
+    except Exception as exc:
+        # Only pushes to the picture backend are re-raised; they are usually transient.
+        logger.warning(f"Picture upload {spool_name} failed, retrying: {exc}")
+        raise self.retry(exc=exc)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def delete_stored_pictures(self, public_ids):
+    """ Deletes picture variants no record uses any more from the picture backend (core.pictures). """
+    from .pictures import get_picture_backend
 
+    try:
+        get_picture_backend().delete(public_ids)
+    except Exception as exc:
+        logger.warning(f"Deleting {len(public_ids)} stored pictures failed, retrying: {exc}")
+        raise self.retry(exc=exc)
+    return len(public_ids)
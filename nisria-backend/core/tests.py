@@ -1,3 +1,901 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from divisions.models import Division, EducationProgramDetail, Program
+from documents.models import Document
+from notifications.models import Notification
+
+from .cache import LocalVersionedCache, bump_model_version
+from .models import RecycleBinItem, SnapshotBlob, SyncTombstone
+from .purge import delete_originals, purge_expired_recycle_bin_items, raw_delete
+from .tasks import cleanup_expired_recycle_bin_items, delete_stored_pictures
+from .pictures import (
+    FileSystemPictureBackend, get_spool_storage, render_variants, stored_picture_url, run_picture_upload, spool_picture, variant_public_ids,
+)
+from .singleflight import get_stats, single_flight
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_callers_share_one_computation(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'value': 42}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(single_flight('test.shared', 'k', slow_compute)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(single_flight('test.shared', 'k', slow_compute)))
+            for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}] * 4)
+        self.assertEqual(get_stats()['test.shared'], {'leader': 1, 'coalesced': 3, 'fallback': 0})
+
+    def test_failed_leader_lets_waiters_compute(self):
+        def failing():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            single_flight('test.failure', 'k', failing)
+        # The lock was released, so the next caller leads instead of waiting.
+        self.assertEqual(single_flight('test.failure', 'k', lambda: 'ok'), 'ok')
+        self.assertEqual(get_stats()['test.failure']['leader'], 1)
+
+    def test_waiter_falls_back_when_lock_is_orphaned(self):
+        # Another process holds the lock and never publishes a result.
+        cache.add(f"singleflight:lock:test.orphan:{hashlib.md5(b'k').hexdigest()}", 'other', 60)
+        self.assertEqual(single_flight('test.orphan', 'k', lambda: 'mine', wait=0.1), 'mine')
+        self.assertEqual(get_stats()['test.orphan']['fallback'], 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('document-list-create')
+
+    def create_document(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Document.objects.create(
+                name=name, document_type='bank_statement', document_format='pdf',
+                document_link='https://example.com/a.pdf', division='nisria'
+            )
+
+    def test_unchanged_list_is_not_modified(self):
+        self.create_document('Statement')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_write_changes_the_etag(self):
+        self.create_document('Statement')
+        etag = self.client.get(self.url)['ETag']
+
+        self.create_document('Another statement')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_only_watched_models_bump_versions(self):
+        with patch('core.cache.bump_model_version') as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                Notification.objects.create(recipient=self.user, message='Hello')
+            bump.assert_not_called()
+            self.create_document('Statement')
+            bump.assert_called_with(Document)
+
+    def test_grant_list_follows_its_documents(self):
+        from grants.models import Grant
+        document = self.create_document('Statement')
+        with self.captureOnCommitCallbacks(execute=True):
+            grant = Grant.objects.create(
+                organization_name='Fund', amount_currency='KES', amount_value=Decimal('100'),
+                contact_email='fund@example.com', location='Nairobi', organization_type='normal'
+            )
+            grant.required_documents.add(document)
+        url = reverse('grants:grant-list-create')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            document.soft_delete(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_models_keep_fast_delete(self):
+        self.assertFalse(post_delete.has_listeners(SnapshotBlob))
+        self.assertTrue(post_delete.has_listeners(Notification))  # sync tombstones
+
+    def test_if_modified_since_alone_is_not_answered_with_304(self):
+        self.create_document('Statement')
+        self.client.get(self.url)
+        self.create_document('Another statement')
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_query_string(self):
+        self.create_document('Statement')
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'page': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        Document.objects.bulk_create([
+            Document(
+                name=f'Report {i:02d}', document_type='impact_report', document_format='pdf',
+                document_link='https://example.com/a.pdf', division='overall'
+            )
+            for i in range(25)
+        ])
+        # Ties on the timestamp must be broken by id, not skipped or repeated.
+        Document.objects.filter(name__lt='Report 10').update(date_uploaded=timezone.now() - timedelta(days=1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('document-list-create')
+
+    def test_cursor_walks_every_row_once_in_order(self):
+        names = []
+        response = self.client.get(self.url, {'cursor': ''})
+        pages = 1
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            names.extend(row['name'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+            pages += 1
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(names), 25)
+        expected = list(Document.objects.order_by('-date_uploaded', '-pk').values_list('name', flat=True))
+        self.assertEqual(names, expected)
+
+    def test_deep_page_costs_the_same_as_the_first(self):
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(self.url, {'cursor': '', 'page_size': 5})
+        for _ in range(3):
+            response = self.client.get(response.data['next'])
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(response.data['next'])
+        self.assertEqual(len(first), len(deep))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in deep.captured_queries))
+
+    def test_page_numbers_still_work(self):
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_unranked_search_pages_by_cursor(self):
+        from grants.models import Grant
+        Grant.objects.bulk_create([
+            Grant(
+                organization_name=f'Fund {i}', amount_currency='KES', amount_value=Decimal('100'),
+                contact_email='fund@example.com', location='Nairobi', organization_type='normal'
+            )
+            for i in range(3)
+        ])
+        url = reverse('grants:grant-search-view')
+        first = self.client.get(url, {'q': 'fund', 'cursor': '', 'page_size': 2})
+        self.assertEqual(first.status_code, 200, first.data)
+        self.assertEqual(len(first.data['results']), 2)
+        rest = self.client.get(first.data['next'])
+        self.assertEqual(len(rest.data['results']), 1)
+        self.assertIsNone(rest.data['next'])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='super_admin'
+        )
+        Document.objects.create(
+            name='Annual Report', description='A long description of the year.', document_type='impact_report',
+            document_format='pdf', document_link='https://example.com/a.pdf', division='overall'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('document-list-create')
+
+    def get_with_queries(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        select = next(query['sql'] for query in queries if 'FROM "documents_document"' in query['sql'] and 'COUNT(' not in query['sql'])
+        return response, select
+
+    def test_fields_limit_the_payload_and_the_columns(self):
+        response, select = self.get_with_queries({'fields': 'id,name,document_type_display'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [{'id': response.data['results'][0]['id'], 'name': 'Annual Report', 'document_type_display': 'Impact Report'}])
+        self.assertNotIn('"description"', select)
+        self.assertNotIn('"document_link"', select)
+
+    def test_exclude_drops_fields(self):
+        response, select = self.get_with_queries({'exclude': 'description,document_link'})
+        row = response.data['results'][0]
+        self.assertNotIn('description', row)
+        self.assertIn('division_display', row)
+        self.assertNotIn('"description"', select)
+
+    def test_cursor_pages_still_link_with_a_projection(self):
+        response = self.client.get(self.url, {'fields': 'name', 'cursor': ''})
+        self.assertEqual(response.data['results'], [{'name': 'Annual Report'}])
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'fields': 'name,secret'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'fields': 'name', 'exclude': 'id'}).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LocalVersionedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.local = LocalVersionedCache(Document, check_interval=60)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return Document.objects.count()
+
+    def test_hits_cost_nothing_between_checks(self):
+        self.assertEqual(self.local.get_or_set('count', self.compute), 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.local.get_or_set('count', self.compute), 0)
+        self.assertEqual((len(queries), self.calls), (0, 1))
+
+    def test_local_writes_clear_the_cache(self):
+        self.local.get_or_set('count', self.compute)
+        with self.captureOnCommitCallbacks(execute=True):
+            Document.objects.create(
+                name='Report', document_type='impact_report', document_format='pdf',
+                document_link='https://example.com/a.pdf', division='overall'
+            )
+        self.assertEqual(self.local.get_or_set('count', self.compute), 1)
+
+    def test_other_processes_are_noticed_at_the_next_check(self):
+        self.local.get_or_set('count', self.compute)
+        # Another worker wrote: only the shared version stamp moves here.
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_model_version(Document)
+        self.local.get_or_set('count', self.compute)
+        self.assertEqual(self.calls, 1)
+
+        self.local._checked_at -= 60
+        self.local.get_or_set('count', self.compute)
+        self.assertEqual(self.calls, 2)
+
+
+def picture_file(name='photo.png', size=(3000, 1000), mode='RGBA'):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class PictureUploadTests(TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.TemporaryDirectory()
+        self.pictures_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spool_dir.cleanup)
+        self.addCleanup(self.pictures_dir.cleanup)
+        settings = override_settings(PICTURE_UPLOADS={
+            'SPOOL_OPTIONS': {'location': self.spool_dir.name},
+            'BACKEND': 'core.pictures.FileSystemPictureBackend',
+            'BACKEND_OPTIONS': {'location': self.pictures_dir.name},
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+
+    def spool(self, uploaded):
+        spool_name = spool_picture(User, uploaded)
+        User.objects.filter(pk=self.user.pk).update(profile_picture_upload={'status': 'pending', 'spool': spool_name})
+        return spool_name
+
+    def test_picture_variants_are_stored_and_unspooled(self):
+        from PIL import Image
+        spool_name = self.spool(picture_file())
+        self.assertEqual(run_picture_upload(User, self.user.pk, 'profile_picture', spool_name), 'completed')
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_upload['status'], 'completed')
+        variants = self.user.profile_picture_variants
+        self.assertEqual(
+            {name: (variant['width'], variant['height']) for name, variant in variants.items()},
+            {'thumbnail': (160, 53), 'card': (480, 160), 'full': (2048, 683)}
+        )
+        for name, variant in variants.items():
+            relative = variant['url'][len('/media/pictures/'):]
+            with Image.open(os.path.join(self.pictures_dir.name, relative)) as image:
+                self.assertEqual((image.format, image.size), ('JPEG', (variant['width'], variant['height'])))
+        self.assertEqual(self.user.profile_picture.public_id + '.jpg', variants['full']['url'][len('/media/pictures/'):])
+        self.assertFalse(get_spool_storage().exists(spool_name))
+
+    def test_stored_picture_url_prefers_the_full_variant(self):
+        self.assertIsNone(stored_picture_url(self.user, 'profile_picture'))
+        self.user.profile_picture_variants = {'full': {'url': '/media/pictures/full.jpg', 'width': 1, 'height': 1}}
+        self.assertEqual(stored_picture_url(self.user, 'profile_picture'), '/media/pictures/full.jpg')
+
+    def test_unreadable_files_fail_without_retrying(self):
+        spool_name = self.spool(SimpleUploadedFile('photo.png', b'not an image'))
+        self.assertEqual(run_picture_upload(User, self.user.pk, 'profile_picture', spool_name, final_attempt=False), 'failed')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_upload['status'], 'failed')
+        self.assertFalse(self.user.profile_picture)
+
+    def test_backend_errors_are_retried_then_fail(self):
+        spool_name = self.spool(picture_file())
+        with patch('core.pictures.FileSystemPictureBackend.save', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                run_picture_upload(User, self.user.pk, 'profile_picture', spool_name, final_attempt=False)
+            self.assertTrue(get_spool_storage().exists(spool_name))
+            self.assertEqual(run_picture_upload(User, self.user.pk, 'profile_picture', spool_name), 'failed')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_upload['error'], "The picture could not be stored; please upload it again.")
+
+    def test_a_retry_only_pushes_the_missing_variants(self):
+        spool_name = self.spool(picture_file())
+        save = FileSystemPictureBackend.save
+        pushed = []
+
+        def flaky_save(backend, field, instance, content):
+            pushed.append(content.name.rsplit('_', 1)[1])
+            if len(pushed) == 3:
+                raise ConnectionError
+            return save(backend, field, instance, content)
+
+        with patch('core.pictures.FileSystemPictureBackend.save', flaky_save):
+            with self.assertRaises(ConnectionError):
+                run_picture_upload(User, self.user.pk, 'profile_picture', spool_name, final_attempt=False)
+            self.assertEqual(run_picture_upload(User, self.user.pk, 'profile_picture', spool_name), 'completed')
+        self.assertEqual(pushed, ['thumbnail.jpg', 'card.jpg', 'full.jpg', 'full.jpg'])
+        self.user.refresh_from_db()
+        self.assertNotIn('stored', self.user.profile_picture_upload)
+        self.assertEqual(self.user.profile_picture.public_id + '.jpg', self.user.profile_picture_variants['full']['public_id'])
+
+    def test_replaced_and_deleted_pictures_are_removed_from_the_backend(self):
+        self.assertEqual(run_picture_upload(User, self.user.pk, 'profile_picture', self.spool(picture_file())), 'completed')
+        self.user.refresh_from_db()
+        old = variant_public_ids(self.user.profile_picture_variants)
+        self.assertEqual(len(old), 3)
+
+        with patch.object(delete_stored_pictures, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                run_picture_upload(User, self.user.pk, 'profile_picture', self.spool(picture_file()))
+            delay.assert_called_once_with(old)
+            delete_stored_pictures(*delay.call_args.args)
+            self.assertFalse(any(os.path.exists(os.path.join(self.pictures_dir.name, name)) for name in old))
+
+            self.user.refresh_from_db()
+            current = variant_public_ids(self.user.profile_picture_variants)
+            with self.captureOnCommitCallbacks(execute=True):
+                User.objects.filter(pk=self.user.pk).delete()
+            delay.assert_called_with(current)
+
+    def test_a_newer_upload_supersedes_an_older_one(self):
+        older = self.spool(picture_file('old.png'))
+        newer = self.spool(picture_file('new.png'))
+        self.assertEqual(run_picture_upload(User, self.user.pk, 'profile_picture', older), 'superseded')
+        self.assertFalse(get_spool_storage().exists(older))
+        self.assertEqual(run_picture_upload(User, self.user.pk, 'profile_picture', newer), 'completed')
+
+    def test_a_record_deleted_while_rendering_supersedes_the_upload(self):
+        spool_name = self.spool(picture_file())
+        render = render_variants
+
+        def render_and_delete(spooled):
+            User.objects.filter(pk=self.user.pk).delete()
+            return render(spooled)
+
+        with patch('core.pictures.render_variants', render_and_delete):
+            self.assertEqual(run_picture_upload(User, self.user.pk, 'profile_picture', spool_name), 'superseded')
+        self.assertFalse(get_spool_storage().exists(spool_name))
+
+
+@patch('core.sync.SYNC_OVERLAP', timedelta(0))
+@patch('task_manager.signals.current_app')
+class ScopedSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second = [
+            User.objects.create_user(
+                email=f'staff{i}@nisria.co', full_name=f'Staff {i}', phone_number=f'070000000{i}',
+                password='pass', role='admin'
+            )
+            for i in range(2)
+        ]
+
+    def sync(self, user, name, token=None):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.get(reverse(name), {'token': token} if token else {})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_reassigned_tasks_leave_the_old_assignees_sync(self, _):
+        from task_manager.models import Task
+        task = Task.objects.create(title='Report', assigned_to=self.first)
+        other = Task.objects.create(title='Budget', assigned_to=self.second)
+        first_token = self.sync(self.first, 'task-changes')['token']
+        second_token = self.sync(self.second, 'task-changes')['token']
+
+        task.assigned_to = self.second
+        task.save()
+        other_pk = other.pk
+        other.delete()
+
+        first = self.sync(self.first, 'task-changes', first_token)
+        self.assertEqual((first['changed'], first['deleted']), ([], [task.pk]))
+        second = self.sync(self.second, 'task-changes', second_token)
+        self.assertEqual([row['id'] for row in second['changed']], [str(task.pk)])
+        self.assertEqual(second['deleted'], [other_pk])
+
+        # Back to the first assignee: a change again, not a deletion.
+        task.assigned_to = self.first
+        task.save()
+        first = self.sync(self.first, 'task-changes', first['token'])
+        self.assertEqual(([row['id'] for row in first['changed']], first['deleted']), ([str(task.pk)], []))
+
+    def test_documents_reclassified_as_bank_statements_are_removed(self, _):
+        document = Document.objects.create(
+            name='Budget', document_type='impact_report', document_format='pdf',
+            document_link='https://example.com/a.pdf', division='nisria'
+        )
+        token = self.sync(self.first, 'document-changes')['token']
+        Document.objects.filter(pk=document.pk).update_with_signals(document_type='bank_statement')
+        self.assertEqual(self.sync(self.first, 'document-changes', token)['deleted'], [document.pk])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RecycleBinListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='super@nisria.co', full_name='Super Admin', phone_number='0700000001',
+            password='pass', role='super_admin'
+        )
+        cls.other = User.objects.create_user(
+            email='staff@nisria.co', full_name='Staff User', phone_number='0700000002',
+            password='pass', role='admin'
+        )
+        Document.objects.bulk_create([
+            Document(
+                name=f'Report {i:02d}', document_type='impact_report', document_format='pdf',
+                document_link='https://example.com/a.pdf', division='overall'
+            )
+            for i in range(12)
+        ])
+        Document.objects.filter(name__lt='Report 04').soft_delete(cls.other)
+        Document.objects.filter(name__gte='Report 04').soft_delete(cls.admin)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse('core:recycle_bin_list')
+
+    def test_pages_walk_the_bin_newest_first(self):
+        ids = []
+        response = self.client.get(self.url, {'page_size': 5})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        expected = list(RecycleBinItem.objects.filter(restored_at__isnull=True).order_by('-deleted_at', '-pk').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_filters_by_model_deleter_and_date(self):
+        response = self.client.get(self.url, {'model': 'documents.document', 'deleted_by': str(self.other.pk)})
+        self.assertEqual(len(response.data['results']), 4)
+        response = self.client.get(self.url, {'model': 'document', 'deleted_before': (timezone.now() - timedelta(days=1)).isoformat()})
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(self.url, {'deleted_by': 'not-a-uuid'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_summary_counts_items_per_model(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'summary': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], RecycleBinItem.objects.count())
+        self.assertIn({'model': 'documents.document', 'count': 12}, response.data['by_model'])
+        self.assertEqual(sum('GROUP BY' in query['sql'] for query in queries.captured_queries), 1)
+
+    def test_page_queries_do_not_grow_with_the_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, {'page_size': 2})
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url, {'page_size': 10})
+        self.assertEqual(len(small), len(large))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RawDeleteTests(TestCase):
+    def test_one_delete_without_signals(self):
+        user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000', password='pass', role='admin'
+        )
+        notifications = [Notification.objects.create(recipient=user, message=f'Note {i}') for i in range(3)]
+        with CaptureQueriesContext(connection) as queries:
+            count = raw_delete(Notification.objects.filter(pk__in=[n.pk for n in notifications[:2]]))
+        self.assertEqual(count, 2)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('DELETE'))
+        self.assertEqual(list(Notification.objects.values_list('pk', flat=True)), [notifications[2].pk])
+        # post_delete receivers (here: sync tombstones) are not run.
+        self.assertFalse(SyncTombstone.objects.exists())
+
+    def test_many_to_many_rows_are_not_orphaned(self):
+        # Group has no cascading reverse relations, only its own
+        # permissions table and users' groups table.
+        group = Group.objects.create(name='editors')
+        group.permissions.add(Permission.objects.first())
+        user = User.objects.create_user(
+            email='editor@nisria.co', full_name='Editor', phone_number='0700000001', password='pass', role='admin'
+        )
+        user.groups.add(group)
+        delete_originals(Group, [group.pk], 'default')
+        self.assertFalse(Group.objects.exists())
+        self.assertFalse(Group.permissions.through.objects.exists())
+        self.assertFalse(User.groups.through.objects.exists())
+
+
+class RecycleBinPurgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.students = [
+            EducationProgramDetail.objects.create(program=self.education, student_name=f'Student {i}')
+            for i in range(5)
+        ]
+        self.documents = [
+            Document.objects.create(
+                name=f'Report {i}', document_type='impact_report', document_format='pdf',
+                document_link='https://example.com/a.pdf', division='overall'
+            )
+            for i in range(2)
+        ]
+        EducationProgramDetail.objects.filter(pk__in=[s.pk for s in self.students[:4]]).soft_delete()
+        Document.objects.all().soft_delete()
+        self.later = timezone.now() + timedelta(days=71)
+
+    def test_purges_by_model_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = purge_expired_recycle_bin_items(now=self.later, chunk_size=3)
+        self.assertEqual(result, {
+            'purged': {'divisions.EducationProgramDetail': 4, 'documents.Document': 2},
+            'items': 6, 'failed': [], 'complete': True,
+        })
+        student_deletes = [q for q in queries.captured_queries if q['sql'].startswith('DELETE FROM "divisions_educationprogramdetail"')]
+        self.assertEqual(len(student_deletes), 2)
+        self.assertFalse(RecycleBinItem.objects.exists())
+        self.assertEqual(list(EducationProgramDetail.all_objects.values_list('pk', flat=True)), [self.students[4].pk])
+        self.assertFalse(Document.all_objects.exists())
+        # Raw deletes still leave tombstones for delta sync.
+        self.assertEqual(SyncTombstone.objects.filter(object_id__in=[str(s.pk) for s in self.students[:4]]).count(), 4)
+
+    def test_many_to_many_rows_go_with_their_record(self):
+        maintainer = User.objects.create_user(
+            email='lead@nisria.co', full_name='Lead', phone_number='0700000009', password='pass', role='admin'
+        )
+        program = Program.objects.create(
+            name='rescue', description='Rescue', division=self.education.division,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+        program.maintainers.add(maintainer)
+        Program.objects.filter(pk=program.pk).soft_delete()
+
+        result = purge_expired_recycle_bin_items(now=self.later)
+        self.assertEqual(result['failed'], [])
+        self.assertFalse(Program.all_objects.filter(pk=program.pk).exists())
+        self.assertFalse(Program.maintainers.through.objects.filter(program_id=program.pk).exists())
+
+    def test_unexpired_items_are_kept(self):
+        result = purge_expired_recycle_bin_items()
+        self.assertEqual(result['items'], 0)
+        self.assertEqual(RecycleBinItem.objects.count(), 6)
+
+    def test_rows_restored_outside_the_bin_survive(self):
+        EducationProgramDetail.all_objects.filter(pk=self.students[0].pk).update(is_deleted=False, deleted_at=None)
+        result = purge_expired_recycle_bin_items(now=self.later)
+        self.assertEqual(result['purged']['divisions.EducationProgramDetail'], 3)
+        self.assertTrue(EducationProgramDetail.objects.filter(pk=self.students[0].pk).exists())
+        self.assertFalse(RecycleBinItem.objects.exists())
+
+    def test_row_budget_leaves_the_rest_for_the_next_run(self):
+        first = purge_expired_recycle_bin_items(now=self.later, chunk_size=2, max_rows=3)
+        self.assertEqual(first['items'], 3)
+        self.assertFalse(first['complete'])
+        self.assertEqual(RecycleBinItem.objects.count(), 3)
+        second = purge_expired_recycle_bin_items(now=self.later)
+        self.assertEqual(second['items'], 3)
+        self.assertTrue(second['complete'])
+
+    def test_task_continues_when_out_of_budget(self):
+        with patch('core.tasks.purge_expired_recycle_bin_items', return_value={'purged': {}, 'items': 0, 'failed': [], 'complete': False}), \
+                patch.object(cleanup_expired_recycle_bin_items, 'apply_async') as apply_async:
+            cleanup_expired_recycle_bin_items()
+        apply_async.assert_called_once()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BulkSoftDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+
+    def setUp(self):
+        Document.objects.bulk_create([
+            Document(
+                name=f'Report {i}', document_type='impact_report', document_format='pdf',
+                document_link='https://example.com/a.pdf', division='overall'
+            )
+            for i in range(10)
+        ])
+
+    def test_queryset_delete_moves_rows_to_the_bin_in_bulk(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Document.objects.all().delete(user=self.user), (10, {'documents.Document': 10}))
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(sum(sql.startswith('INSERT INTO "core_recyclebinitem"') for sql in writes), 1)
+        self.assertEqual(sum(sql.startswith('UPDATE "documents_document"') for sql in writes), 1)
+        self.assertEqual(Document.objects.archives().count(), 10)
+        self.assertEqual(RecycleBinItem.objects.filter(deleted_by=self.user).count(), 10)
+
+    def test_restore_marks_the_bin_entries_restored(self):
+        Document.objects.all().delete(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Document.objects.archives().filter(name__lt='Report 5').restore(user=self.user), 5)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(sum(sql.startswith('UPDATE "documents_document"') for sql in updates), 1)
+        self.assertEqual(sum(sql.startswith('UPDATE "core_recyclebinitem"') for sql in updates), 1)
+        self.assertEqual(Document.objects.count(), 5)
+        restored = RecycleBinItem.objects.filter(restored_at__isnull=False)
+        self.assertEqual(restored.count(), 5)
+        self.assertEqual(set(restored.values_list('restored_by', flat=True)), {self.user.pk})
+        self.assertEqual(Document.objects.archives().restore(), 5)
+        self.assertFalse(RecycleBinItem.objects.filter(restored_at__isnull=True).exists())
+
+
+class SoftDeleteIndexTests(TestCase):
+    def test_indexes_are_generated_from_the_spec(self):
+        indexes = {tuple(index.fields): index for index in Document._meta.indexes}
+        self.assertEqual(indexes[('date_uploaded', 'id')].condition, Q(is_deleted=False))
+        self.assertEqual(indexes[('deleted_at', 'id')].condition, Q(is_deleted=True))
+        self.assertTrue(all(len(index.name) <= 30 for index in Document._meta.indexes))
+
+    def test_live_and_archive_listings_use_the_partial_indexes(self):
+        def plan(queryset):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+        live = Document.objects.order_by('-date_uploaded', '-pk')[:10]
+        self.assertIn('_live', plan(live))
+        archived = Document.all_objects.filter(is_deleted=True).order_by('-deleted_at', '-pk')[:10]
+        self.assertIn('_arch', plan(archived))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RecycleBinSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='super@nisria.co', full_name='Super Admin', phone_number='0700000001',
+            password='pass', role='super_admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.background = 'Walks two hours to school every day. ' * 100
+        self.student = EducationProgramDetail.objects.create(
+            program=self.education, student_name='Student', background=self.background
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_snapshots_round_trip_and_share_long_texts(self):
+        expected = self.student._get_serializable_data()
+        for _ in range(2):
+            EducationProgramDetail.objects.filter(pk=self.student.pk).soft_delete(self.admin)
+            EducationProgramDetail.objects.archives().filter(pk=self.student.pk).restore()
+        self.student.refresh_from_db()
+        self.student.soft_delete(self.admin)
+
+        items = list(RecycleBinItem.objects.order_by('pk'))
+        self.assertEqual(len(items), 3)
+        self.assertEqual(SnapshotBlob.objects.count(), 1)
+        self.assertEqual(items[0].original_data, expected)
+        self.assertEqual(items[2].original_data['background'], self.background)
+        self.assertLess(len(items[0].snapshot), len(self.background) // 10)
+
+    def test_listing_leaves_snapshots_out_and_preview_decodes(self):
+        self.student.soft_delete(self.admin)
+        item = RecycleBinItem.objects.get()
+        response = self.client.get(reverse('core:recycle_bin_list'))
+        self.assertNotIn('original_data', response.data['results'][0])
+        response = self.client.get(reverse('core:recycle_bin_list'), {'fields': 'id,original_data'})
+        self.assertEqual(response.data['results'][0]['original_data']['background'], self.background)
+        response = self.client.get(reverse('core:recycle_bin_detail', args=[item.pk]))
+        self.assertEqual(response.data['original_data']['student_name'], 'Student')
+
+    def test_purge_drops_texts_no_item_refers_to(self):
+        self.student.soft_delete(self.admin)
+        purge_expired_recycle_bin_items(now=timezone.now() + timedelta(days=71))
+        self.assertFalse(RecycleBinItem.objects.exists())
+        self.assertFalse(SnapshotBlob.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RecycleBinBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='super@nisria.co', full_name='Super Admin', phone_number='0700000001',
+            password='pass', role='super_admin'
+        )
+        cls.staff = User.objects.create_user(
+            email='staff@nisria.co', full_name='Staff User', phone_number='0700000002',
+            password='pass', role='admin'
+        )
+        cls.other = User.objects.create_user(
+            email='other@nisria.co', full_name='Other User', phone_number='0700000003',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def delete_records(self, count, user):
+        prefix = f'{user.full_name} {EducationProgramDetail.all_objects.count()}'
+        EducationProgramDetail.objects.bulk_create([
+            EducationProgramDetail(program=self.education, student_name=f'{prefix} {i}') for i in range(count)
+        ])
+        Document.objects.bulk_create([
+            Document(
+                name=f'{prefix} {i}', document_type='impact_report', document_format='pdf',
+                document_link='https://example.com/a.pdf', division='overall'
+            )
+            for i in range(count)
+        ])
+        EducationProgramDetail.objects.filter(student_name__startswith=prefix).delete(user=user)
+        Document.objects.filter(name__startswith=prefix).delete(user=user)
+
+    def post(self, name, data):
+        return self.client.post(reverse(f'core:{name}'), data, format='json')
+
+    def test_restore_by_filter_undoes_a_mass_deletion(self):
+        self.delete_records(3, self.staff)
+        self.delete_records(2, self.other)
+        response = self.post('recycle_bin_bulk_restore', {'filter': {'deleted_by': str(self.staff.pk)}})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data, {
+            'restored': 6, 'by_model': {'divisions.EducationProgramDetail': 3, 'documents.Document': 3}, 'missing': 0,
+        })
+        self.assertEqual(EducationProgramDetail.objects.count(), 3)
+        self.assertEqual(Document.objects.count(), 3)
+        restored = RecycleBinItem.objects.filter(restored_at__isnull=False)
+        self.assertEqual(set(restored.values_list('deleted_by', 'restored_by').distinct()), {(self.staff.pk, self.admin.pk)})
+        self.assertEqual(RecycleBinItem.objects.filter(restored_at__isnull=True).count(), 4)
+
+    def test_restore_queries_do_not_grow_with_items(self):
+        self.delete_records(2, self.staff)
+        with CaptureQueriesContext(connection) as small:
+            self.post('recycle_bin_bulk_restore', {'filter': {'model': 'document,educationprogramdetail'}})
+        self.delete_records(20, self.staff)
+        with CaptureQueriesContext(connection) as large:
+            self.post('recycle_bin_bulk_restore', {'filter': {'model': 'document,educationprogramdetail'}})
+        self.assertEqual(len(small), len(large))
+
+    def test_delete_by_ids_removes_records_and_items(self):
+        self.delete_records(3, self.staff)
+        ids = list(RecycleBinItem.objects.values_list('pk', flat=True)[:4])
+        response = self.post('recycle_bin_bulk_delete', {'ids': ids})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['deleted'], 4)
+        self.assertEqual(sum(response.data['by_model'].values()), 4)
+        self.assertEqual(RecycleBinItem.objects.count(), 2)
+        self.assertEqual(EducationProgramDetail.all_objects.count() + Document.all_objects.count(), 2)
+
+    def test_invalid_selections_are_rejected(self):
+        self.assertEqual(self.post('recycle_bin_bulk_delete', {'ids': ['1']}).status_code, 400)
+        self.assertEqual(self.post('recycle_bin_bulk_delete', {'filter': {'deleted_bye': 'x'}}).status_code, 400)
+        self.assertEqual(self.post('recycle_bin_bulk_restore', {}).status_code, 400)
+        self.client.force_authenticate(user=self.staff)
+        self.assertEqual(self.post('recycle_bin_bulk_restore', {'ids': [1]}).status_code, 403)
@@ -5,6 +5,9 @@ app_name = 'core'
 
 urlpatterns = [
     path('recycle-bin/', views.recycle_bin_list_view, name='recycle_bin_list'),
+    path('recycle-bin/bulk-restore/', views.recycle_bin_bulk_restore_view, name='recycle_bin_bulk_restore'),
+    path('recycle-bin/bulk-delete/', views.recycle_bin_bulk_delete_view, name='recycle_bin_bulk_delete'),
+    path('recycle-bin/<int:pk>/', views.recycle_bin_detail_view, name='recycle_bin_detail'),
     path('recycle-bin/<int:pk>/restore/', views.recycle_bin_restore_view, name='recycle_bin_restore'),
     path('recycle-bin/<int:pk>/delete/', views.recycle_bin_permanently_delete_view, name='recycle_bin_permanently_delete'),
 ]
\ No newline at end of file
@@ -6,11 +6,43 @@ from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
 
 from .models import RecycleBinItem
 from .serializers import RecycleBinItemSerializer # You'll need to create this
+from .filters import RecycleBinItemFilter
+from .fieldsets import project, sparse_fieldset
+from .pagination import StandardResultsSetPagination
+from .recycle_bin import delete_bin_items_permanently, restore_bin_items
 from accounts.permissions import IsSuperAdmin # Assuming you have this permission class
 
+
+class RecycleBinPagination(StandardResultsSetPagination):
+    """ Newest deletions first, by keyset on (deleted_at, id); the bin only grows, so no OFFSET. """
+    page_size = 50
+    max_page_size = 200
+    keyset_by_default = True
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Lists the items in the recycle bin (not restored, not expired), newest first, 50 per page; follow 'next' for more. "
+        "Items come without original_data unless it is named in 'fields'. "
+        "With summary=true, returns the number of items per model instead."
+    ),
+    manual_parameters=[
+        openapi.Parameter('model', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Model name, e.g. 'grant' or 'grants.grant'; comma separated for several."),
+        openapi.Parameter('deleted_by', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID, description="Id of the user who deleted the items."),
+        openapi.Parameter('deleted_after', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+        openapi.Parameter('deleted_before', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+        openapi.Parameter('summary', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description="Return counts per model."),
+        openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+    ],
+    responses={200: RecycleBinItemSerializer(many=True), 400: 'Invalid filter'}
+)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsSuperAdmin])
 def recycle_bin_list_view(request):
@@ -18,9 +50,48 @@ def recycle_bin_list_view(request):
     Lists all items currently in the recycle bin (not permanently deleted or restored).
     """
     items = RecycleBinItem.objects.filter(restored_at__isnull=True, expires_at__gt=timezone.now())
-    serializer = RecycleBinItemSerializer(items, many=True, context={'request': request})
+    filterset = RecycleBinItemFilter(request.query_params, queryset=items)
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+    items = filterset.qs
+
+    if request.query_params.get('summary', 'false').lower() == 'true':
+        counts = list(
+            items.order_by().values('content_type__app_label', 'content_type__model')
+            .annotate(count=Count('id')).order_by('-count', 'content_type__model')
+        )
+        return Response({
+            'total': sum(row['count'] for row in counts),
+            'by_model': [
+                {'model': f"{row['content_type__app_label']}.{row['content_type__model']}", 'count': row['count']}
+                for row in counts
+            ],
+        })
+
+    items = items.select_related('content_type', 'deleted_by')
+    items, fields = sparse_fieldset(request, items, RecycleBinItemSerializer)
+    if fields is None:
+        # Snapshots are only decoded for a preview or when asked for.
+        fields = [name for name in RecycleBinItemSerializer().fields if name != 'original_data']
+        items = project(items, RecycleBinItemSerializer(), fields)
+    elif 'original_data' in fields:
+        items = items.prefetch_related('blobs')
+    paginator = RecycleBinPagination(ordering_field='deleted_at')
+    page = paginator.paginate_queryset(items, request)
+    serializer = RecycleBinItemSerializer(page, many=True, context={'request': request}, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def recycle_bin_detail_view(request, pk):
+    """
+    Previews one item of the recycle bin, with the data of the deleted record.
+    """
+    item = get_object_or_404(RecycleBinItem.objects.select_related('content_type', 'deleted_by'), pk=pk)
+    serializer = RecycleBinItemSerializer(item, context={'request': request})
     return Response(serializer.data)
 
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsSuperAdmin])
 def recycle_bin_restore_view(request, pk):
@@ -37,10 +108,7 @@ def recycle_bin_restore_view(request, pk):
         )
 
     if hasattr(original_object, 'restore'):
-        original_object.restore() # This sets is_deleted=False on the original model
-        item.restored_at = timezone.now()
-        item.restored_by = request.user
-        item.save(update_fields=['restored_at', 'restored_by'])
+        original_object.restore(user=request.user) # Sets is_deleted=False and marks this bin item restored
         return Response({"message": f"Item (ID: {item.actual_object_id}) of type '{item.content_type.model}' restored successfully."})
     
     return Response({"error": "Restore functionality not implemented for this model type."}, status=status.HTTP_400_BAD_REQUEST)
@@ -65,3 +133,78 @@ def recycle_bin_permanently_delete_view(request, pk):
     item.delete() 
     return Response(status=status.HTTP_204_NO_CONTENT)
 
+
+
+# --- BULK RESTORE / BULK PERMANENT DELETE ---
+
+MAX_BULK_IDS = 1000
+
+
+def _bin_selection(request, items):
+    """
+    Narrows `items` to the bin items a bulk request targets: either
+    {"ids": [...]} or {"filter": {...}} with the listing's filter
+    parameters. Returns (queryset, error_response).
+    """
+    ids = request.data.get('ids')
+    filters = request.data.get('filter')
+    if ids is not None and filters is not None:
+        return None, Response({"error": "Provide either 'ids' or 'filter', not both."}, status=status.HTTP_400_BAD_REQUEST)
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            return None, Response({"error": "'ids' must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MAX_BULK_IDS:
+            return None, Response({"error": f"At most {MAX_BULK_IDS} ids per request; use 'filter' for larger sets."}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(value, int) and not isinstance(value, bool) for value in ids):
+            return None, Response({"error": "'ids' must be recycle bin item ids (integers)."}, status=status.HTTP_400_BAD_REQUEST)
+        return items.filter(pk__in=ids), None
+
+    if not isinstance(filters, dict) or not filters:
+        return None, Response({"error": "Provide a non-empty list of 'ids' or a non-empty 'filter'."}, status=status.HTTP_400_BAD_REQUEST)
+    filterset = RecycleBinItemFilter(filters, queryset=items)
+    # A misspelt parameter would otherwise be ignored and select the whole bin.
+    unknown = sorted(set(filters) - set(filterset.filters))
+    if unknown:
+        return None, Response({"error": f"Unknown filter parameters: {', '.join(unknown)}."}, status=status.HTTP_400_BAD_REQUEST)
+    if not filterset.is_valid():
+        return None, Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+    return filterset.qs, None
+
+
+_bin_selection_body = openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+    'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+    'filter': openapi.Schema(type=openapi.TYPE_OBJECT, description="Filter parameters of the recycle bin listing: model, deleted_by, deleted_after, deleted_before."),
+})
+
+
+@swagger_auto_schema(
+    method='post',
+    operation_description="Restores many recycle bin items at once, selected by 'ids' or 'filter'. Expired items are left out.",
+    request_body=_bin_selection_body,
+    responses={200: openapi.Response("Rows restored", examples={"application/json": {"restored": 12, "by_model": {"grants.Grant": 12}, "missing": 0}}), 400: 'Bad Request'}
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def recycle_bin_bulk_restore_view(request):
+    items = RecycleBinItem.objects.filter(restored_at__isnull=True, expires_at__gt=timezone.now())
+    items, error = _bin_selection(request, items)
+    if error:
+        return error
+    return Response(restore_bin_items(items, request.user))
+
+
+@swagger_auto_schema(
+    method='post',
+    operation_description="Permanently deletes many recycle bin items and their records at once, selected by 'ids' or 'filter'.",
+    request_body=_bin_selection_body,
+    responses={200: openapi.Response("Items deleted", examples={"application/json": {"deleted": 12, "by_model": {"grants.Grant": 12}}}), 400: 'Bad Request'}
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsSuperAdmin])
+def recycle_bin_bulk_delete_view(request):
+    items = RecycleBinItem.objects.filter(restored_at__isnull=True)
+    items, error = _bin_selection(request, items)
+    if error:
+        return error
+    return Response(delete_bin_items_permanently(items))
@@ -0,0 +1,219 @@
+"""
+Batched upserts of program details for clients that work offline.
+
+A batch is a list of items, each a create or an update of one program
+detail of any type:
+
+    {"type": "rescue", "id": "<uuid>", "base_version": "<updated_at>", "data": {...}}
+
+An item without base_version is a create; its optional id lets clients
+choose the primary key, so a batch replayed after a lost response reports
+"exists" conflicts instead of making duplicates. Trainee creates carry a
+"trainer" id. An item with base_version is a partial update, applied
+only if the row's updated_at still equals base_version; otherwise the
+item is reported as a conflict with the current row, for the client to
+merge. Invalid items and conflicts do not stop the rest of the batch.
+
+Items are grouped by type. Each type costs one locking read of the rows
+it updates, one query per unique field, one bulk_create and one
+bulk_update, all in one transaction. A constraint violation that slips
+past the checks (a concurrent write) sends that type's writes row by row,
+like the importer does.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.signals import bulk_created, pre_bulk_update, post_bulk_update
+
+from .imports import IMPORT_TYPES, _row_serializer, _unique_fields
+from .models import VocationalTrainingProgramTrainerDetail
+
+MAX_BATCH_ITEMS = 1000
+
+
+class BatchItemSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=list(IMPORT_TYPES))
+    id = serializers.UUIDField(required=False)
+    base_version = serializers.DateTimeField(required=False)
+    trainer = serializers.UUIDField(required=False)
+    data = serializers.DictField()
+
+    def validate(self, attrs):
+        if 'base_version' in attrs and 'id' not in attrs:
+            raise serializers.ValidationError({'id': ["Updates need the id of the record."]})
+        return attrs
+
+
+class BatchUpsert:
+    """ Applies one batch for `user`; results are reported per item, in order. """
+
+    def __init__(self, user, context=None):
+        self.user = user
+        self.context = context or {}
+        self.now = timezone.now()
+        self.results = {}
+
+    def invalid(self, index, errors):
+        self.results[index] = {"index": index, "status": "invalid", "errors": errors}
+
+    def conflict(self, index, pk, reason, current=None):
+        self.results[index] = {"index": index, "status": "conflict", "id": pk, "reason": reason, "current": current}
+
+    def applied(self, index, status, obj):
+        self.results[index] = {"index": index, "status": status, "id": obj.pk, "version": obj.updated_at}
+
+    def run(self, items, resolve_program):
+        """
+        `items` are the raw items; `resolve_program(type)` returns the
+        Program the type belongs to in this division, or raises
+        serializers.ValidationError. Returns the list of item results.
+        """
+        groups = defaultdict(list)
+        programs = {}
+        for index, raw in enumerate(items):
+            item = BatchItemSerializer(data=raw)
+            if not item.is_valid():
+                self.invalid(index, item.errors)
+                continue
+            program_type = item.validated_data['type']
+            if program_type not in programs:
+                try:
+                    programs[program_type] = resolve_program(program_type)
+                except serializers.ValidationError as exc:
+                    programs[program_type] = exc
+            if isinstance(programs[program_type], serializers.ValidationError):
+                self.invalid(index, programs[program_type].detail)
+                continue
+            groups[program_type].append((index, item.validated_data))
+
+        with transaction.atomic():
+            for program_type, group in groups.items():
+                self.apply(IMPORT_TYPES[program_type], programs[program_type], group)
+        return [self.results[index] for index in range(len(items))]
+
+    def current(self, config, obj):
+        return config["serializer"](obj, context=self.context).data
+
+    def apply(self, config, program, group):
+        model = config["model"]
+        trainee = config["parent_field"] == "trainer"
+        ids = [item['id'] for _, item in group if 'id' in item]
+        existing = model.all_objects.select_for_update(of=('self',)).select_related(
+            'trainer' if trainee else 'program'
+        ).in_bulk(ids) if ids else {}
+        trainers = set()
+        if trainee:
+            trainer_ids = [item['trainer'] for _, item in group if 'trainer' in item]
+            trainers = set(VocationalTrainingProgramTrainerDetail.objects.filter(
+                program=program, pk__in=trainer_ids
+            ).values_list('pk', flat=True)) if trainer_ids else set()
+
+        create_serializer = _row_serializer(config)
+        update_serializer = _row_serializer(config, partial=True)
+        creates, updates = [], []
+        for index, item in group:
+            obj = existing.get(item.get('id'))
+            if obj is not None:
+                in_program = (obj.trainer.program_id if trainee else obj.program_id) == program.pk
+            if 'base_version' not in item:
+                if obj is not None:
+                    self.conflict(index, obj.pk, "exists", self.current(config, obj) if in_program and not obj.is_deleted else None)
+                    continue
+                try:
+                    data = create_serializer.run_validation(item['data'])
+                except serializers.ValidationError as exc:
+                    self.invalid(index, exc.detail)
+                    continue
+                if trainee:
+                    if item.get('trainer') not in trainers:
+                        self.invalid(index, {"trainer": ["A trainer of this program is required."]})
+                        continue
+                    parent = {"trainer_id": item['trainer']}
+                else:
+                    parent = {"program": program}
+                fields = {"id": item['id']} if 'id' in item else {}
+                creates.append((index, model(**fields, **data, **parent, created_by=self.user, updated_by=self.user), data))
+                continue
+
+            if obj is None or not in_program or obj.is_deleted:
+                self.conflict(index, item['id'], "deleted")
+                continue
+            if obj.updated_at != item['base_version']:
+                self.conflict(index, obj.pk, "modified", self.current(config, obj))
+                continue
+            try:
+                data = update_serializer.run_validation(item['data'])
+            except serializers.ValidationError as exc:
+                self.invalid(index, exc.detail)
+                continue
+            for name, value in data.items():
+                setattr(obj, name, value)
+            # Later items for the same row now conflict, as they were based on the old version.
+            obj.updated_at = self.now
+            obj.updated_by = self.user
+            updates.append((index, obj, data))
+
+        pending = self.check_unique(model, creates + updates)
+        self.write_creates(model, [entry for entry in creates if entry[0] in pending])
+        self.write_updates(model, [entry for entry in updates if entry[0] in pending])
+
+    def check_unique(self, model, entries):
+        """ Returns the indexes of `entries` whose unique values are free; the others are reported invalid. """
+        pending = {index for index, _, _ in entries}
+        for name in _unique_fields(model):
+            claims = [(index, obj.pk, data[name]) for index, obj, data in entries if index in pending and data.get(name) is not None]
+            if not claims:
+                continue
+            owners = dict(model.all_objects.filter(**{f"{name}__in": [value for _, _, value in claims]}).values_list(name, 'pk'))
+            for index, pk, value in claims:
+                if owners.setdefault(value, pk) != pk:
+                    self.invalid(index, {name: [f"A record with this {name.replace('_', ' ')} already exists."]})
+                    pending.discard(index)
+        return pending
+
+    def write_creates(self, model, creates):
+        if not creates:
+            return
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([obj for _, obj, _ in creates])
+                bulk_created.send(sender=model, pks=[obj.pk for _, obj, _ in creates])
+        except IntegrityError:
+            for index, obj, _ in creates:
+                try:
+                    with transaction.atomic():
+                        model.objects.bulk_create([obj])
+                        bulk_created.send(sender=model, pks=[obj.pk])
+                except IntegrityError as exc:
+                    self.invalid(index, {"non_field_errors": [str(exc)]})
+                    continue
+                self.applied(index, "created", obj)
+            return
+        for index, obj, _ in creates:
+            self.applied(index, "created", obj)
+
+    def write_updates(self, model, updates):
+        if not updates:
+            return
+        fields = sorted({name for _, _, data in updates for name in data} | {'updated_at', 'updated_by'})
+        pks = [obj.pk for _, obj, _ in updates]
+        try:
+            with transaction.atomic():
+                pre_bulk_update.send(sender=model, pks=pks, fields=fields)
+                model.all_objects.bulk_update([obj for _, obj, _ in updates], fields)
+                post_bulk_update.send(sender=model, pks=pks, fields=fields)
+        except IntegrityError:
+            for index, obj, data in updates:
+                try:
+                    with transaction.atomic():
+                        obj.save(update_fields=[*data, 'updated_at', 'updated_by'])
+                except IntegrityError as exc:
+                    self.invalid(index, {"non_field_errors": [str(exc)]})
+                    continue
+                self.applied(index, "updated", obj)
+            return
+        for index, obj, _ in updates:
+            self.applied(index, "updated", obj)
@@ -0,0 +1,148 @@
+import csv
+import datetime
+import json
+import re
+import tempfile
+import uuid
+from decimal import Decimal
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_FORMATS = ('csv', 'xlsx', 'ndjson')
+EXPORT_CHUNK_SIZE = 2000
+
+# Internal bookkeeping and binary columns stay out of exports.
+EXCLUDED_EXPORT_FIELDS = {'is_deleted', 'deleted_at', 'pictures', 'pictures_upload', 'pictures_variants'}
+# Foreign keys are exported by a readable column instead of their id.
+RELATED_EXPORT_COLUMNS = {
+    'program': 'program__name',
+    'trainer': 'trainer__trainer_name',
+    'created_by': 'created_by__full_name',
+    'updated_by': 'updated_by__full_name',
+}
+# Text starting with one of these is run as a formula by spreadsheet apps.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# ...unless it is a plain number or phone number like "+254 700 000000".
+PLAIN_NUMBER = re.compile(r'^[+-]?[\d\s().]+$')
+
+
+def export_columns(model):
+    """ The values_list() lookups exported for a program detail model, in field order. """
+    columns = []
+    for field in model._meta.concrete_fields:
+        if field.name in EXCLUDED_EXPORT_FIELDS:
+            continue
+        if field.is_relation:
+            lookup = RELATED_EXPORT_COLUMNS.get(field.name)
+            if lookup:
+                columns.append(lookup)
+            continue
+        columns.append(field.name)
+    return columns
+
+
+def is_formula(value):
+    """ Whether a spreadsheet would run `value` as a formula. """
+    return isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not PLAIN_NUMBER.match(value)
+
+
+def _escape_formula(value):
+    """ Prefixes text a spreadsheet would evaluate with a quote; numbers and dates keep their value. """
+    if is_formula(value):
+        return "'" + value
+    return value
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, (datetime.date, uuid.UUID, Decimal)):
+        return str(value)
+    return value
+
+
+def _excel(sheet, value):
+    from openpyxl.cell import WriteOnlyCell
+
+    # Excel has no time zones; write local wall-clock time.
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    if is_formula(value):
+        # Stored as text, and kept text if the cell is edited, without
+        # changing the value the way a leading quote in CSV does.
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.data_type = 's'
+        cell.quotePrefix = True
+        return cell
+    return value
+
+
+class _Echo:
+    """ A file-like object whose write() hands the line back to the csv writer's caller. """
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_text(_escape_formula(value)) for value in row])
+
+
+def _ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, (_text(value) for value in row)))) + '\n'
+
+
+def _xlsx_file(columns, rows):
+    """
+    Writes the workbook in openpyxl's write-only mode, which flushes rows to
+    a temporary file instead of keeping cells in memory. XLSX is a zip whose
+    index comes last, so it can only be sent once complete.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([_excel(sheet, value) for value in row])
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def export_response(queryset, file_format, filename):
+    """
+    Returns a response exporting every row of `queryset` in `file_format`.
+
+    Rows are read as values_list() tuples through iterator(chunk_size=...),
+    so memory stays flat however many rows there are (a server-side cursor on
+    Postgres). CSV and NDJSON are streamed as they are read; XLSX is spooled
+    to a temporary file first.
+    """
+    columns = export_columns(queryset.model)
+    if not queryset.query.order_by:
+        queryset = queryset.order_by('-created_at', 'pk')
+    rows = queryset.values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    if file_format == 'xlsx':
+        return FileResponse(
+            _xlsx_file(columns, rows), as_attachment=True, filename=f"{filename}.xlsx",
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+    if file_format == 'ndjson':
+        response = StreamingHttpResponse(_ndjson_lines(columns, rows), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(_csv_lines(columns, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
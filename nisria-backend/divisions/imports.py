@@ -0,0 +1,276 @@
+import csv
+import datetime
+import io
+import logging
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+
+from core.signals import bulk_created
+
+from .exports import is_formula
+from .models import (
+    BeneficiaryImport,
+    EducationProgramDetail, MicroFundProgramDetail, RescueProgramDetail,
+    VocationalTrainingProgramTrainerDetail, VocationalTrainingProgramTraineeDetail
+)
+from .serializers import (
+    EducationProgramDetailSerializer,
+    MicroFundProgramDetailSerializer,
+    RescueProgramDetailSerializer,
+    VocationalTrainingProgramTrainerDetailSerializer,
+    VocationalTrainingProgramTraineeDetailSerializer
+)
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 500
+MAX_IMPORT_FILE_SIZE = 10 * 1024 * 1024
+# Enough to fix a file by; the counts always cover every row.
+MAX_REPORTED_ERRORS = 1000
+
+# Keys match PROGRAM_DETAIL_METADATA in views.py. The parent (program or
+# trainer) comes from the URL, so it is not read from the file.
+IMPORT_TYPES = {
+    "education": {"model": EducationProgramDetail, "serializer": EducationProgramDetailSerializer, "parent_field": "program_id"},
+    "microfund": {"model": MicroFundProgramDetail, "serializer": MicroFundProgramDetailSerializer, "parent_field": "program_id"},
+    "rescue": {"model": RescueProgramDetail, "serializer": RescueProgramDetailSerializer, "parent_field": "program_id"},
+    "vocational-trainer": {"model": VocationalTrainingProgramTrainerDetail, "serializer": VocationalTrainingProgramTrainerDetailSerializer, "parent_field": "program_id"},
+    "vocational": {"model": VocationalTrainingProgramTraineeDetail, "serializer": VocationalTrainingProgramTraineeDetailSerializer, "parent_field": "trainer"},
+}
+
+# Columns that cannot come from a spreadsheet.
+EXCLUDED_FIELDS = ['pictures']
+
+
+class ImportFileError(Exception):
+    """ The file as a whole cannot be read. """
+
+
+def _normalize_header(value):
+    return str(value or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _clean_cell(value):
+    """
+    Blank cells are left out so field defaults and `required` apply. The
+    quote exports put before formula-like text is taken off again.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat() if value.time() == datetime.time() else value.isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith("'") and is_formula(value[1:]):
+            value = value[1:]
+        return value or None
+    return value
+
+
+def _rows_from_table(header, records):
+    names = [_normalize_header(name) for name in header]
+    rows = []
+    for record in records:
+        row = {}
+        for name, value in zip(names, record):
+            value = _clean_cell(value)
+            if name and value is not None:
+                row[name] = value
+        rows.append(row)
+    # Trailing blank lines are common in exported spreadsheets.
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+def read_rows(file_name, content):
+    """ Parses a CSV or XLSX file into a list of {column: value} dicts, one per data row. """
+    if file_name.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ImportFileError("XLSX imports need the openpyxl package on the worker; upload a CSV instead.")
+        try:
+            workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        except Exception as exc:
+            raise ImportFileError(f"Could not read the XLSX file: {exc}")
+        records = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(records, None)
+        if not header:
+            raise ImportFileError("The file is empty.")
+        rows = _rows_from_table(header, records)
+        workbook.close()
+        return rows
+
+    if file_name.lower().endswith('.csv'):
+        try:
+            text = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ImportFileError("CSV files must be UTF-8 encoded.")
+        reader = csv.reader(io.StringIO(text))
+        header = next(reader, None)
+        if not header:
+            raise ImportFileError("The file is empty.")
+        return _rows_from_table(header, reader)
+
+    raise ImportFileError("Only .csv and .xlsx files can be imported.")
+
+
+def _row_serializer(config, partial=False):
+    """
+    One serializer instance validates every row (fields are built once).
+
+    The parent field and uniqueness validators are removed: the parent is
+    set from the import and uniqueness is checked per chunk in one query.
+    With partial=True, rows are validated as partial updates.
+    """
+    serializer = config["serializer"](partial=partial)
+    fields = serializer.fields
+    for name in [config["parent_field"], *EXCLUDED_FIELDS]:
+        fields.pop(name, None)
+    for field in fields.values():
+        field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+    return serializer
+
+
+def _unique_fields(model):
+    return [
+        field.name for field in model._meta.fields
+        if field.unique and not field.primary_key
+    ]
+
+
+class ImportRun:
+    """ Validates and inserts the rows of one BeneficiaryImport, chunk by chunk. """
+
+    def __init__(self, job):
+        self.job = job
+        self.config = IMPORT_TYPES[job.program_type]
+        self.model = self.config["model"]
+        self.serializer = _row_serializer(self.config)
+        self.unique_fields = _unique_fields(self.model)
+        self.seen = {name: set() for name in self.unique_fields}
+        if self.config["parent_field"] == "trainer":
+            self.parent = {"trainer_id": job.trainer_id}
+        else:
+            self.parent = {"program_id": job.program_id}
+        self.errors = []
+        self.created = 0
+        self.failed = 0
+
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "errors": errors})
+
+    def validate_chunk(self, numbered_rows):
+        """ Returns [(row_number, validated_data)] for the rows that pass. """
+        valid = []
+        for row_number, row in numbered_rows:
+            try:
+                valid.append((row_number, self.serializer.run_validation(row)))
+            except serializers.ValidationError as exc:
+                self.add_error(row_number, exc.detail)
+
+        # Uniqueness: against the table (soft-deleted rows included, as the
+        # database constraint is) and against earlier rows of the file.
+        for name in self.unique_fields:
+            values = [data[name] for _, data in valid if data.get(name) is not None]
+            taken = set(
+                self.model.all_objects.filter(**{f"{name}__in": values}).values_list(name, flat=True)
+            ) if values else set()
+            passing = []
+            for row_number, data in valid:
+                value = data.get(name)
+                if value in taken or value in self.seen[name]:
+                    self.add_error(row_number, {name: [f"A record with this {name.replace('_', ' ')} already exists."]})
+                    continue
+                if value is not None:
+                    self.seen[name].add(value)
+                passing.append((row_number, data))
+            valid = passing
+        return valid
+
+    def build(self, data):
+        user = self.job.created_by
+        return self.model(**data, **self.parent, created_by=user, updated_by=user)
+
+    def insert(self, valid):
+        objects = [self.build(data) for _, data in valid]
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create(objects)
+                bulk_created.send(sender=self.model, pks=[obj.pk for obj in objects])
+            self.created += len(objects)
+            return
+        except IntegrityError:
+            logger.warning(f"Bulk insert for import {self.job.pk} hit a constraint; retrying the chunk row by row.")
+
+        # A concurrent write took one of the values; find which rows still fit.
+        for row_number, data in valid:
+            obj = self.build(data)
+            try:
+                with transaction.atomic():
+                    self.model.objects.bulk_create([obj])
+                    bulk_created.send(sender=self.model, pks=[obj.pk])
+                self.created += 1
+            except IntegrityError as exc:
+                self.add_error(row_number, {"non_field_errors": [str(exc)]})
+
+    def run(self, rows):
+        numbered = ((index + 2, row) for index, row in enumerate(rows))  # Row 1 is the header
+        processed = 0
+        while True:
+            chunk = list(islice(numbered, IMPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            valid = self.validate_chunk(chunk)
+            if valid:
+                self.insert(valid)
+            processed += len(chunk)
+            BeneficiaryImport.objects.filter(pk=self.job.pk).update(
+                processed_rows=processed, created_rows=self.created, failed_rows=self.failed,
+            )
+
+
+def run_import(job):
+    """
+    Processes a BeneficiaryImport claimed by process_beneficiary_import.
+    Progress is written after every chunk so clients can poll the job; the
+    stored file is dropped when done.
+    """
+    try:
+        rows = read_rows(job.file_name, bytes(job.file_content or b''))
+    except ImportFileError as exc:
+        job.status = 'failed'
+        job.message = str(exc)
+    else:
+        BeneficiaryImport.objects.filter(pk=job.pk).update(total_rows=len(rows))
+        job.total_rows = len(rows)
+        run = ImportRun(job)
+        try:
+            run.run(rows)
+        except Exception:
+            logger.exception(f"Import {job.pk} stopped unexpectedly.")
+            job.status = 'failed'
+            job.message = "The import stopped unexpectedly; rows reported as created were saved."
+            job.processed_rows = BeneficiaryImport.objects.values_list('processed_rows', flat=True).get(pk=job.pk)
+        else:
+            job.status = 'completed'
+            job.processed_rows = len(rows)
+        job.created_rows = run.created
+        job.failed_rows = run.failed
+        job.errors = run.errors
+
+    job.file_content = None
+    job.finished_at = timezone.now()
+    job.save()
+    return job
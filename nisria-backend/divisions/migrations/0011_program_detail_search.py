@@ -0,0 +1,133 @@
+from django.db import migrations
+
+# The search indexes as of this migration (divisions.search.SEARCH_INDEXES):
+# (name, table, {weight: [columns]}).
+SEARCH_INDEXES = [
+    ('education', 'divisions_educationprogramdetail', {
+        'A': ['student_name'],
+        'B': ['guardian_name', 'school'],
+        'C': ['grade', 'address'],
+        'D': ['background'],
+    }),
+    ('microfund', 'divisions_microfundprogramdetail', {
+        'A': ['person_name'],
+        'B': ['chama_group', 'location'],
+        'C': ['project_done'],
+        'D': ['story', 'background'],
+    }),
+    ('rescue', 'divisions_rescueprogramdetail', {
+        'A': ['child_name', 'ob_number'],
+        'B': ['case_referred_from', 'location_of_rescue'],
+        'D': ['background'],
+    }),
+    ('trainee', 'divisions_vocationaltrainingprogramtraineedetail', {
+        'A': ['trainee_name', 'trainee_email'],
+        'B': ['training_received'],
+        'D': ['background', 'testimonial'],
+    }),
+    ('trainer', 'divisions_vocationaltrainingprogramtrainerdetail', {
+        'A': ['trainer_name', 'trainer_email'],
+        'B': ['trainer_association'],
+    }),
+]
+
+
+def _fields(weights):
+    return [field for weight in sorted(weights) for field in weights[weight]]
+
+
+def _tsvector_sql(weights, row):
+    return ' || '.join(
+        f"setweight(to_tsvector('simple', coalesce({row}.\"{field}\", '')), '{weight}')"
+        for weight in sorted(weights) for field in weights[weight]
+    )
+
+
+def postgres_install_sql(name, db_table, weights):
+    function = f"divisions_{name}_search_update"
+    table = f'"{db_table}"'
+    columns = ', '.join(f'"{field}"' for field in _fields(weights))
+    return [
+        f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector',
+        f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {_tsvector_sql(weights, 'NEW')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f'DROP TRIGGER IF EXISTS {function} ON {table}',
+        f'CREATE TRIGGER {function} BEFORE INSERT OR UPDATE OF {columns} ON {table} '
+        f'FOR EACH ROW EXECUTE FUNCTION {function}()',
+        f'UPDATE {table} SET search_vector = {_tsvector_sql(weights, table)}',
+        f'CREATE INDEX IF NOT EXISTS divisions_{name}_search_gin ON {table} USING gin (search_vector)',
+    ]
+
+
+def postgres_uninstall_sql(name, db_table, weights):
+    function = f"divisions_{name}_search_update"
+    return [
+        f'DROP TRIGGER IF EXISTS {function} ON "{db_table}"',
+        f'DROP FUNCTION IF EXISTS {function}()',
+        f'DROP INDEX IF EXISTS divisions_{name}_search_gin',
+        f'ALTER TABLE "{db_table}" DROP COLUMN IF EXISTS search_vector',
+    ]
+
+
+def sqlite_install_sql(name, db_table, weights):
+    fts = f"divisions_{name}_fts"
+    fields = _fields(weights)
+    columns = ', '.join(f'"{field}"' for field in fields)
+    new_values = ', '.join(f'new."{field}"' for field in fields)
+    insert = f'INSERT INTO {fts} (id, {columns}) VALUES (new.id, {new_values});'
+    delete = f'DELETE FROM {fts} WHERE id = old.id;'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"id UNINDEXED, {columns}, tokenize='unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON "{db_table}" BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON "{db_table}" BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON "{db_table}" BEGIN {delete} {insert} END',
+        f'DELETE FROM {fts}',
+        f'INSERT INTO {fts} (id, {columns}) SELECT id, {columns} FROM "{db_table}"',
+    ]
+
+
+def sqlite_uninstall_sql(name, db_table, weights):
+    fts = f"divisions_{name}_fts"
+    return [f'DROP TRIGGER IF EXISTS {fts}_{suffix}' for suffix in ('ai', 'ad', 'au')] + [f'DROP TABLE IF EXISTS {fts}']
+
+
+INSTALL_SQL = {'postgresql': postgres_install_sql, 'sqlite': sqlite_install_sql}
+UNINSTALL_SQL = {'postgresql': postgres_uninstall_sql, 'sqlite': sqlite_uninstall_sql}
+
+
+def install_search_indexes(apps, schema_editor):
+    build = INSTALL_SQL.get(schema_editor.connection.vendor)
+    for index in SEARCH_INDEXES if build else ():
+        for sql in build(*index):
+            schema_editor.execute(sql, params=None)
+
+
+def uninstall_search_indexes(apps, schema_editor):
+    build = UNINSTALL_SQL.get(schema_editor.connection.vendor)
+    for index in SEARCH_INDEXES if build else ():
+        for sql in build(*index):
+            schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text search indexes for program details (see divisions.search):
+    tsvector column + trigger + GIN index on Postgres, FTS5 tables + triggers
+    on SQLite. No model state changes. The SQL is frozen here as it was when
+    the migration was written.
+    """
+
+    dependencies = [
+        ('divisions', '0010_alter_microfundprogramdetail_role_in_group'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_indexes, uninstall_search_indexes),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0011_program_detail_search'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='division',
+            options={'get_latest_by': 'date_created'},
+        ),
+        migrations.AlterModelOptions(
+            name='program',
+            options={'get_latest_by': 'date_created'},
+        ),
+        migrations.AddIndex(
+            model_name='educationprogramdetail',
+            index=models.Index(fields=['program', 'created_at', 'id'], name='education_program_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='microfundprogramdetail',
+            index=models.Index(fields=['program', 'created_at', 'id'], name='microfund_program_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rescueprogramdetail',
+            index=models.Index(fields=['program', 'created_at', 'id'], name='rescue_program_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            index=models.Index(fields=['created_at', 'id'], name='trainee_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            index=models.Index(fields=['trainer', 'created_at', 'id'], name='trainee_trainer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtrainerdetail',
+            index=models.Index(fields=['program', 'created_at', 'id'], name='trainer_program_created_idx'),
+        ),
+    ]
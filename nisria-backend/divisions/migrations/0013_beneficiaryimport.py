@@ -0,0 +1,42 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('divisions', '0012_alter_division_options_alter_program_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BeneficiaryImport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('program_type', models.CharField(help_text="PROGRAM_DETAIL_METADATA key, e.g. 'education'.", max_length=50)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_content', models.BinaryField(blank=True, help_text='Cleared once processed.', null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_rows', models.PositiveIntegerField(default=0)),
+                ('processed_rows', models.PositiveIntegerField(default=0)),
+                ('created_rows', models.PositiveIntegerField(default=0)),
+                ('failed_rows', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list, help_text="[{'row': n, 'errors': {...}}] for rejected rows.")),
+                ('message', models.TextField(blank=True, default='', help_text='File-level error, if the import failed.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='beneficiary_imports', to=settings.AUTH_USER_MODEL)),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imports', to='divisions.program')),
+                ('trainer', models.ForeignKey(blank=True, help_text='Set for trainee imports.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='imports', to='divisions.vocationaltrainingprogramtrainerdetail')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
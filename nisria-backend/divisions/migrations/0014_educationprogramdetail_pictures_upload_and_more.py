@@ -0,0 +1,73 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+# The SQLite full-text tables as of this migration (divisions.search):
+# (FTS table, source table, columns).
+SEARCH_TABLES = [
+    ('divisions_education_fts', 'divisions_educationprogramdetail',
+     ['student_name', 'guardian_name', 'school', 'grade', 'address', 'background']),
+    ('divisions_microfund_fts', 'divisions_microfundprogramdetail',
+     ['person_name', 'chama_group', 'location', 'project_done', 'story', 'background']),
+    ('divisions_rescue_fts', 'divisions_rescueprogramdetail',
+     ['child_name', 'ob_number', 'case_referred_from', 'location_of_rescue', 'background']),
+    ('divisions_trainee_fts', 'divisions_vocationaltrainingprogramtraineedetail',
+     ['trainee_name', 'trainee_email', 'training_received', 'background', 'testimonial']),
+    ('divisions_trainer_fts', 'divisions_vocationaltrainingprogramtrainerdetail',
+     ['trainer_name', 'trainer_email', 'trainer_association']),
+]
+
+
+def reinstall_sqlite_search_triggers(apps, schema_editor):
+    """
+    SQLite rebuilds the altered tables, which drops their triggers: recreate
+    them and refill the FTS tables (divisions.search as of this migration).
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for fts, table, fields in SEARCH_TABLES:
+        columns = ', '.join(f'"{field}"' for field in fields)
+        new_values = ', '.join(f'new."{field}"' for field in fields)
+        insert = f'INSERT INTO {fts} (id, {columns}) VALUES (new.id, {new_values});'
+        delete = f'DELETE FROM {fts} WHERE id = old.id;'
+        for sql in [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"id UNINDEXED, {columns}, tokenize='unicode61 remove_diacritics 2')",
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON "{table}" BEGIN {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON "{table}" BEGIN {delete} END',
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON "{table}" BEGIN {delete} {insert} END',
+            f'DELETE FROM {fts}',
+            f'INSERT INTO {fts} (id, {columns}) SELECT id, {columns} FROM "{table}"',
+        ]:
+            schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0013_beneficiaryimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='educationprogramdetail',
+            name='pictures_upload',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='microfundprogramdetail',
+            name='pictures_upload',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='rescueprogramdetail',
+            name='pictures_upload',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vocationaltrainingprogramtraineedetail',
+            name='pictures_upload',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(reinstall_sqlite_search_triggers, migrations.RunPython.noop),
+    ]
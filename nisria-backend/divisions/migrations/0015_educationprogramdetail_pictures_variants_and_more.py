@@ -0,0 +1,42 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:26
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# SQLite rebuilds the altered tables again; the search tables have not
+# changed since 0014, so its frozen trigger reinstall is reused.
+reinstall_sqlite_search_triggers = import_module(
+    'divisions.migrations.0014_educationprogramdetail_pictures_upload_and_more'
+).reinstall_sqlite_search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0014_educationprogramdetail_pictures_upload_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='educationprogramdetail',
+            name='pictures_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='microfundprogramdetail',
+            name='pictures_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='rescueprogramdetail',
+            name='pictures_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vocationaltrainingprogramtraineedetail',
+            name='pictures_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(reinstall_sqlite_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0015_educationprogramdetail_pictures_variants_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='educationprogramdetail',
+            index=models.Index(fields=['program', 'updated_at', 'id'], name='education_program_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='educationprogramdetail',
+            index=models.Index(fields=['program', 'deleted_at', 'id'], name='education_program_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='microfundprogramdetail',
+            index=models.Index(fields=['program', 'updated_at', 'id'], name='microfund_program_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='microfundprogramdetail',
+            index=models.Index(fields=['program', 'deleted_at', 'id'], name='microfund_program_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rescueprogramdetail',
+            index=models.Index(fields=['program', 'updated_at', 'id'], name='rescue_program_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rescueprogramdetail',
+            index=models.Index(fields=['program', 'deleted_at', 'id'], name='rescue_program_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            index=models.Index(fields=['updated_at', 'id'], name='trainee_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            index=models.Index(fields=['deleted_at', 'id'], name='trainee_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtrainerdetail',
+            index=models.Index(fields=['program', 'updated_at', 'id'], name='trainer_program_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtrainerdetail',
+            index=models.Index(fields=['program', 'deleted_at', 'id'], name='trainer_program_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,157 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0016_educationprogramdetail_education_program_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='division',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at', 'id'], name='division_delete_018007_arch'),
+        ),
+        migrations.AddIndex(
+            model_name='educationprogramdetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['program', 'created_at', 'id'], name='educationp_progra_ad2258_live'),
+        ),
+        migrations.AddIndex(
+            model_name='educationprogramdetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['program', 'updated_at', 'id'], name='educationp_progra_7aed6b_live'),
+        ),
+        migrations.AddIndex(
+            model_name='educationprogramdetail',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['program', 'deleted_at', 'id'], name='educationp_progra_54bac1_arch'),
+        ),
+        migrations.AddIndex(
+            model_name='microfundprogramdetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['program', 'created_at', 'id'], name='microfundp_progra_d044e5_live'),
+        ),
+        migrations.AddIndex(
+            model_name='microfundprogramdetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['program', 'updated_at', 'id'], name='microfundp_progra_68a40c_live'),
+        ),
+        migrations.AddIndex(
+            model_name='microfundprogramdetail',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['program', 'deleted_at', 'id'], name='microfundp_progra_9ecd92_arch'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['division', 'name'], name='program_divisi_0b042c_live'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at', 'id'], name='program_delete_0eb757_arch'),
+        ),
+        migrations.AddIndex(
+            model_name='rescueprogramdetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['program', 'created_at', 'id'], name='rescueprog_progra_19d985_live'),
+        ),
+        migrations.AddIndex(
+            model_name='rescueprogramdetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['program', 'updated_at', 'id'], name='rescueprog_progra_b0ebe8_live'),
+        ),
+        migrations.AddIndex(
+            model_name='rescueprogramdetail',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['program', 'deleted_at', 'id'], name='rescueprog_progra_2198e4_arch'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_at', 'id'], name='vocational_create_b1f06d_live'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['trainer', 'created_at', 'id'], name='vocational_traine_189169_live'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['updated_at', 'id'], name='vocational_update_c5e2da_live'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at', 'id'], name='vocational_delete_b021a4_arch'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['trainer', 'deleted_at', 'id'], name='vocational_traine_baf81e_arch'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtrainerdetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['program', 'created_at', 'id'], name='vocational_progra_9152eb_live'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtrainerdetail',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['program', 'updated_at', 'id'], name='vocational_progra_7ca47b_live'),
+        ),
+        migrations.AddIndex(
+            model_name='vocationaltrainingprogramtrainerdetail',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['program', 'deleted_at', 'id'], name='vocational_progra_8f6382_arch'),
+        ),
+        migrations.RemoveIndex(
+            model_name='educationprogramdetail',
+            name='education_program_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='educationprogramdetail',
+            name='education_program_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='educationprogramdetail',
+            name='education_program_deleted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='microfundprogramdetail',
+            name='microfund_program_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='microfundprogramdetail',
+            name='microfund_program_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='microfundprogramdetail',
+            name='microfund_program_deleted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rescueprogramdetail',
+            name='rescue_program_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rescueprogramdetail',
+            name='rescue_program_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rescueprogramdetail',
+            name='rescue_program_deleted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            name='trainee_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            name='trainee_trainer_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            name='trainee_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vocationaltrainingprogramtraineedetail',
+            name='trainee_deleted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vocationaltrainingprogramtrainerdetail',
+            name='trainer_program_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vocationaltrainingprogramtrainerdetail',
+            name='trainer_program_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vocationaltrainingprogramtrainerdetail',
+            name='trainer_program_deleted_idx',
+        ),
+    ]
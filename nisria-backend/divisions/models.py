@@ -16,6 +16,12 @@ GENDER_CHOICES = [
 
 #for the program details
 class AuditableModel(SoftDeleteModel):
+    # Hard deletes are remembered for delta sync (core.sync).
+    sync_tombstones = True
+    # Keyset pagination (core.pagination) and delta sync (core.sync) within a program.
+    live_indexes = (('program', 'created_at', 'id'), ('program', 'updated_at', 'id'))
+    archive_indexes = (('program', 'deleted_at', 'id'),)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -59,9 +65,15 @@ class Division(SoftDeleteModel):
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        get_latest_by = 'date_created'
+
     @property
     def total_budget(self):
         """Calculates the total annual budget from all programs under this division."""
+        if 'program_budget_total' in self.__dict__:
+            # Annotated by the list views, so lists do not run one aggregate per row.
+            return self.program_budget_total or Decimal('0.00')
         aggregation = self.program_set.aggregate(total_annual_budget=Sum('annual_budget'))
         return aggregation['total_annual_budget'] or Decimal('0.00')
 
@@ -90,6 +102,12 @@ class Program(SoftDeleteModel):
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
 
+    # Programs are looked up by division and name.
+    live_indexes = (('division', 'name'),)
+
+    class Meta:
+        get_latest_by = 'date_created'
+
     def clean(self):
         super().clean()
         if self.division and self.name:
@@ -123,6 +141,10 @@ class EducationProgramDetail(AuditableModel):
     medical_status = models.TextField(blank=True, null=True)
     other_support_details = models.TextField(blank=True, null=True, help_text="Support from sources other than this program.")
     pictures = CloudinaryField('education_pictures', folder='education_program_pictures', null=True, blank=True)
+    # Upload state of `pictures` while it is processed in the background (core.pictures).
+    pictures_upload = models.JSONField(default=dict, blank=True, editable=False)
+    # {variant: {url, width, height, public_id}} of the stored picture sizes (core.pictures.PICTURE_VARIANTS).
+    pictures_variants = models.JSONField(default=dict, blank=True, editable=False)
     background = models.TextField(blank=True, null=True)
     gender = models.CharField(max_length=20, choices=GENDER_CHOICES, blank=True, null=True)
 
@@ -153,6 +175,10 @@ class MicroFundProgramDetail(AuditableModel):
     address = models.CharField(max_length=255, blank=True, null=True)
     background = models.TextField(blank=True, null=True)
     pictures = CloudinaryField('microfund_pictures', folder='microfund_program_pictures', null=True, blank=True)
+    # Upload state of `pictures` while it is processed in the background (core.pictures).
+    pictures_upload = models.JSONField(default=dict, blank=True, editable=False)
+    # {variant: {url, width, height, public_id}} of the stored picture sizes (core.pictures.PICTURE_VARIANTS).
+    pictures_variants = models.JSONField(default=dict, blank=True, editable=False)
     site_visit_notes = models.TextField(blank=True, null=True, help_text="Record of dates and notes from site visits.")
     testimonials = models.TextField(blank=True, null=True)
     additional_support = models.TextField(blank=True, null=True, help_text="Details of any additional support received apart from this program.")
@@ -176,6 +202,10 @@ class RescueProgramDetail(AuditableModel):
     date_of_birth = models.DateField(null=True, blank=True)
     gender = models.CharField(max_length=20, choices=GENDER_CHOICES, blank=True, null=True)
     pictures = CloudinaryField('rescue_child_pictures', folder='rescue_child_pictures', null=True, blank=True)
+    # Upload state of `pictures` while it is processed in the background (core.pictures).
+    pictures_upload = models.JSONField(default=dict, blank=True, editable=False)
+    # {variant: {url, width, height, public_id}} of the stored picture sizes (core.pictures.PICTURE_VARIANTS).
+    pictures_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     # Rescue Details
     date_of_rescue = models.DateField(null=True, blank=True)
@@ -230,6 +260,9 @@ class VocationalTrainingProgramTraineeDetail(AuditableModel):
         ('unknown', 'Unknown'),
     ]
     
+    live_indexes = (('created_at', 'id'), ('trainer', 'created_at', 'id'), ('updated_at', 'id'))
+    archive_indexes = (('deleted_at', 'id'), ('trainer', 'deleted_at', 'id'))
+
     class Meta:
         ordering = ['-created_at']
         
@@ -250,6 +283,57 @@ class VocationalTrainingProgramTraineeDetail(AuditableModel):
     emergency_contact_name = models.CharField(max_length=255, blank=True, null=True)
     emergency_contact_number = models.CharField(max_length=20, blank=True, null=True)
     pictures = CloudinaryField('vocational_trainee_pictures', folder='vocational_trainee_pictures', null=True, blank=True)
+    # Upload state of `pictures` while it is processed in the background (core.pictures).
+    pictures_upload = models.JSONField(default=dict, blank=True, editable=False)
+    # {variant: {url, width, height, public_id}} of the stored picture sizes (core.pictures.PICTURE_VARIANTS).
+    pictures_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    def __str__(self):
+        return f"Vocational Trainee: {self.trainee_name} (Trainer: {self.trainer.trainer_name})"
+
+class BeneficiaryImport(models.Model):
+    """
+    A bulk CSV/XLSX import of program details, processed by a Celery worker
+    (see divisions/imports.py). Rows that fail validation are skipped and
+    reported in `errors`; the rest are created.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    program_type = models.CharField(max_length=50, help_text="PROGRAM_DETAIL_METADATA key, e.g. 'education'.")
+    program = models.ForeignKey(Program, on_delete=models.CASCADE, related_name='imports')
+    trainer = models.ForeignKey(
+        VocationalTrainingProgramTrainerDetail, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='imports', help_text="Set for trainee imports."
+    )
+    file_name = models.CharField(max_length=255)
+    file_content = models.BinaryField(null=True, blank=True, editable=False, help_text="Cleared once processed.")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_rows = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="[{'row': n, 'errors': {...}}] for rejected rows.")
+    message = models.TextField(blank=True, default='', help_text="File-level error, if the import failed.")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='beneficiary_imports')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def progress(self):
+        """ Percentage of rows processed. """
+        if not self.total_rows:
+            return 100 if self.status in ('completed', 'failed') else 0
+        return round(100 * self.processed_rows / self.total_rows)
 
     def __str__(self):
-        return f"Vocational Trainee: {self.trainee_name} (Trainer: {self.trainer.trainer_name})"
\ No newline at end of file
+        return f"Import of {self.file_name} into {self.program_type} ({self.status})"
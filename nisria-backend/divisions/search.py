@@ -0,0 +1,128 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+# 'simple' does no stemming or stop words, which suits names, places and
+# mixed English/Swahili case notes better than an English dictionary.
+POSTGRES_CONFIG = 'simple'
+
+# Relative column weights for SQLite's bm25(); Postgres uses its own A-D scale.
+BM25_WEIGHTS = {'A': 10.0, 'B': 4.0, 'C': 2.0, 'D': 1.0}
+
+MAX_TERMS = 10
+
+
+class SearchIndex:
+    """
+    Full-text index over the weighted text columns of one program detail table.
+
+    - name: short identifier used for the trigger, function, index and FTS
+      table names (the full table names exceed Postgres' 63-char limit).
+    - weights: {'A': [fields], 'B': [...], ...}, A ranking highest.
+
+    On Postgres the table gets a stored `search_vector` tsvector column, kept
+    current by a trigger and served by a GIN index. On SQLite (development)
+    a standalone FTS5 table mirrors the columns through triggers. Both are
+    maintained by the database, so bulk_create and queryset updates stay
+    indexed too. The SQL that builds them is frozen into the migrations
+    (0011_program_detail_search): changing the weights or fields needs a new
+    migration carrying its own copy of that SQL, and on SQLite a migration
+    that alters these tables has to recreate the triggers (see 0014).
+    """
+
+    def __init__(self, name, db_table, weights):
+        self.name = name
+        self.db_table = db_table
+        self.weights = weights
+
+    @property
+    def fields(self):
+        return [field for weight in sorted(self.weights) for field in self.weights[weight]]
+
+    @property
+    def fts_table(self):
+        return f"divisions_{self.name}_fts"
+
+
+SEARCH_INDEXES = {
+    index.db_table: index for index in [
+        SearchIndex('education', 'divisions_educationprogramdetail', {
+            'A': ['student_name'],
+            'B': ['guardian_name', 'school'],
+            'C': ['grade', 'address'],
+            'D': ['background'],
+        }),
+        SearchIndex('microfund', 'divisions_microfundprogramdetail', {
+            'A': ['person_name'],
+            'B': ['chama_group', 'location'],
+            'C': ['project_done'],
+            'D': ['story', 'background'],
+        }),
+        SearchIndex('rescue', 'divisions_rescueprogramdetail', {
+            'A': ['child_name', 'ob_number'],
+            'B': ['case_referred_from', 'location_of_rescue'],
+            'D': ['background'],
+        }),
+        SearchIndex('trainee', 'divisions_vocationaltrainingprogramtraineedetail', {
+            'A': ['trainee_name', 'trainee_email'],
+            'B': ['training_received'],
+            'D': ['background', 'testimonial'],
+        }),
+        SearchIndex('trainer', 'divisions_vocationaltrainingprogramtrainerdetail', {
+            'A': ['trainer_name', 'trainer_email'],
+            'B': ['trainer_association'],
+        }),
+    ]
+}
+
+
+def search_terms(text):
+    """ Splits user input into lowercase word tokens; punctuation never reaches the query syntax. """
+    return re.findall(r'\w+', (text or '').lower())[:MAX_TERMS]
+
+
+def search(queryset, text):
+    """
+    Filters a program detail queryset to rows matching every term of `text`
+    (each as a prefix, so partial names still match) and orders them by
+    relevance, best first. Adds a `search_rank` annotation.
+
+    Text without any word characters leaves the queryset unchanged. Databases
+    other than Postgres and SQLite fall back to icontains lookups.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+    table = queryset.model._meta.db_table
+    index = SEARCH_INDEXES[table]
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f"{term}:*" for term in terms)
+        params = (POSTGRES_CONFIG, tsquery)
+        match = RawSQL(f'"{table}"."search_vector" @@ to_tsquery(%s, %s)', params, output_field=BooleanField())
+        rank = RawSQL(f'ts_rank("{table}"."search_vector", to_tsquery(%s, %s))', params, output_field=FloatField())
+    elif vendor == 'sqlite':
+        fts = index.fts_table
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(BM25_WEIGHTS[weight]) for weight in sorted(index.weights) for _ in index.weights[weight])
+        match = RawSQL(
+            f'"{table}"."id" IN (SELECT id FROM {fts} WHERE {fts} MATCH %s)', (expression,),
+            output_field=BooleanField(),
+        )
+        # bm25() is lower-is-better; negate it so both backends sort descending.
+        rank = RawSQL(
+            f'(SELECT -bm25({fts}, 0, {weights}) FROM {fts} WHERE {fts} MATCH %s AND {fts}.id = "{table}"."id")',
+            (expression,), output_field=FloatField(),
+        )
+    else:
+        for term in terms:
+            term_query = Q()
+            for field in index.fields:
+                term_query |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(term_query)
+        return queryset
+
+    return queryset.filter(match).annotate(search_rank=rank).order_by('-search_rank', '-created_at', 'pk')
@@ -3,9 +3,12 @@ from .models import (
     Division, Program,
     EducationProgramDetail, MicroFundProgramDetail, RescueProgramDetail,
     VocationalTrainingProgramTrainerDetail, VocationalTrainingProgramTraineeDetail,
+    BeneficiaryImport,
     GENDER_CHOICES 
 )
 from accounts.models import User
+from core.fieldsets import SparseFieldsetMixin
+from core.pictures import AsyncPictureUploadMixin, PictureUploadStateField, stored_picture_url
 from django.core.exceptions import ValidationError as DjangoValidationError
 
 class DivisionSerializer(serializers.ModelSerializer):
@@ -83,7 +86,28 @@ class ProgramSerializer(serializers.ModelSerializer):
         return data
 
 
-class EducationProgramDetailSerializer(serializers.ModelSerializer):
+class ProgramTreeSerializer(serializers.ModelSerializer):
+    name_display = serializers.CharField(source='get_name_display', read_only=True)
+    beneficiary_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Program
+        fields = ['id', 'name', 'name_display', 'monthly_budget', 'annual_budget', 'beneficiary_count']
+        read_only_fields = fields
+
+
+class DivisionTreeSerializer(serializers.ModelSerializer):
+    name_display = serializers.CharField(source='get_name_display', read_only=True)
+    total_budget = serializers.ReadOnlyField()
+    programs = ProgramTreeSerializer(source='tree_programs', many=True, read_only=True)
+
+    class Meta:
+        model = Division
+        fields = ['id', 'name', 'name_display', 'description', 'total_budget', 'programs']
+        read_only_fields = fields
+
+
+class EducationProgramDetailSerializer(AsyncPictureUploadMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     program = serializers.SlugRelatedField(read_only=True, slug_field='name') 
     program_id = serializers.PrimaryKeyRelatedField(queryset=Program.objects.filter(name="education"), source='program', write_only=True, label="Program ID")
     gender = serializers.ChoiceField(choices=GENDER_CHOICES, allow_blank=True, allow_null=True, required=False)
@@ -91,6 +115,10 @@ class EducationProgramDetailSerializer(serializers.ModelSerializer):
     updated_at = serializers.DateTimeField(read_only=True)
     # Explicitly define fields to ensure correct serialization, especially for nullable/special fields
     picture_url = serializers.SerializerMethodField()
+    picture_upload = PictureUploadStateField(source='pictures_upload')
+    picture_variants = serializers.ReadOnlyField(source='pictures_variants')
+    field_sources = {'picture_url': ['pictures', 'pictures_variants']}
+    picture_fields = ('pictures',)
     school = serializers.CharField(allow_null=True, required=False)
     background = serializers.CharField(allow_null=True, required=False)
     created_by_username = serializers.CharField(source='created_by.full_name', read_only=True, allow_null=True)
@@ -102,7 +130,7 @@ class EducationProgramDetailSerializer(serializers.ModelSerializer):
             'id', 'program', 'program_id', 'student_name', 'school', 'age', 
             'grade', 'start_year', 'graduation_year', 'guardian_name', 
             'guardian_relationship', 'guardian_contact', 'address', 'medical_status',
-            'other_support_details', 'pictures', 'picture_url', 'background',
+            'other_support_details', 'pictures', 'picture_url', 'picture_upload', 'picture_variants', 'background',
             'gender', 'created_at', 'updated_at', 'created_by_username', 'updated_by_username'
         ]
         extra_kwargs = {
@@ -113,11 +141,9 @@ class EducationProgramDetailSerializer(serializers.ModelSerializer):
         """
         Returns the URL of the picture if it exists.
         """
-        if obj.pictures and hasattr(obj.pictures, 'url'):
-            return obj.pictures.url
-        return None
+        return stored_picture_url(obj, 'pictures')
 
-class MicroFundProgramDetailSerializer(serializers.ModelSerializer):
+class MicroFundProgramDetailSerializer(AsyncPictureUploadMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     program = serializers.SlugRelatedField(read_only=True, slug_field='name')
     program_id = serializers.PrimaryKeyRelatedField(queryset=Program.objects.filter(name="microfund"), source='program', write_only=True, label="Program ID")
     gender = serializers.ChoiceField(choices=GENDER_CHOICES, allow_blank=True, allow_null=True, required=False)
@@ -129,6 +155,10 @@ class MicroFundProgramDetailSerializer(serializers.ModelSerializer):
     created_at = serializers.DateTimeField(read_only=True)
     updated_at = serializers.DateTimeField(read_only=True)
     picture_url = serializers.SerializerMethodField()
+    picture_upload = PictureUploadStateField(source='pictures_upload')
+    picture_variants = serializers.ReadOnlyField(source='pictures_variants')
+    field_sources = {'picture_url': ['pictures', 'pictures_variants']}
+    picture_fields = ('pictures',)
     created_by_username = serializers.CharField(source='created_by.full_name', read_only=True, allow_null=True)
     updated_by_username = serializers.CharField(source='updated_by.full_name', read_only=True, allow_null=True)
 
@@ -146,7 +176,7 @@ class MicroFundProgramDetailSerializer(serializers.ModelSerializer):
             'id', 'program', 'program_id', 'person_name', 'age', 'gender', 'story',
             'chama_group', 'role_in_group', 'money_received', 'project_done',
             'progress_notes', 'address', 'location', 'telephone', 'background',
-            'pictures', 'picture_url', 'site_visit_notes', 'testimonials',
+            'pictures', 'picture_url', 'picture_upload', 'picture_variants', 'site_visit_notes', 'testimonials',
             'additional_support', 'is_active',
             'created_at', 'updated_at', 'created_by_username', 'updated_by_username'
         ]
@@ -156,24 +186,26 @@ class MicroFundProgramDetailSerializer(serializers.ModelSerializer):
         }
 
     def get_picture_url(self, obj):
-        if obj.pictures and hasattr(obj.pictures, 'url'):
-            return obj.pictures.url
-        return None
+        return stored_picture_url(obj, 'pictures')
 
-class RescueProgramDetailSerializer(serializers.ModelSerializer):
+class RescueProgramDetailSerializer(AsyncPictureUploadMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     program = serializers.SlugRelatedField(read_only=True, slug_field='name')
     program_id = serializers.PrimaryKeyRelatedField(queryset=Program.objects.filter(name="rescue"), source='program', write_only=True, label="Program ID")
     gender = serializers.ChoiceField(choices=GENDER_CHOICES, allow_blank=True, allow_null=True, required=False)
     created_at = serializers.DateTimeField(read_only=True)
     updated_at = serializers.DateTimeField(read_only=True)
     picture_url = serializers.SerializerMethodField()
+    picture_upload = PictureUploadStateField(source='pictures_upload')
+    picture_variants = serializers.ReadOnlyField(source='pictures_variants')
+    field_sources = {'picture_url': ['pictures', 'pictures_variants']}
+    picture_fields = ('pictures',)
     created_by_username = serializers.CharField(source='created_by.full_name', read_only=True, allow_null=True)
     updated_by_username = serializers.CharField(source='updated_by.full_name', read_only=True, allow_null=True)
 
     class Meta:
         model = RescueProgramDetail
         fields = [
-            'id', 'program', 'program_id', 'child_name', 'age', 'date_of_birth', 'gender', 'pictures', 'picture_url',
+            'id', 'program', 'program_id', 'child_name', 'age', 'date_of_birth', 'gender', 'pictures', 'picture_url', 'picture_upload', 'picture_variants',
             'date_of_rescue', 'location_of_rescue', 'background',
             'case_referral_description', 'case_referred_from', 'case_type', 'case_type_other', 
             'ob_number', 'children_office_case_number',
@@ -187,12 +219,10 @@ class RescueProgramDetailSerializer(serializers.ModelSerializer):
         }
 
     def get_picture_url(self, obj):
-        if obj.pictures and hasattr(obj.pictures, 'url'):
-            return obj.pictures.url
-        return None
+        return stored_picture_url(obj, 'pictures')
 
 
-class VocationalTrainingProgramTrainerDetailSerializer(serializers.ModelSerializer):
+class VocationalTrainingProgramTrainerDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     program = serializers.SlugRelatedField(read_only=True, slug_field='name')
     program_id = serializers.PrimaryKeyRelatedField(queryset=Program.objects.filter(name="vocational"), source='program', write_only=True, label="Program ID")
     gender = serializers.ChoiceField(choices=GENDER_CHOICES, allow_blank=True, allow_null=True, required=False)
@@ -209,7 +239,7 @@ class VocationalTrainingProgramTrainerDetailSerializer(serializers.ModelSerializ
             'created_at', 'updated_at', 'created_by_username', 'updated_by_username'
         ]
 
-class VocationalTrainingProgramTraineeDetailSerializer(serializers.ModelSerializer):
+class VocationalTrainingProgramTraineeDetailSerializer(AsyncPictureUploadMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     # Trainer is a ForeignKey to VocationalTrainingProgramTrainerDetail
     trainer = serializers.PrimaryKeyRelatedField(queryset=VocationalTrainingProgramTrainerDetail.objects.all())
     trainer_name = serializers.ReadOnlyField(source='trainer.trainer_name') # Include trainer name for readability
@@ -217,6 +247,10 @@ class VocationalTrainingProgramTraineeDetailSerializer(serializers.ModelSerializ
     created_at = serializers.DateTimeField(read_only=True)
     updated_at = serializers.DateTimeField(read_only=True)
     picture_url = serializers.SerializerMethodField()
+    picture_upload = PictureUploadStateField(source='pictures_upload')
+    picture_variants = serializers.ReadOnlyField(source='pictures_variants')
+    field_sources = {'picture_url': ['pictures', 'pictures_variants']}
+    picture_fields = ('pictures',)
     created_by_username = serializers.CharField(source='created_by.full_name', read_only=True, allow_null=True)
     updated_by_username = serializers.CharField(source='updated_by.full_name', read_only=True, allow_null=True)
 
@@ -227,7 +261,7 @@ class VocationalTrainingProgramTraineeDetailSerializer(serializers.ModelSerializ
             'trainee_phone', 'trainee_email', 'address', 'training_received',
             'start_date', 'end_date', 'background', 'additional_support',
             'post_training_status', 'quarterly_follow_up', 'testimonial',
-            'emergency_contact_name', 'emergency_contact_number', 'pictures', 'picture_url',
+            'emergency_contact_name', 'emergency_contact_number', 'pictures', 'picture_url', 'picture_upload', 'picture_variants',
             'created_at', 'updated_at', 'created_by_username', 'updated_by_username'
         ]
         extra_kwargs = {
@@ -235,6 +269,18 @@ class VocationalTrainingProgramTraineeDetailSerializer(serializers.ModelSerializ
         }
 
     def get_picture_url(self, obj):
-        if obj.pictures and hasattr(obj.pictures, 'url'):
-            return obj.pictures.url
-        return None
+        return stored_picture_url(obj, 'pictures')
+
+
+class BeneficiaryImportSerializer(serializers.ModelSerializer):
+    progress = serializers.ReadOnlyField()
+    created_by_username = serializers.CharField(source='created_by.full_name', read_only=True, allow_null=True)
+
+    class Meta:
+        model = BeneficiaryImport
+        fields = [
+            'id', 'program_type', 'program', 'trainer', 'file_name', 'status', 'progress',
+            'total_rows', 'processed_rows', 'created_rows', 'failed_rows', 'errors', 'message',
+            'created_by_username', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
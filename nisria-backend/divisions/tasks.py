@@ -0,0 +1,23 @@
+from celery import shared_task
+import logging
+
+from django.utils import timezone
+
+from .imports import run_import
+from .models import BeneficiaryImport
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def process_beneficiary_import(import_id):
+    # Claimed with one UPDATE so a redelivered or duplicate task cannot run the same job twice.
+    claimed = BeneficiaryImport.objects.filter(pk=import_id, status='pending').update(
+        status='processing', started_at=timezone.now()
+    )
+    if not claimed:
+        logger.warning(f"Beneficiary import {import_id} not found or already processed.")
+        return None
+    job = run_import(BeneficiaryImport.objects.get(pk=import_id))
+    logger.info(f"Beneficiary import {job.pk}: {job.created_rows} created, {job.failed_rows} rejected.")
+    return job.status
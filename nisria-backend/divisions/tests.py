@@ -1,3 +1,862 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import tempfile
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from core.tests import picture_file
+from core.tasks import process_picture_upload
+from analytics.models import DailyMetric
+from core.models import RecycleBinItem, SYNC_TOMBSTONE_RETENTION
+
+from .imports import read_rows, run_import
+from .models import (
+    BeneficiaryImport, Division, Program, EducationProgramDetail, MicroFundProgramDetail, RescueProgramDetail,
+    VocationalTrainingProgramTrainerDetail, VocationalTrainingProgramTraineeDetail
+)
+from .search import search
+from .serializers import EducationProgramDetailSerializer
+from .tasks import process_beneficiary_import
+
+
+class ProgramDetailSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+        cls.microfund = Program.objects.create(
+            name='microfund', description='Microfund', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_student(self, name, **fields):
+        return EducationProgramDetail.objects.create(program=self.education, student_name=name, **fields)
+
+    def search_names(self, text):
+        return list(search(EducationProgramDetail.objects.all(), text).values_list('student_name', flat=True))
+
+    def test_name_matches_rank_above_background_matches(self):
+        self.create_student('Amina Otieno', background='Lives with her grandmother in Kibera.')
+        self.create_student('Brian Kibera', background='Referred by a neighbour.')
+        self.create_student('Cynthia Wanjiru', background='Sponsored since 2020.')
+
+        self.assertEqual(self.search_names('kibera'), ['Brian Kibera', 'Amina Otieno'])
+
+    def test_terms_are_prefixes_and_all_must_match(self):
+        self.create_student('Amina Otieno', school='Olympic Primary')
+        self.create_student('Amina Njeri', school='Kilimani Primary')
+
+        self.assertEqual(self.search_names('amin olymp'), ['Amina Otieno'])
+        self.assertEqual(sorted(self.search_names('amina')), ['Amina Njeri', 'Amina Otieno'])
+
+    def test_index_follows_updates_and_bulk_writes(self):
+        student = self.create_student('Amina Otieno', background='')
+        student.background = 'Transferred from Mathare.'
+        student.save()
+        EducationProgramDetail.objects.bulk_create([
+            EducationProgramDetail(program=self.education, student_name='Daniel Mathare'),
+        ])
+        self.assertEqual(self.search_names('mathare'), ['Daniel Mathare', 'Amina Otieno'])
+
+        EducationProgramDetail.objects.filter(pk=student.pk).update(background='')
+        self.assertEqual(self.search_names('mathare'), ['Daniel Mathare'])
+
+        EducationProgramDetail.all_objects.filter(student_name='Daniel Mathare').delete()
+        self.assertEqual(self.search_names('mathare'), [])
+
+    def test_query_syntax_in_input_is_ignored(self):
+        self.create_student('Amina Otieno')
+        self.assertEqual(self.search_names('"amina" OR NEAR(*'), [])
+        self.assertEqual(self.search_names('amina*'), ['Amina Otieno'])
+        self.assertEqual(len(self.search_names('!!')), 1)
+
+    def test_search_endpoint_orders_by_relevance(self):
+        MicroFundProgramDetail.objects.create(
+            program=self.microfund, person_name='Grace Akinyi', chama_group='Tumaini',
+            location='Kisumu', telephone='0700000002', story='Started a tailoring shop.'
+        )
+        MicroFundProgramDetail.objects.create(
+            program=self.microfund, person_name='Tailoring Tumaini', chama_group='Upendo',
+            location='Nakuru', telephone='0700000003'
+        )
+        response = self.client.get(reverse('microfundprogram-search', args=['nisria']), {'q': 'tailoring'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['person_name'] for row in response.data['results']],
+            ['Tailoring Tumaini', 'Grace Akinyi']
+        )
+
+    def test_ranked_results_cannot_be_paged_by_cursor(self):
+        url = reverse('microfundprogram-search', args=['nisria'])
+        response = self.client.get(url, {'q': 'tailoring', 'cursor': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+        self.assertEqual(self.client.get(url, {'cursor': ''}).status_code, 200)
+
+
+class BeneficiaryImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+        EducationProgramDetail.objects.create(program=cls.education, student_name='Existing Student')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_job(self, file_name, content):
+        return BeneficiaryImport.objects.create(
+            program_type='education', program=self.education, file_name=file_name,
+            file_content=content, created_by=self.user
+        )
+
+    def test_valid_rows_are_created_and_bad_rows_reported(self):
+        content = (
+            "Student Name,School,Age,Gender\n"
+            "Amina Otieno,Olympic Primary,9,female\n"
+            "Brian Kamau,,not a number,male\n"
+            "Existing Student,Kilimani,10,\n"
+            "Amina Otieno,Duplicate In File,9,female\n"
+            "Cynthia Wanjiru,,,\n"
+        ).encode('utf-8')
+        job = run_import(self.create_job('cohort.csv', content))
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.total_rows, job.processed_rows, job.created_rows, job.failed_rows), (5, 5, 2, 3))
+        self.assertEqual([error['row'] for error in job.errors], [3, 4, 5])
+        self.assertIn('age', job.errors[0]['errors'])
+        self.assertIn('student_name', job.errors[1]['errors'])
+        self.assertIsNone(job.file_content)
+
+        amina = EducationProgramDetail.objects.get(student_name='Amina Otieno')
+        self.assertEqual((amina.program, amina.age, amina.created_by), (self.education, 9, self.user))
+        self.assertEqual(search(EducationProgramDetail.objects.all(), 'cynthia').count(), 1)
+
+    def test_xlsx_files_are_read(self):
+        from openpyxl import Workbook
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['student_name', 'start_year', 'grade'])
+        sheet.append(['Daniel Mwangi', 2024, 'Grade 4'])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+
+        job = run_import(self.create_job('cohort.xlsx', buffer.getvalue()))
+        self.assertEqual((job.status, job.created_rows), ('completed', 1))
+        self.assertEqual(EducationProgramDetail.objects.get(student_name='Daniel Mwangi').start_year, 2024)
+
+    def test_unreadable_file_fails_the_job(self):
+        job = run_import(self.create_job('cohort.csv', b'\xff\xfe\x00bad'))
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('UTF-8', job.message)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def import_rows(prefix, count):
+            lines = ["student_name,grade"] + [f"{prefix} {i},Grade 1" for i in range(count)]
+            job = self.create_job(f'{prefix}.csv', "\n".join(lines).encode('utf-8'))
+            with CaptureQueriesContext(connection) as queries:
+                run_import(job)
+            # bulk_create splits INSERTs by the backend's parameter limit; everything else is per chunk.
+            return len([query for query in queries if not query['sql'].startswith('INSERT')])
+
+        import_rows('Warm', 1)  # Creates the rollup buckets the later imports add to
+        self.assertEqual(import_rows('Small', 20), import_rows('Large', 400))
+
+    def test_upload_queues_the_import_and_reports_progress(self):
+        upload = SimpleUploadedFile('cohort.csv', b"student_name\nEsther Achieng\n", content_type='text/csv')
+        with patch.object(process_beneficiary_import, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('educationprogram-import', args=['nisria']), {'file': upload}, format='multipart'
+                )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        delay.assert_called_once_with(str(response.data['id']))
+
+        process_beneficiary_import(str(response.data['id']))
+        response = self.client.get(reverse('beneficiary-import-detail', args=[response.data['id']]))
+        self.assertEqual((response.data['status'], response.data['progress'], response.data['created_rows']), ('completed', 100, 1))
+
+    def test_a_job_is_run_by_one_task_only(self):
+        job = self.create_job('cohort.csv', b"student_name\nEsther Achieng\n")
+        BeneficiaryImport.objects.filter(pk=job.pk).update(status='processing')
+        self.assertIsNone(process_beneficiary_import(str(job.pk)))
+        self.assertFalse(EducationProgramDetail.objects.filter(student_name='Esther Achieng').exists())
+
+        BeneficiaryImport.objects.filter(pk=job.pk).update(status='pending')
+        self.assertEqual(process_beneficiary_import(str(job.pk)), 'completed')
+        self.assertIsNotNone(BeneficiaryImport.objects.get(pk=job.pk).started_at)
+        self.assertIsNone(process_beneficiary_import(str(job.pk)))
+        self.assertEqual(EducationProgramDetail.objects.filter(student_name='Esther Achieng').count(), 1)
+
+    def test_upload_rejects_other_file_types(self):
+        upload = SimpleUploadedFile('cohort.pdf', b"%PDF", content_type='application/pdf')
+        response = self.client.post(reverse('educationprogram-import', args=['nisria']), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+
+class ProgramDetailExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+        EducationProgramDetail.objects.create(
+            program=cls.education, student_name='Amina Otieno', school='Olympic Primary',
+            gender='female', start_year=2023, created_by=cls.user
+        )
+        EducationProgramDetail.objects.create(
+            program=cls.education, student_name='Brian Kamau', school='Kilimani Primary',
+            gender='male', start_year=2024
+        )
+        EducationProgramDetail.objects.create(
+            program=cls.education, student_name='Cynthia Olympia', gender='female', start_year=2024
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('educationprogram-export', args=['nisria'])
+
+    def test_csv_streams_every_row(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="education-nisria-', response['Content-Disposition'])
+
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(len(rows), 3)
+        amina = next(row for row in rows if row['student_name'] == 'Amina Otieno')
+        self.assertEqual(amina['program__name'], 'education')
+        self.assertEqual(amina['created_by__full_name'], 'Admin User')
+        self.assertNotIn('pictures', amina)
+        self.assertNotIn('is_deleted', amina)
+
+    def test_filters_and_search_apply(self):
+        response = self.client.get(self.url, {'file_format': 'ndjson', 'gender': 'female', 'q': 'olymp'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        names = [json.loads(line)['student_name'] for line in lines]
+        # Both match 'olymp'; the name match ranks first.
+        self.assertEqual(names, ['Cynthia Olympia', 'Amina Otieno'])
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+        response = self.client.get(self.url, {'file_format': 'xlsx', 'start_year': 2024})
+        self.assertEqual(response.status_code, 200)
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook.worksheets[0].iter_rows(values_only=True))
+        header, data = rows[0], rows[1:]
+        names = sorted(row[header.index('student_name')] for row in data)
+        self.assertEqual(names, ['Brian Kamau', 'Cynthia Olympia'])
+
+    def test_formulas_are_escaped_in_spreadsheets(self):
+        from openpyxl import load_workbook
+        EducationProgramDetail.objects.create(
+            program=self.education, student_name='=HYPERLINK("http://evil.example","x")', school='@SUM(A1)',
+            guardian_contact='+254 700 000000', start_year=2030
+        )
+        params = {'start_year': 2030}
+        content = b''.join(self.client.get(self.url, params).streaming_content)
+        rows = list(csv.DictReader(io.StringIO(content.decode('utf-8'))))
+        self.assertEqual((rows[0]['student_name'], rows[0]['school']), ('\'=HYPERLINK("http://evil.example","x")', "'@SUM(A1)"))
+        self.assertEqual(rows[0]['guardian_contact'], '+254 700 000000')
+        # Importing the export gives back the original text.
+        self.assertEqual(
+            [(row['school'], row['guardian_contact']) for row in read_rows('export.csv', content)],
+            [('@SUM(A1)', '+254 700 000000')]
+        )
+
+        response = self.client.get(self.url, {**params, 'file_format': 'xlsx'})
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).worksheets[0]
+        header = [cell.value for cell in sheet[1]]
+        school = sheet.cell(row=2, column=header.index('school') + 1)
+        self.assertEqual((school.value, school.data_type, school.quotePrefix), ('@SUM(A1)', 's', True))
+        contact = sheet.cell(row=2, column=header.index('guardian_contact') + 1)
+        self.assertEqual((contact.value, contact.quotePrefix), ('+254 700 000000', False))
+
+        line = b''.join(self.client.get(self.url, {**params, 'file_format': 'ndjson'}).streaming_content)
+        self.assertEqual(json.loads(line)['school'], '@SUM(A1)')
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(self.url, {'file_format': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_students(self, prefix, count, **fields):
+        return [
+            EducationProgramDetail.objects.create(program=self.education, student_name=f'{prefix} {i}', **fields)
+            for i in range(count)
+        ]
+
+    def post(self, name, data):
+        return self.client.post(reverse(name, args=['nisria']), data, format='json')
+
+    def grade_counts(self):
+        counts = {}
+        for row in DailyMetric.objects.filter(metric='education'):
+            grade = json.loads(row.dimension)['grade']
+            counts[grade] = counts.get(grade, 0) + row.count
+        return {grade: count for grade, count in counts.items() if count}
+
+    def test_soft_delete_by_ids_snapshots_every_row(self):
+        students = self.create_students('Student', 3, grade='Grade 1', created_by=self.user)
+        expected = {str(student.pk): student._get_serializable_data() for student in students}
+
+        response = self.post('educationprogram-bulk-soft-delete', {'ids': [str(student.pk) for student in students]})
+        self.assertEqual((response.status_code, response.data), (200, {'deleted': 3}))
+        self.assertEqual(EducationProgramDetail.objects.count(), 0)
+        self.assertEqual(EducationProgramDetail.all_objects.filter(deleted_at__isnull=False).count(), 3)
+
+        items = RecycleBinItem.objects.all()
+        self.assertEqual({str(item.object_id_uuid): item.original_data for item in items}, expected)
+        self.assertTrue(all(item.deleted_by == self.user and item.expires_at > item.deleted_at for item in items))
+        self.assertEqual(self.grade_counts(), {})
+
+        # Deleting again finds nothing live.
+        response = self.post('educationprogram-bulk-soft-delete', {'ids': [str(students[0].pk)]})
+        self.assertEqual(response.data, {'deleted': 0})
+
+    def test_soft_delete_queries_do_not_grow_with_rows(self):
+        def soft_delete(prefix, count):
+            self.create_students(prefix, count, grade=prefix)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post('educationprogram-bulk-soft-delete', {'filter': {'grade': prefix}})
+            self.assertEqual(response.data, {'deleted': count})
+            return len([query for query in queries if not query['sql'].startswith('INSERT')])
+
+        self.assertEqual(soft_delete('Small', 3), soft_delete('Large', 30))
+
+    def test_update_by_filter_moves_rollups(self):
+        self.create_students('Olympic', 3, grade='Grade 4', school='Olympic Primary')
+        self.create_students('Kilimani', 2, grade='Grade 4', school='Kilimani Primary')
+
+        response = self.post('educationprogram-bulk-update', {
+            'filter': {'school__icontains': 'olympic'}, 'changes': {'grade': 'Grade 5'},
+        })
+        self.assertEqual((response.status_code, response.data), (200, {'updated': 3}))
+        olympic = EducationProgramDetail.objects.filter(school='Olympic Primary')
+        self.assertEqual(set(olympic.values_list('grade', flat=True)), {'Grade 5'})
+        self.assertTrue(all(student.updated_by == self.user for student in olympic))
+        self.assertEqual(self.grade_counts(), {'Grade 4': 2, 'Grade 5': 3})
+
+    def test_search_narrows_the_filter(self):
+        self.create_students('Amina', 2, grade='Grade 1')
+        self.create_students('Brian', 2, grade='Grade 1')
+        response = self.post('educationprogram-bulk-update', {
+            'filter': {'grade': 'Grade 1', 'q': 'amina'}, 'changes': {'school': 'Olympic Primary'},
+        })
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(EducationProgramDetail.objects.filter(school='Olympic Primary').count(), 2)
+
+    def test_invalid_requests_are_rejected(self):
+        student, = self.create_students('Student', 1)
+        cases = [
+            ('educationprogram-bulk-soft-delete', {}),
+            ('educationprogram-bulk-soft-delete', {'ids': [str(student.pk)], 'filter': {'grade': 'Grade 1'}}),
+            ('educationprogram-bulk-soft-delete', {'ids': ['not-a-uuid']}),
+            ('educationprogram-bulk-soft-delete', {'filter': {'grad': 'Grade 1'}}),
+            ('educationprogram-bulk-update', {'ids': [str(student.pk)]}),
+            ('educationprogram-bulk-update', {'ids': [str(student.pk)], 'changes': {'student_name': 'Same Name'}}),
+            ('educationprogram-bulk-update', {'ids': [str(student.pk)], 'changes': {'created_at': '2020-01-01T00:00:00Z'}}),
+            ('educationprogram-bulk-update', {'ids': [str(student.pk)], 'changes': {'age': 'nine'}}),
+        ]
+        for name, data in cases:
+            with self.subTest(data=data):
+                self.assertEqual(self.post(name, data).status_code, 400)
+        self.assertTrue(EducationProgramDetail.objects.filter(pk=student.pk, student_name='Student 0').exists())
+
+
+class ProgramDetailFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('educationprogram-list-create', args=['nisria'])
+
+    def create_students(self, prefix, count):
+        for i in range(count):
+            EducationProgramDetail.objects.create(
+                program=self.education, student_name=f'{prefix} {i}', grade='Grade 1',
+                background='A long background story. ' * 50, created_by=self.user
+            )
+
+    def test_grid_columns_skip_large_text_fields(self):
+        self.create_students('Student', 2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,student_name,grade,created_by_username'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [set(row) for row in response.data['results']],
+            [{'id', 'student_name', 'grade', 'created_by_username'}] * 2
+        )
+        self.assertEqual(response.data['results'][0]['created_by_username'], 'Admin User')
+        select = [query['sql'] for query in queries if 'FROM "divisions_educationprogramdetail"' in query['sql']][-1]
+        self.assertNotIn('"background"', select)
+        self.assertNotIn('"medical_status"', select)
+
+    def test_projected_queries_do_not_grow_with_rows(self):
+        def count(prefix, rows):
+            self.create_students(prefix, rows)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.url, {'fields': 'student_name,created_by_username', 'page_size': 100})
+            EducationProgramDetail.all_objects.all().delete()
+            return len(queries)
+
+        self.assertEqual(count('Small', 2), count('Large', 12))
+
+    def test_method_fields_keep_their_source_columns(self):
+        self.create_students('Student', 1)
+        response = self.client.get(self.url, {'fields': 'student_name,picture_url'})
+        self.assertEqual(response.data['results'], [{'student_name': 'Student 0', 'picture_url': None}])
+
+
+class DivisionListQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='super_admin'
+        )
+        cls.lead = User.objects.create_user(
+            email='lead@nisria.co', full_name='Lead User', phone_number='0700000001',
+            password='pass', role='management_lead'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_program(self, division, name, annual_budget):
+        program = Program.objects.create(
+            name=name, description=name.title(), division=division,
+            monthly_budget=Decimal('10.00'), annual_budget=Decimal(annual_budget)
+        )
+        program.maintainers.add(self.user, self.lead)
+        return program
+
+    def create_division(self, name):
+        division = Division.objects.create(name=name, description=name.title())
+        division.leads.add(self.lead)
+        return division
+
+    def count_queries(self, name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        nisria = self.create_division('nisria')
+        self.create_program(nisria, 'education', '1200.00')
+        small = (self.count_queries('division-list-create')[0], self.count_queries('program-list-create')[0])
+
+        maisha = self.create_division('maisha')
+        self.create_program(nisria, 'microfund', '600.00')
+        self.create_program(nisria, 'rescue', '300.00')
+        self.create_program(maisha, 'vocational', '500.00')
+        division_queries, response = self.count_queries('division-list-create')
+        program_queries, programs = self.count_queries('program-list-create')
+        self.assertEqual((division_queries, program_queries), small)
+
+        budgets = {row['name']: row['total_budget'] for row in response.data['results']}
+        self.assertEqual(budgets, {'nisria': Decimal('2100.00'), 'maisha': Decimal('500.00')})
+        self.assertEqual(response.data['results'][0]['leads'], [self.lead.pk])
+        vocational = next(row for row in programs.data['results'] if row['name'] == 'vocational')
+        self.assertEqual(vocational['division_name_display'], 'Maisha')
+        self.assertEqual(sorted(vocational['maintainers']), sorted([self.user.pk, self.lead.pk]))
+
+    def test_annotated_budget_matches_the_property(self):
+        nisria = self.create_division('nisria')
+        self.create_program(nisria, 'education', '1200.00')
+        self.create_program(nisria, 'microfund', '600.00').soft_delete(user=self.user)
+        _, response = self.count_queries('division-list-create')
+        self.assertEqual(response.data['results'][0]['total_budget'], nisria.total_budget)
+        self.assertEqual(nisria.total_budget, Decimal('1200.00'))
+
+    def test_tree_costs_two_queries(self):
+        nisria = self.create_division('nisria')
+        maisha = self.create_division('maisha')
+        education = self.create_program(nisria, 'education', '1200.00')
+        self.create_program(nisria, 'rescue', '300.00')
+        vocational = self.create_program(maisha, 'vocational', '500.00')
+        for i in range(3):
+            EducationProgramDetail.objects.create(program=education, student_name=f'Student {i}')
+        EducationProgramDetail.objects.create(program=education, student_name='Gone').soft_delete(user=self.user)
+        trainer = VocationalTrainingProgramTrainerDetail.objects.create(program=vocational, trainer_name='Trainer')
+        VocationalTrainingProgramTraineeDetail.objects.create(trainer=trainer, trainee_name='Trainee')
+
+        queries, response = self.count_queries('division-tree')
+        self.assertEqual(queries, 2)
+        tree = {
+            division['name']: (division['total_budget'], {p['name']: p['beneficiary_count'] for p in division['programs']})
+            for division in response.data
+        }
+        self.assertEqual(tree, {
+            'maisha': (Decimal('500.00'), {'vocational': 1}),
+            'nisria': (Decimal('1500.00'), {'education': 3, 'rescue': 0}),
+        })
+
+
+class ProgramResolutionCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('educationprogram-list-create', args=['nisria'])
+
+    def program_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in queries
+            if 'FROM "divisions_program"' in query['sql'] or 'FROM "divisions_division"' in query['sql']
+        ]
+
+    def test_program_lookup_is_served_from_memory(self):
+        self.program_queries()
+        self.assertEqual(self.program_queries(), [])
+
+    def test_program_changes_are_seen(self):
+        self.program_queries()
+        self.education.soft_delete(user=self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.education.restore()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class ProgramDetailPictureTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        spool_dir = tempfile.TemporaryDirectory()
+        pictures_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        self.addCleanup(pictures_dir.cleanup)
+        settings = override_settings(PICTURE_UPLOADS={
+            'SPOOL_OPTIONS': {'location': spool_dir.name},
+            'BACKEND': 'core.pictures.FileSystemPictureBackend',
+            'BACKEND_OPTIONS': {'location': pictures_dir.name},
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_picture_is_uploaded_after_the_response(self):
+        with patch.object(process_picture_upload, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('educationprogram-list-create', args=['nisria']),
+                    {'program_id': str(self.education.pk), 'student_name': 'Amina Otieno', 'pictures': picture_file()},
+                    format='multipart'
+                )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['picture_upload'], {'status': 'pending', 'error': None})
+        self.assertIsNone(response.data['picture_url'])
+        delay.assert_called_once()
+
+        process_picture_upload(*delay.call_args.args)
+        detail = self.client.get(reverse('educationprogram-detail', args=['nisria', response.data['id']]))
+        self.assertEqual(detail.data['picture_upload']['status'], 'completed')
+        variants = detail.data['picture_variants']
+        self.assertEqual(set(variants), {'thumbnail', 'card', 'full'})
+        self.assertEqual(detail.data['picture_url'], variants['full']['url'])
+
+    def test_an_update_keeps_a_picture_stored_meanwhile(self):
+        student = EducationProgramDetail.objects.create(
+            program=self.education, student_name='Amina Otieno', pictures_upload={'status': 'processing', 'spool': 'a.png'}
+        )
+        serializer = EducationProgramDetailSerializer(student, data={'school': 'Mathare Primary'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        # The upload task finishes between the request's read and its save.
+        variants = {'full': {'url': '/media/pictures/a_full.jpg', 'width': 2048, 'height': 683, 'public_id': 'a_full.jpg'}}
+        EducationProgramDetail.objects.filter(pk=student.pk).update(
+            pictures='a_full.jpg', pictures_variants=variants, pictures_upload={'status': 'completed', 'spool': 'a.png'}
+        )
+        serializer.save()
+
+        student.refresh_from_db()
+        self.assertEqual((student.school, student.pictures_variants), ('Mathare Primary', variants))
+        self.assertEqual(student.pictures_upload['status'], 'completed')
+
+    def test_listing_reads_stored_variants(self):
+        variants = {'full': {'url': '/media/pictures/a_full.jpg', 'width': 2048, 'height': 683}}
+        EducationProgramDetail.objects.create(program=self.education, student_name='Amina Otieno', pictures_variants=variants)
+        with patch('cloudinary.CloudinaryResource.build_url') as build_url:
+            response = self.client.get(reverse('educationprogram-list-create', args=['nisria']))
+        build_url.assert_not_called()
+        self.assertEqual(response.data['results'][0]['picture_variants'], variants)
+        self.assertEqual(response.data['results'][0]['picture_url'], variants['full']['url'])
+
+
+@patch('core.sync.SYNC_OVERLAP', datetime.timedelta(0))
+class ProgramDetailSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.education = Program.objects.create(
+            name='education', description='Education', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.students = [
+            EducationProgramDetail.objects.create(program=self.education, student_name=f'Student {i}')
+            for i in range(3)
+        ]
+
+    def sync(self, token=None, **params):
+        if token:
+            params['token'] = token
+        response = self.client.get(reverse('educationprogram-changes', args=['nisria']), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_full_sync_then_only_changes(self):
+        full = self.sync()
+        self.assertEqual(len(full['changed']), 3)
+        self.assertEqual(full['deleted'], [])
+        self.assertFalse(full['has_more'])
+
+        self.assertEqual(self.sync(full['token'])['changed'], [])
+
+        first, second, third = self.students
+        first.school = 'Mathare Primary'
+        first.save()
+        second.soft_delete(self.user)
+        EducationProgramDetail.all_objects.filter(pk=third.pk).delete()
+        created = EducationProgramDetail.objects.create(program=self.education, student_name='Student 3')
+
+        delta = self.sync(full['token'])
+        self.assertEqual({row['id'] for row in delta['changed']}, {str(first.pk), str(created.pk)})
+        self.assertEqual(set(delta['deleted']), {second.pk, third.pk})
+
+        second.restore()
+        restored = self.sync(delta['token'])
+        self.assertEqual([row['id'] for row in restored['changed']], [str(second.pk)])
+        self.assertEqual(restored['deleted'], [])
+
+    def test_pages_follow_the_token(self):
+        seen = []
+        data = self.sync(limit=2)
+        seen += data['changed']
+        self.assertTrue(data['has_more'])
+        data = self.sync(data['token'], limit=2)
+        seen += data['changed']
+        self.assertFalse(data['has_more'])
+        self.assertEqual(sorted(row['student_name'] for row in seen), ['Student 0', 'Student 1', 'Student 2'])
+
+    def test_fields_limit_changed_rows(self):
+        data = self.sync(fields='id,student_name')
+        self.assertEqual(set(data['changed'][0]), {'id', 'student_name'})
+
+    def test_recent_changes_are_sent_again_within_the_overlap(self):
+        token = self.sync()['token']
+        with patch('core.sync.SYNC_OVERLAP', datetime.timedelta(minutes=1)):
+            token = self.sync(token)['token']
+        self.assertEqual(len(self.sync(token)['changed']), 3)
+
+    def test_bad_and_expired_tokens(self):
+        url = reverse('educationprogram-changes', args=['nisria'])
+        self.assertEqual(self.client.get(url, {'token': 'garbage'}).status_code, 400)
+        grant_token = self.client.get(reverse('grants:grant-changes')).data['token']
+        self.assertEqual(self.client.get(url, {'token': grant_token}).status_code, 400)
+
+        token = self.sync()['token']
+        later = timezone.now() + SYNC_TOMBSTONE_RETENTION + datetime.timedelta(days=1)
+        with patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(self.client.get(url, {'token': token}).status_code, 410)
+
+
+class BatchUpsertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='admin@nisria.co', full_name='Admin User', phone_number='0700000000',
+            password='pass', role='admin'
+        )
+        nisria = Division.objects.create(name='nisria', description='Nisria')
+        cls.rescue = Program.objects.create(
+            name='rescue', description='Rescue', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+        cls.microfund = Program.objects.create(
+            name='microfund', description='MicroFund', division=nisria,
+            monthly_budget=Decimal('100.00'), annual_budget=Decimal('1200.00')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.child = RescueProgramDetail.objects.create(program=self.rescue, child_name='Baraka', age=9)
+        self.member = MicroFundProgramDetail.objects.create(
+            program=self.microfund, person_name='Wanjiru', chama_group='Umoja', location='Kibera', telephone='0711000000'
+        )
+
+    def post(self, items):
+        return self.client.post(reverse('programdetail-batch-upsert', args=['nisria']), {'items': items}, format='json')
+
+    def version(self, obj):
+        obj.refresh_from_db()
+        return obj.updated_at.isoformat()
+
+    def test_creates_and_updates_across_types_in_one_call(self):
+        new_id = uuid.uuid4()
+        items = [
+            {'type': 'rescue', 'id': str(self.child.pk), 'base_version': self.version(self.child), 'data': {'post_rescue_description': 'Visited on Monday'}},
+            {'type': 'microfund', 'id': str(self.member.pk), 'base_version': self.version(self.member), 'data': {'progress_notes': 'Shop opened'}},
+            {'type': 'rescue', 'id': str(new_id), 'data': {'child_name': 'Imani', 'age': 6}},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(items)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([result['status'] for result in response.data['results']], ['updated', 'updated', 'created'])
+        self.assertLess(len(queries), 40)
+
+        self.child.refresh_from_db()
+        self.assertEqual(self.child.post_rescue_description, 'Visited on Monday')
+        self.assertEqual(self.child.updated_by, self.user)
+        self.assertEqual(MicroFundProgramDetail.objects.get().progress_notes, 'Shop opened')
+        created = RescueProgramDetail.objects.get(pk=new_id)
+        self.assertEqual((created.program, created.created_by), (self.rescue, self.user))
+
+        # The returned version is the base for the next edit.
+        again = self.post([{'type': 'rescue', 'id': str(self.child.pk), 'base_version': response.data['results'][0]['version'].isoformat(), 'data': {'age': 10}}])
+        self.assertEqual(again.data['results'][0]['status'], 'updated')
+
+    def test_conflicts_and_invalid_items_do_not_stop_the_batch(self):
+        stale = self.version(self.child)
+        self.child.urgent_needs = 'School fees'
+        self.child.save()
+        deleted = RescueProgramDetail.objects.create(program=self.rescue, child_name='Neema', age=4)
+        deleted_version = self.version(deleted)
+        deleted.soft_delete(self.user)
+
+        response = self.post([
+            {'type': 'rescue', 'id': str(self.child.pk), 'base_version': stale, 'data': {'age': 11}},
+            {'type': 'rescue', 'id': str(deleted.pk), 'base_version': deleted_version, 'data': {'age': 5}},
+            {'type': 'rescue', 'data': {'child_name': 'Baraka', 'age': 3}},
+            {'type': 'rescue', 'data': {'child_name': 'Zawadi'}},
+            {'type': 'vocational', 'data': {'trainee_name': 'Otieno'}},
+            {'type': 'microfund', 'id': str(self.member.pk), 'base_version': self.version(self.member), 'data': {'progress_notes': 'Second loan'}},
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        results = response.data['results']
+        self.assertEqual((results[0]['status'], results[0]['reason']), ('conflict', 'modified'))
+        self.assertEqual(results[0]['current']['urgent_needs'], 'School fees')
+        self.assertEqual((results[1]['status'], results[1]['reason']), ('conflict', 'deleted'))
+        self.assertIn('child_name', results[2]['errors'])
+        self.assertIn('age', results[3]['errors'])
+        self.assertIn('type', results[4]['errors'])
+        self.assertEqual(results[5]['status'], 'updated')
+        self.assertEqual((response.data['conflicts'], response.data['invalid'], response.data['updated']), (2, 3, 1))
+
+        self.child.refresh_from_db()
+        self.assertEqual(self.child.age, 9)
+        self.assertEqual(MicroFundProgramDetail.objects.get().progress_notes, 'Second loan')
+
+    def test_replayed_creates_report_existing_records(self):
+        item = {'type': 'rescue', 'id': str(uuid.uuid4()), 'data': {'child_name': 'Imani', 'age': 6}}
+        self.assertEqual(self.post([item]).data['results'][0]['status'], 'created')
+        replay = self.post([item]).data['results'][0]
+        self.assertEqual((replay['status'], replay['reason']), ('conflict', 'exists'))
+        self.assertEqual(RescueProgramDetail.objects.filter(child_name='Imani').count(), 1)
+
+    def test_rejects_oversized_batches(self):
+        with patch('divisions.views.MAX_BATCH_ITEMS', 1):
+            response = self.post([{'type': 'rescue', 'data': {}}] * 2)
+        self.assertEqual(response.status_code, 400)
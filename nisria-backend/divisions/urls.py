@@ -8,6 +8,7 @@ urlpatterns = [
     # Division Endpoints
     path('divisions/', views.division_list_create, name='division-list-create'),
     path('divisions/<uuid:pk>/', views.division_detail_view, name='division-detail'),
+    path('divisions/tree/', views.division_tree, name='division-tree'),
 
     # Program Definition Endpoints (Manage the Program objects themselves)
     path('programs/', views.program_list_create, name='program-list-create'),
@@ -44,6 +45,43 @@ urlpatterns = [
     path('<str:division_name>/vocational/filter/', views.vocational_program_filter, name='vocationalprogram-filter'), 
     path('<str:division_name>/vocational/search/', views.vocational_program_search, name='vocationalprogram-search'), 
 
+    # Streaming export endpoints (?file_format=csv|xlsx|ndjson, plus the filter params and q)
+    path('<str:division_name>/education/export/', views.education_program_export, name='educationprogram-export'),
+    path('<str:division_name>/microfund/export/', views.microfund_program_export, name='microfundprogram-export'),
+    path('<str:division_name>/rescue/export/', views.rescue_program_export, name='rescueprogram-export'),
+    path('<str:division_name>/vocational/export/', views.vocational_program_export, name='vocationalprogram-export'),
+    path('<str:division_name>/vocational-trainers/export/', views.vocational_trainer_export, name='vocationaltrainer-export'),
+
+    # Bulk update / bulk soft delete ({"ids": [...]} or {"filter": {...}})
+    path('<str:division_name>/education/bulk-update/', views.education_program_bulk_update, name='educationprogram-bulk-update'),
+    path('<str:division_name>/education/bulk-soft-delete/', views.education_program_bulk_soft_delete, name='educationprogram-bulk-soft-delete'),
+    path('<str:division_name>/microfund/bulk-update/', views.microfund_program_bulk_update, name='microfundprogram-bulk-update'),
+    path('<str:division_name>/microfund/bulk-soft-delete/', views.microfund_program_bulk_soft_delete, name='microfundprogram-bulk-soft-delete'),
+    path('<str:division_name>/rescue/bulk-update/', views.rescue_program_bulk_update, name='rescueprogram-bulk-update'),
+    path('<str:division_name>/rescue/bulk-soft-delete/', views.rescue_program_bulk_soft_delete, name='rescueprogram-bulk-soft-delete'),
+    path('<str:division_name>/vocational/bulk-update/', views.vocational_program_bulk_update, name='vocationalprogram-bulk-update'),
+    path('<str:division_name>/vocational/bulk-soft-delete/', views.vocational_program_bulk_soft_delete, name='vocationalprogram-bulk-soft-delete'),
+    path('<str:division_name>/vocational-trainers/bulk-update/', views.vocational_trainer_bulk_update, name='vocationaltrainer-bulk-update'),
+    path('<str:division_name>/vocational-trainers/bulk-soft-delete/', views.vocational_trainer_bulk_soft_delete, name='vocationaltrainer-bulk-soft-delete'),
+
+    # Delta sync (?token= from the previous response; none for a full sync)
+    path('<str:division_name>/education/changes/', views.education_program_changes, name='educationprogram-changes'),
+    path('<str:division_name>/microfund/changes/', views.microfund_program_changes, name='microfundprogram-changes'),
+    path('<str:division_name>/rescue/changes/', views.rescue_program_changes, name='rescueprogram-changes'),
+    path('<str:division_name>/vocational/changes/', views.vocational_program_changes, name='vocationalprogram-changes'),
+    path('<str:division_name>/vocational-trainers/changes/', views.vocational_trainer_changes, name='vocationaltrainer-changes'),
+
+    # Offline batch upsert of any program detail type, with per-item conflicts
+    path('<str:division_name>/batch-upsert/', views.program_batch_upsert, name='programdetail-batch-upsert'),
+
+    # Bulk import (CSV/XLSX) endpoints, processed by Celery
+    path('<str:division_name>/education/import/', views.education_program_import, name='educationprogram-import'),
+    path('<str:division_name>/microfund/import/', views.microfund_program_import, name='microfundprogram-import'),
+    path('<str:division_name>/rescue/import/', views.rescue_program_import, name='rescueprogram-import'),
+    path('<str:division_name>/vocational-trainers/import/', views.vocational_trainer_import, name='vocationaltrainer-import'),
+    path('<str:division_name>/vocational-trainers/<uuid:trainer_pk>/trainees/import/', views.vocational_trainee_import, name='vocationaltrainee-import'),
+    path('imports/<uuid:pk>/', views.beneficiary_import_detail, name='beneficiary-import-detail'),
+
     # Division soft delete/recycle bin endpoints
     path('divisions/<uuid:pk>/soft-delete/', views.division_soft_delete, name='division-soft-delete'),
     path('divisions/<uuid:pk>/restore/', views.division_restore, name='division-restore'),
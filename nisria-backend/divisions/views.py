@@ -1,34 +1,50 @@
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.http import Http404
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.response import Response
-from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework import serializers, status
 from rest_framework.permissions import IsAuthenticated
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.utils import timezone
+import uuid
 from accounts.permissions import IsSuperAdmin
 from django.contrib.contenttypes.models import ContentType
 from core.models import RecycleBinItem
+from core.cache import LocalVersionedCache
+from core.conditional import conditional_get
+from core.pagination import StandardResultsSetPagination
+from core.fieldsets import sparse_fieldset
+from core.sync import SYNC_QUERY_PARAMETERS, sync_response
+from accounts.models import User
 
 from .models import (
     Division, Program,
     EducationProgramDetail, MicroFundProgramDetail, RescueProgramDetail,
-    VocationalTrainingProgramTrainerDetail, VocationalTrainingProgramTraineeDetail
+    VocationalTrainingProgramTrainerDetail, VocationalTrainingProgramTraineeDetail,
+    BeneficiaryImport
 )
 from .serializers import (
     DivisionSerializer,
+    DivisionTreeSerializer,
     ProgramSerializer,
     EducationProgramDetailSerializer,
     MicroFundProgramDetailSerializer,
     RescueProgramDetailSerializer,
     VocationalTrainingProgramTrainerDetailSerializer,
-    VocationalTrainingProgramTraineeDetailSerializer
+    VocationalTrainingProgramTraineeDetailSerializer,
+    BeneficiaryImportSerializer
 )
+from .search import search
+from .exports import EXPORT_FORMATS, export_response
+from .imports import MAX_IMPORT_FILE_SIZE
+from .batch import MAX_BATCH_ITEMS, BatchUpsert
+from .tasks import process_beneficiary_import
 from .filters import (
     DivisionFilter,
     ProgramFilter,
@@ -46,7 +62,6 @@ PROGRAM_DETAIL_METADATA = {
         "filterset_class": EducationProgramDetailFilter,
         "allowed_division_urls": ["nisria"], 
         "db_division_map": {"nisria": "nisria"},
-        "search_fields": ['student_name', 'school', 'grade', 'address', 'guardian_name', 'background'],
         "program_name": "education", 
     },
     "microfund": {
@@ -56,7 +71,6 @@ PROGRAM_DETAIL_METADATA = {
         "allowed_division_urls": ["nisria"],
         "db_division_map": {"nisria": "nisria"},
         "program_name": "microfund",
-        "search_fields": ['person_name', 'chama_group', 'location', 'story', 'background', 'project_done'],
     },
     "rescue": {
         "model": RescueProgramDetail,
@@ -65,7 +79,6 @@ PROGRAM_DETAIL_METADATA = {
         "allowed_division_urls": ["nisria"],
         "db_division_map": {"nisria": "nisria"},
         "program_name": "rescue",
-        "search_fields": ['child_name', 'location_of_rescue', 'background', 'case_referred_from', 'ob_number'],
     },
     "vocational": {
         # This metadata entry can be for the "vocational" Program itself,
@@ -78,7 +91,6 @@ PROGRAM_DETAIL_METADATA = {
         "allowed_division_urls": ["maisha"],
         "db_division_map": {"maisha": "maisha"},
         "program_name": "vocational", 
-        "search_fields": ['trainee_name', 'training_received', 'trainee_email', 'background', 'testimonial'],
     },
     "vocational-trainer": { 
         "model": VocationalTrainingProgramTrainerDetail,
@@ -87,7 +99,6 @@ PROGRAM_DETAIL_METADATA = {
         "allowed_division_urls": ["maisha"],
         "db_division_map": {"maisha": "maisha"},
         "program_name": "vocational", 
-        "search_fields": ['trainer_name', 'trainer_association', 'trainer_email'],
     }
 }
 
@@ -103,11 +114,23 @@ def indexTest(request):
     return JsonResponse({"message": "API endpoints working in Divisions app"})
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+# Divisions and programs are a handful of rows that almost never change, yet
+# every program detail request resolves one; keep them in process memory.
+_program_cache = LocalVersionedCache(Division, Program)
 
+def _resolve_program(division_name, program_name):
+    """
+    Returns the live Program `program_name` of the division `division_name`
+    (with its division loaded), or None. With program_name=None, returns
+    whether the division exists. Served from _program_cache.
+    """
+    def lookup():
+        if program_name is None:
+            return Division.objects.filter(name=division_name).exists()
+        return Program.objects.select_related('division').filter(
+            division__name=division_name, name=program_name
+        ).first()
+    return _program_cache.get_or_set((division_name, program_name), lookup)
 
 def _get_program_detail_meta_and_program(division_name_url, program_type_url):
     """
@@ -126,20 +149,49 @@ def _get_program_detail_meta_and_program(division_name_url, program_type_url):
     if not db_division_name: 
         raise Http404(f"Internal configuration error: No database mapping for division URL '{division_name_url}'.")
 
-    try:
-        division = Division.objects.get(name=db_division_name)
-    except Division.DoesNotExist:
-        raise Http404(f"Division '{db_division_name}' (mapped from URL '{division_name_url}') not found.")
-        
     # Use the 'program_name' from metadata if available, otherwise default to the URL segment
     program_name_in_db = meta.get("program_name", program_type_url_lower)
 
-    # Find the specific Program object based on division and the determined program name
-    try:
-        program = Program.objects.get(division=division, name=program_name_in_db)
-        return meta, program 
-    except Program.DoesNotExist:
+    program = _resolve_program(db_division_name, program_name_in_db)
+    if program is None:
+        if not _resolve_program(db_division_name, None):
+            raise Http404(f"Division '{db_division_name}' (mapped from URL '{division_name_url}') not found.")
         raise Http404(f"Program '{program_name_in_db}' not found in division '{db_division_name}'.")
+    return meta, program
+
+def _with_total_budget(queryset):
+    """ Annotates what Division.total_budget would aggregate per row: the annual budgets of its live programs. """
+    return queryset.annotate(
+        program_budget_total=Sum('program__annual_budget', filter=Q(program__is_deleted=False))
+    )
+
+def _divisions_for_listing(queryset):
+    """ Annotates total_budget and prefetches leads, so serializing N divisions costs a fixed number of queries. """
+    return _with_total_budget(queryset).prefetch_related('leads')
+
+def _programs_for_listing(queryset):
+    """ Joins the division (for division_name_display) and prefetches maintainers. """
+    return queryset.select_related('division').prefetch_related('maintainers')
+
+# Where each program's beneficiaries live; trainees reach their program through the trainer.
+BENEFICIARY_MODELS = [
+    (EducationProgramDetail, 'program'),
+    (MicroFundProgramDetail, 'program'),
+    (RescueProgramDetail, 'program'),
+    (VocationalTrainingProgramTraineeDetail, 'trainer__program'),
+]
+
+def _beneficiary_count():
+    """ An annotation counting a program's live beneficiaries, as correlated subqueries. """
+    total = None
+    for model, program_lookup in BENEFICIARY_MODELS:
+        counts = (
+            model.objects.filter(**{program_lookup: OuterRef('pk')}).order_by()
+            .values(program_lookup).annotate(count=Count('pk')).values('count')
+        )
+        count = Coalesce(Subquery(counts), 0)
+        total = count if total is None else total + count
+    return total
 
 # --- Division Views ---
 @swagger_auto_schema(
@@ -166,7 +218,7 @@ def _get_program_detail_meta_and_program(division_name_url, program_type_url):
 @parser_classes([JSONParser, MultiPartParser, FormParser])
 def division_list_create(request):
     if request.method == 'GET':
-        divisions = Division.objects.all()
+        divisions = _divisions_for_listing(Division.objects.order_by('name'))
         paginator = StandardResultsSetPagination()
         page = paginator.paginate_queryset(divisions, request)
         serializer = DivisionSerializer(page, many=True, context={'request': request})
@@ -246,6 +298,25 @@ def division_detail_view(request, pk):
         division.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+@swagger_auto_schema(
+    method='get',
+    operation_description="Divisions with their programs, budgets and live beneficiary counts, in two queries whatever the size.",
+    responses={200: DivisionTreeSerializer(many=True), 401: 'Unauthorized'}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional_get(
+    Division, Program, EducationProgramDetail, MicroFundProgramDetail, RescueProgramDetail,
+    VocationalTrainingProgramTrainerDetail, VocationalTrainingProgramTraineeDetail
+)
+def division_tree(request):
+    programs = Program.objects.annotate(beneficiary_count=_beneficiary_count()).order_by('name')
+    divisions = _with_total_budget(Division.objects.all()).prefetch_related(
+        Prefetch('program_set', queryset=programs, to_attr='tree_programs')
+    ).order_by('name')
+    serializer = DivisionTreeSerializer(divisions, many=True, context={'request': request})
+    return Response(serializer.data)
+
 # --- Program Definition Views ---
 @swagger_auto_schema(
     method='get',
@@ -271,7 +342,7 @@ def division_detail_view(request, pk):
 @parser_classes([JSONParser, MultiPartParser, FormParser])
 def program_list_create(request):
     if request.method == 'GET':
-        programs = Program.objects.all()
+        programs = _programs_for_listing(Program.objects.order_by('name'))
         paginator = StandardResultsSetPagination()
         page = paginator.paginate_queryset(programs, request)
         serializer = ProgramSerializer(page, many=True, context={'request': request})
@@ -337,10 +408,20 @@ def program_detail_view(request, pk):
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-def _base_program_detail_list_logic(request, division_name_url, program_type_url, filter_logic=False, search_logic=False):
+def _program_scope(meta, program):
+    if meta["model"] is VocationalTrainingProgramTraineeDetail:
+        # Trainees reach their program through the trainer.
+        return Q(trainer__program=program)
+    return Q(program=program)
+
+def _program_detail_queryset(request, division_name_url, program_type_url, filter_logic=False, search_logic=False):
+    """
+    Builds the detail queryset for a program type, with the filterset and the
+    `q` search applied when requested. Shared by the list, filter, search and
+    export views.
+    """
     meta, program = _get_program_detail_meta_and_program(division_name_url, program_type_url)
-    # This logic assumes the detail model has a direct ForeignKey to Program.
-    queryset = meta["model"].objects.filter(program=program)
+    queryset = meta["model"].objects.filter(_program_scope(meta, program))
 
     if filter_logic and meta["filterset_class"]:
         filterset = meta["filterset_class"](request.GET, queryset=queryset)
@@ -348,15 +429,18 @@ def _base_program_detail_list_logic(request, division_name_url, program_type_url
 
     if search_logic:
         search_term = request.query_params.get('q', None) 
-        if search_term and meta["search_fields"]:
-            search_query = Q()
-            for field in meta["search_fields"]:
-                search_query |= Q(**{f"{field}__icontains": search_term})
-            queryset = queryset.filter(search_query)
+        if search_term:
+            # Ranked full-text search, best matches first (see divisions/search.py)
+            queryset = search(queryset, search_term)
+    return meta, queryset
+
+def _base_program_detail_list_logic(request, division_name_url, program_type_url, filter_logic=False, search_logic=False):
+    meta, queryset = _program_detail_queryset(request, division_name_url, program_type_url, filter_logic, search_logic)
+    queryset, fields = sparse_fieldset(request, queryset, meta["serializer"])
             
     paginator = StandardResultsSetPagination()
     page = paginator.paginate_queryset(queryset, request)
-    serializer_instance = meta["serializer"](page, many=True, context={'request': request})
+    serializer_instance = meta["serializer"](page, many=True, context={'request': request}, fields=fields)
     return paginator.get_paginated_response(serializer_instance.data)
 
 # --- Generic Program Detail Instance Logic Handlers ---
@@ -364,13 +448,10 @@ def _base_program_detail_list_logic(request, division_name_url, program_type_url
 
 @parser_classes([JSONParser, MultiPartParser, FormParser])
 def _program_list_create_view(request, division_name_url, program_type_url):
-    # This function now correctly gets the detail_meta and the parent program instance
-    meta, program_instance = _get_program_detail_meta_and_program(division_name_url, program_type_url)
-
     if request.method == 'GET':
-        # _base_program_detail_list_logic internally calls _get_program_detail_meta_and_program
         return _base_program_detail_list_logic(request, division_name_url, program_type_url)
     elif request.method == 'POST':
+        meta, program_instance = _get_program_detail_meta_and_program(division_name_url, program_type_url)
         serializer_instance = meta["serializer"](data=request.data, context={'request': request})
         if serializer_instance.is_valid():
             serializer_instance.save(
@@ -443,6 +524,7 @@ def _program_detail_view(request, division_name_url, program_type_url, pk):
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([JSONParser, MultiPartParser, FormParser])
+@conditional_get(EducationProgramDetail, Program, Division, User)
 def education_program_list_create(request, division_name):
     return _program_list_create_view(request, division_name, "education")
 
@@ -509,6 +591,7 @@ def education_program_filter(request, division_name):
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([JSONParser, MultiPartParser, FormParser])
+@conditional_get(MicroFundProgramDetail, Program, Division, User)
 def microfund_program_list_create(request, division_name): 
     return _program_list_create_view(request, division_name, "microfund")    
 
@@ -575,6 +658,7 @@ def microfund_program_search(request, division_name):
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([JSONParser, MultiPartParser, FormParser])
+@conditional_get(RescueProgramDetail, Program, Division, User)
 def rescue_program_list_create(request, division_name): 
     return _program_list_create_view(request, division_name, "rescue")
 
@@ -627,34 +711,12 @@ def _base_trainee_list_logic(request, division_name_url, program_type_url, filte
     if program_type_url.lower() != "vocational":
         raise Http404("This logic is only for vocational program trainees.")
 
-    meta = PROGRAM_DETAIL_METADATA.get("vocational") 
-    if not meta: # Should not happen if "vocational" is in metadata
-         raise Http404("Vocational program trainee metadata not found.")
-
-    # Get the parent "vocational" Program instance
-    # _get_program_detail_meta_and_program will handle division and program existence checks
-    meta_check, vocational_program = _get_program_detail_meta_and_program(division_name_url, program_type_url)
-
-    # Filter trainees by trainers belonging to this vocational program
-    queryset = VocationalTrainingProgramTraineeDetail.objects.filter(trainer__program=vocational_program)
-
-    if filter_logic and meta["filterset_class"]:
-        # Use the TraineeDetailFilter, which can filter by trainer__program etc.
-        filterset = meta["filterset_class"](request.GET, queryset=queryset)
-        queryset = filterset.qs
-
-    if search_logic:
-        search_term = request.query_params.get('q', None)
-        if search_term and meta["search_fields"]:
-            search_query = Q()
-            for field in meta["search_fields"]:
-                # Search fields are on the TraineeDetail model
-                search_query |= Q(**{f"{field}__icontains": search_term})
-            queryset = queryset.filter(search_query)
+    meta, queryset = _program_detail_queryset(request, division_name_url, program_type_url, filter_logic, search_logic)
+    queryset, fields = sparse_fieldset(request, queryset, meta["serializer"])
 
     paginator = StandardResultsSetPagination()
     page = paginator.paginate_queryset(queryset, request)
-    serializer_instance = meta["serializer"](page, many=True, context={'request': request})
+    serializer_instance = meta["serializer"](page, many=True, context={'request': request}, fields=fields)
     return paginator.get_paginated_response(serializer_instance.data)
 
 # --- Vocational Program Trainer Views ---
@@ -681,6 +743,7 @@ def _base_trainee_list_logic(request, division_name_url, program_type_url, filte
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([JSONParser, MultiPartParser, FormParser])
+@conditional_get(VocationalTrainingProgramTrainerDetail, Program, Division, User)
 def vocational_trainer_list_create(request, division_name):
     # Uses "vocational-trainer" key from PROGRAM_DETAIL_METADATA
     # This view uses the generic _program_list_create_view because TrainerDetail links directly to Program
@@ -712,17 +775,15 @@ def vocational_trainer_detail(request, division_name, pk):
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([JSONParser, MultiPartParser, FormParser])
+@conditional_get(VocationalTrainingProgramTraineeDetail, VocationalTrainingProgramTrainerDetail, Program, Division, User)
 def vocational_trainee_list_create(request, division_name, trainer_pk):
-    try:
-        division = Division.objects.get(name=division_name.lower())
-    except Division.DoesNotExist:
+    if not _resolve_program(division_name.lower(), None):
         raise Http404(f"Division '{division_name}' not found.")
-    if division.name != "maisha":
+    if division_name.lower() != "maisha":
         raise Http404("Vocational trainees are only under Maisha division.")
 
-    try:
-        vocational_program = Program.objects.get(division=division, name="vocational")
-    except Program.DoesNotExist:
+    vocational_program = _resolve_program("maisha", "vocational")
+    if vocational_program is None:
         raise Http404("Vocational program definition not found in Maisha division.")
 
     trainer_instance = get_object_or_404(VocationalTrainingProgramTrainerDetail, pk=trainer_pk, program=vocational_program)
@@ -731,12 +792,14 @@ def vocational_trainee_list_create(request, division_name, trainer_pk):
         trainees = VocationalTrainingProgramTraineeDetail.objects.filter(
             trainer=trainer_instance
         ).order_by('-created_at')
+        trainees, fields = sparse_fieldset(request, trainees, VocationalTrainingProgramTraineeDetailSerializer)
         paginator = StandardResultsSetPagination()
         page = paginator.paginate_queryset(trainees, request)
         serializer = VocationalTrainingProgramTraineeDetailSerializer(
             page, 
             many=True, 
-            context={'request': request}
+            context={'request': request},
+            fields=fields
         )
         return paginator.get_paginated_response(serializer.data)
 
@@ -772,12 +835,10 @@ def vocational_trainee_list_create(request, division_name, trainer_pk):
 @permission_classes([IsAuthenticated])
 @parser_classes([JSONParser, MultiPartParser, FormParser])
 def vocational_trainee_detail(request, division_name, trainer_pk, pk):
-    try:
-        division = Division.objects.get(name=division_name.lower())
-        vocational_program = Program.objects.get(division=division, name="vocational")
-        trainer_instance = get_object_or_404(VocationalTrainingProgramTrainerDetail, pk=trainer_pk, program=vocational_program)
-    except (Division.DoesNotExist, Program.DoesNotExist):
+    vocational_program = _resolve_program(division_name.lower(), "vocational")
+    if vocational_program is None:
         raise Http404("Invalid division or vocational program for trainer.")
+    trainer_instance = get_object_or_404(VocationalTrainingProgramTrainerDetail, pk=trainer_pk, program=vocational_program)
 
     trainee_instance = get_object_or_404(VocationalTrainingProgramTraineeDetail, pk=pk, trainer=trainer_instance)
 
@@ -827,6 +888,392 @@ def vocational_program_filter(request, division_name):
 def vocational_program_search(request, division_name):
     return _base_trainee_list_logic(request, division_name, "vocational", search_logic=True)
 
+# --- EXPORT (CSV/XLSX/NDJSON) ---
+
+def _program_export_view(request, division_name_url, program_type_url):
+    file_format = request.query_params.get('file_format', 'csv').lower()
+    if file_format not in EXPORT_FORMATS:
+        return Response(
+            {"error": f"file_format must be one of: {', '.join(EXPORT_FORMATS)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    meta, queryset = _program_detail_queryset(request, division_name_url, program_type_url, filter_logic=True, search_logic=True)
+    filename = f"{program_type_url.lower()}-{division_name_url.lower()}-{timezone.localdate().isoformat()}"
+    return export_response(queryset, file_format, filename)
+
+
+_export_schema = dict(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('file_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EXPORT_FORMATS), default='csv', description="Export file format."),
+        openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Optional search term, as on the search endpoint."),
+    ],
+    responses={200: 'The export file', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Division or Program definition not found.'}
+)
+
+@swagger_auto_schema(operation_description="Export all Education Program Details, honouring the filter parameters and 'q'.", **_export_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def education_program_export(request, division_name):
+    return _program_export_view(request, division_name, "education")
+
+@swagger_auto_schema(operation_description="Export all MicroFund Program Details, honouring the filter parameters and 'q'.", **_export_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def microfund_program_export(request, division_name):
+    return _program_export_view(request, division_name, "microfund")
+
+@swagger_auto_schema(operation_description="Export all Rescue Program Details, honouring the filter parameters and 'q'.", **_export_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def rescue_program_export(request, division_name):
+    return _program_export_view(request, division_name, "rescue")
+
+@swagger_auto_schema(operation_description="Export all Vocational Program Trainees across trainers, honouring the filter parameters and 'q'.", **_export_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vocational_program_export(request, division_name):
+    return _program_export_view(request, division_name, "vocational")
+
+@swagger_auto_schema(operation_description="Export all Vocational Program Trainers, honouring the filter parameters and 'q'.", **_export_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vocational_trainer_export(request, division_name):
+    return _program_export_view(request, division_name, "vocational-trainer")
+
+# --- BULK UPDATE / BULK SOFT DELETE ---
+
+MAX_BULK_IDS = 1000
+
+def _bulk_selection(request, meta, queryset):
+    """
+    Narrows `queryset` to the rows a bulk request targets: either
+    {"ids": [...]} or {"filter": {...}} with the program type's filterset
+    parameters (plus optional "q"). Returns (queryset, error_response).
+    """
+    ids = request.data.get('ids')
+    filters = request.data.get('filter')
+    if ids is not None and filters is not None:
+        return None, Response({"error": "Provide either 'ids' or 'filter', not both."}, status=status.HTTP_400_BAD_REQUEST)
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            return None, Response({"error": "'ids' must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MAX_BULK_IDS:
+            return None, Response({"error": f"At most {MAX_BULK_IDS} ids per request; use 'filter' for larger sets."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [uuid.UUID(str(value)) for value in ids]
+        except ValueError:
+            return None, Response({"error": "'ids' must be UUIDs."}, status=status.HTTP_400_BAD_REQUEST)
+        return queryset.filter(pk__in=ids), None
+
+    if not isinstance(filters, dict) or not filters:
+        return None, Response({"error": "Provide a non-empty list of 'ids' or a non-empty 'filter'."}, status=status.HTTP_400_BAD_REQUEST)
+    filters = dict(filters)
+    search_term = filters.pop('q', None)
+    filterset = meta["filterset_class"](filters, queryset=queryset)
+    # A misspelt parameter would otherwise be ignored and select every row.
+    unknown = sorted(set(filters) - set(filterset.filters))
+    if unknown:
+        return None, Response({"error": f"Unknown filter parameters: {', '.join(unknown)}."}, status=status.HTTP_400_BAD_REQUEST)
+    if not filterset.is_valid():
+        return None, Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+    queryset = filterset.qs
+    if search_term:
+        # Only the matching ids are needed; ranking would just cost a sort.
+        queryset = queryset.filter(pk__in=search(queryset, search_term).values('pk'))
+    return queryset, None
+
+
+def _program_bulk_update_view(request, division_name_url, program_type_url):
+    meta, queryset = _program_detail_queryset(request, division_name_url, program_type_url)
+    queryset, error = _bulk_selection(request, meta, queryset)
+    if error:
+        return error
+
+    changes = request.data.get('changes')
+    if not isinstance(changes, dict) or not changes:
+        return Response({"error": "'changes' must be a non-empty object of field values."}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = meta["serializer"](data=changes, partial=True, context={'request': request})
+    writable = {name for name, field in serializer.fields.items() if not field.read_only and name != 'pictures'}
+    unique = {field.name for field in meta["model"]._meta.fields if field.unique}
+    not_allowed = sorted(set(changes) - (writable - unique))
+    if not_allowed:
+        return Response(
+            {"error": f"These fields cannot be bulk updated: {', '.join(not_allowed)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    updated = queryset.update_with_signals(
+        **serializer.validated_data, updated_by=request.user, updated_at=timezone.now()
+    )
+    return Response({"updated": updated})
+
+
+def _program_bulk_soft_delete_view(request, division_name_url, program_type_url):
+    meta, queryset = _program_detail_queryset(request, division_name_url, program_type_url)
+    queryset, error = _bulk_selection(request, meta, queryset)
+    if error:
+        return error
+    deleted = queryset.soft_delete(user=request.user)
+    return Response({"deleted": deleted})
+
+
+_bulk_selection_properties = {
+    'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID)),
+    'filter': openapi.Schema(type=openapi.TYPE_OBJECT, description="Filter parameters of the program type (as on its filter endpoint), plus optional 'q'."),
+}
+_bulk_update_schema = dict(
+    method='post',
+    request_body=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+        **_bulk_selection_properties,
+        'changes': openapi.Schema(type=openapi.TYPE_OBJECT, description="Field values to set on every selected record."),
+    }, required=['changes']),
+    responses={200: openapi.Response("Number of records updated", examples={"application/json": {"updated": 12}}), 400: 'Bad Request', 401: 'Unauthorized'}
+)
+_bulk_soft_delete_schema = dict(
+    method='post',
+    request_body=openapi.Schema(type=openapi.TYPE_OBJECT, properties=_bulk_selection_properties),
+    responses={200: openapi.Response("Number of records moved to the recycle bin", examples={"application/json": {"deleted": 12}}), 400: 'Bad Request', 401: 'Unauthorized'}
+)
+
+@swagger_auto_schema(operation_description="Update fields on many Education Program Details at once.", **_bulk_update_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def education_program_bulk_update(request, division_name):
+    return _program_bulk_update_view(request, division_name, "education")
+
+@swagger_auto_schema(operation_description="Move many Education Program Details to the recycle bin at once.", **_bulk_soft_delete_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def education_program_bulk_soft_delete(request, division_name):
+    return _program_bulk_soft_delete_view(request, division_name, "education")
+
+@swagger_auto_schema(operation_description="Update fields on many MicroFund Program Details at once.", **_bulk_update_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def microfund_program_bulk_update(request, division_name):
+    return _program_bulk_update_view(request, division_name, "microfund")
+
+@swagger_auto_schema(operation_description="Move many MicroFund Program Details to the recycle bin at once.", **_bulk_soft_delete_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def microfund_program_bulk_soft_delete(request, division_name):
+    return _program_bulk_soft_delete_view(request, division_name, "microfund")
+
+@swagger_auto_schema(operation_description="Update fields on many Rescue Program Details at once.", **_bulk_update_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def rescue_program_bulk_update(request, division_name):
+    return _program_bulk_update_view(request, division_name, "rescue")
+
+@swagger_auto_schema(operation_description="Move many Rescue Program Details to the recycle bin at once.", **_bulk_soft_delete_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def rescue_program_bulk_soft_delete(request, division_name):
+    return _program_bulk_soft_delete_view(request, division_name, "rescue")
+
+@swagger_auto_schema(operation_description="Update fields on many Vocational Program Trainees at once (e.g. reassign a trainer).", **_bulk_update_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def vocational_program_bulk_update(request, division_name):
+    return _program_bulk_update_view(request, division_name, "vocational")
+
+@swagger_auto_schema(operation_description="Move many Vocational Program Trainees to the recycle bin at once.", **_bulk_soft_delete_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def vocational_program_bulk_soft_delete(request, division_name):
+    return _program_bulk_soft_delete_view(request, division_name, "vocational")
+
+@swagger_auto_schema(operation_description="Update fields on many Vocational Program Trainers at once.", **_bulk_update_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def vocational_trainer_bulk_update(request, division_name):
+    return _program_bulk_update_view(request, division_name, "vocational-trainer")
+
+@swagger_auto_schema(operation_description="Move many Vocational Program Trainers to the recycle bin at once.", **_bulk_soft_delete_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def vocational_trainer_bulk_soft_delete(request, division_name):
+    return _program_bulk_soft_delete_view(request, division_name, "vocational-trainer")
+
+# --- DELTA SYNC ---
+
+def _program_changes_view(request, division_name_url, program_type_url):
+    meta, program = _get_program_detail_meta_and_program(division_name_url, program_type_url)
+    parent = "trainer" if meta["model"] is VocationalTrainingProgramTraineeDetail else "program"
+    queryset = meta["model"].all_objects.filter(_program_scope(meta, program)).select_related(parent, 'created_by', 'updated_by')
+    return sync_response(request, queryset, meta["serializer"], 'updated_at')
+
+
+_changes_schema = dict(
+    method='get',
+    manual_parameters=SYNC_QUERY_PARAMETERS,
+    responses={200: openapi.Response("Changed rows, deleted ids and the next sync token"), 400: 'Invalid token', 401: 'Unauthorized', 410: 'Token expired; sync again without one'}
+)
+
+@swagger_auto_schema(operation_description="Education Program Details created, updated or deleted since the sync token.", **_changes_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def education_program_changes(request, division_name):
+    return _program_changes_view(request, division_name, "education")
+
+@swagger_auto_schema(operation_description="MicroFund Program Details created, updated or deleted since the sync token.", **_changes_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def microfund_program_changes(request, division_name):
+    return _program_changes_view(request, division_name, "microfund")
+
+@swagger_auto_schema(operation_description="Rescue Program Details created, updated or deleted since the sync token.", **_changes_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def rescue_program_changes(request, division_name):
+    return _program_changes_view(request, division_name, "rescue")
+
+@swagger_auto_schema(operation_description="Vocational Program Trainees created, updated or deleted since the sync token.", **_changes_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vocational_program_changes(request, division_name):
+    return _program_changes_view(request, division_name, "vocational")
+
+@swagger_auto_schema(operation_description="Vocational Program Trainers created, updated or deleted since the sync token.", **_changes_schema)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vocational_trainer_changes(request, division_name):
+    return _program_changes_view(request, division_name, "vocational-trainer")
+
+# --- OFFLINE BATCH UPSERT ---
+
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Applies many creates and updates of program details (any type of the division) in one transaction. "
+        "Items without base_version are creates; items with base_version are partial updates applied only if the "
+        "record's updated_at still matches. Conflicts and invalid items are reported per item and do not stop the batch."
+    ),
+    request_body=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+        'items': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+            'type': openapi.Schema(type=openapi.TYPE_STRING, enum=list(PROGRAM_DETAIL_METADATA)),
+            'id': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID, description="Required for updates; optional client-chosen id for creates."),
+            'base_version': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, description="updated_at of the record the edit was made on."),
+            'trainer': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID, description="Trainer of a new trainee."),
+            'data': openapi.Schema(type=openapi.TYPE_OBJECT),
+        }, required=['type', 'data'])),
+    }, required=['items']),
+    responses={200: openapi.Response("Per-item results", examples={"application/json": {
+        "results": [{"index": 0, "status": "updated", "id": "uuid", "version": "2026-01-01T10:00:00Z"},
+                    {"index": 1, "status": "conflict", "id": "uuid", "reason": "modified", "current": {}}],
+        "created": 0, "updated": 1, "conflicts": 1, "invalid": 0,
+    }}), 400: 'Bad Request', 401: 'Unauthorized'}
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def program_batch_upsert(request, division_name):
+    items = request.data.get('items')
+    if not isinstance(items, list) or not items:
+        return Response({"error": "Provide a non-empty 'items' list."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BATCH_ITEMS:
+        return Response({"error": f"At most {MAX_BATCH_ITEMS} items per batch."}, status=status.HTTP_400_BAD_REQUEST)
+
+    def resolve_program(program_type):
+        try:
+            return _get_program_detail_meta_and_program(division_name, program_type)[1]
+        except Http404 as exc:
+            raise serializers.ValidationError({"type": [str(exc)]})
+
+    results = BatchUpsert(request.user, context={'request': request}).run(items, resolve_program)
+    counts = {status_name: sum(1 for result in results if result["status"] == status_name) for status_name in ("created", "updated", "conflict", "invalid")}
+    return Response({
+        "results": results,
+        "created": counts["created"],
+        "updated": counts["updated"],
+        "conflicts": counts["conflict"],
+        "invalid": counts["invalid"],
+    })
+
+# --- BULK IMPORT (CSV/XLSX) ---
+
+def _start_import(request, program_type, program, trainer=None):
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({"error": "Upload the CSV or XLSX file in the 'file' field."}, status=status.HTTP_400_BAD_REQUEST)
+    if not upload.name.lower().endswith(('.csv', '.xlsx')):
+        return Response({"error": "Only .csv and .xlsx files can be imported."}, status=status.HTTP_400_BAD_REQUEST)
+    if upload.size > MAX_IMPORT_FILE_SIZE:
+        return Response(
+            {"error": f"Files larger than {MAX_IMPORT_FILE_SIZE // (1024 * 1024)} MB cannot be imported; split the file."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    job = BeneficiaryImport.objects.create(
+        program_type=program_type, program=program, trainer=trainer,
+        file_name=upload.name, file_content=upload.read(), created_by=request.user
+    )
+    transaction.on_commit(lambda: process_beneficiary_import.delay(str(job.pk)))
+    return Response(BeneficiaryImportSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+def _program_import_view(request, division_name_url, program_type_url):
+    meta, program_instance = _get_program_detail_meta_and_program(division_name_url, program_type_url)
+    return _start_import(request, program_type_url.lower(), program_instance)
+
+
+_import_upload_schema = dict(
+    method='post',
+    manual_parameters=[openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description="CSV or XLSX; the first row holds the field names.")],
+    responses={202: BeneficiaryImportSerializer, 400: 'Bad Request', 401: 'Unauthorized', 404: 'Division or Program definition not found.'}
+)
+
+@swagger_auto_schema(operation_description="Bulk import Education Program Details from a CSV/XLSX file. Processed in the background; poll the returned import.", **_import_upload_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def education_program_import(request, division_name):
+    return _program_import_view(request, division_name, "education")
+
+@swagger_auto_schema(operation_description="Bulk import MicroFund Program Details from a CSV/XLSX file. Processed in the background; poll the returned import.", **_import_upload_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def microfund_program_import(request, division_name):
+    return _program_import_view(request, division_name, "microfund")
+
+@swagger_auto_schema(operation_description="Bulk import Rescue Program Details from a CSV/XLSX file. Processed in the background; poll the returned import.", **_import_upload_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def rescue_program_import(request, division_name):
+    return _program_import_view(request, division_name, "rescue")
+
+@swagger_auto_schema(operation_description="Bulk import Vocational Program Trainers from a CSV/XLSX file. Processed in the background; poll the returned import.", **_import_upload_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def vocational_trainer_import(request, division_name):
+    return _program_import_view(request, division_name, "vocational-trainer")
+
+@swagger_auto_schema(operation_description="Bulk import Vocational Program Trainees for a trainer from a CSV/XLSX file. Processed in the background; poll the returned import.", **_import_upload_schema)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def vocational_trainee_import(request, division_name, trainer_pk):
+    meta, vocational_program = _get_program_detail_meta_and_program(division_name, "vocational")
+    trainer_instance = get_object_or_404(VocationalTrainingProgramTrainerDetail, pk=trainer_pk, program=vocational_program)
+    return _start_import(request, "vocational", vocational_program, trainer=trainer_instance)
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Progress and per-row errors of a bulk import.",
+    responses={200: BeneficiaryImportSerializer, 401: 'Unauthorized', 404: 'Not Found'}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def beneficiary_import_detail(request, pk):
+    job = get_object_or_404(BeneficiaryImport.objects.select_related('created_by'), pk=pk)
+    return Response(BeneficiaryImportSerializer(job).data)
+
 # --- SOFT DELETE, RESTORE, RECYCLE BIN, PERMANENT DELETE FOR DIVISION ---
 
 @api_view(['DELETE'])
@@ -842,7 +1289,7 @@ def division_restore(request, pk):
     division = Division.all_objects.filter(pk=pk, is_deleted=True).first()
     if not division:
         return Response({'detail': 'Not found in recycle bin.'}, status=status.HTTP_404_NOT_FOUND)
-    division.restore()
+    division.restore(user=request.user)
     return Response({'detail': 'Division restored.'})
 
 @api_view(['DELETE'])
@@ -885,7 +1332,7 @@ def program_restore(request, pk):
     program = Program.all_objects.filter(pk=pk, is_deleted=True).first()
     if not program:
         return Response({'detail': 'Not found in recycle bin.'}, status=status.HTTP_404_NOT_FOUND)
-    program.restore()
+    program.restore(user=request.user)
     return Response({'detail': 'Program restored.'})
 
 @api_view(['DELETE'])
@@ -934,7 +1381,7 @@ def education_program_restore(request, division_name, pk):
     instance = meta["model"].all_objects.filter(pk=pk, program=program, is_deleted=True).first()
     if not instance:
         return Response({'detail': 'Not found in recycle bin or does not belong to this program.'}, status=status.HTTP_404_NOT_FOUND)
-    instance.restore()
+    instance.restore(user=request.user)
     return Response({'detail': 'Education program detail restored.'})
 
 @api_view(['DELETE'])
@@ -980,7 +1427,7 @@ def microfund_program_restore(request, division_name, pk):
     instance = meta["model"].all_objects.filter(pk=pk, program=program, is_deleted=True).first()
     if not instance:
         return Response({'detail': 'Not found in recycle bin or does not belong to this program.'}, status=status.HTTP_404_NOT_FOUND)
-    instance.restore()
+    instance.restore(user=request.user)
     return Response({'detail': 'MicroFund program detail restored.'})
 
 @api_view(['DELETE'])
@@ -1026,7 +1473,7 @@ def rescue_program_restore(request, division_name, pk):
     instance = meta["model"].all_objects.filter(pk=pk, program=program, is_deleted=True).first()
     if not instance:
         return Response({'detail': 'Not found in recycle bin or does not belong to this program.'}, status=status.HTTP_404_NOT_FOUND)
-    instance.restore()
+    instance.restore(user=request.user)
     return Response({'detail': 'Rescue program detail restored.'})
 
 @api_view(['DELETE'])
@@ -1072,7 +1519,7 @@ def vocational_trainer_restore(request, division_name, pk):
     instance = meta["model"].all_objects.filter(pk=pk, program=program, is_deleted=True).first()
     if not instance:
         return Response({'detail': 'Not found in recycle bin or does not belong to this program.'}, status=status.HTTP_404_NOT_FOUND)
-    instance.restore()
+    instance.restore(user=request.user)
     return Response({'detail': 'Vocational trainer restored.'})
 
 @api_view(['DELETE'])
@@ -1123,7 +1570,7 @@ def vocational_trainee_restore(request, division_name, trainer_pk, pk):
     instance = VocationalTrainingProgramTraineeDetail.all_objects.filter(pk=pk, trainer=trainer, is_deleted=True).first()
     if not instance:
         return Response({'detail': 'Not found in recycle bin or does not belong to this trainer.'}, status=status.HTTP_404_NOT_FOUND)
-    instance.restore()
+    instance.restore(user=request.user)
     return Response({'detail': 'Vocational trainee restored.'})
 
 @api_view(['DELETE'])
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_document_deleted_at_document_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='document',
+            options={'get_latest_by': 'date_uploaded'},
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['date_uploaded', 'id'], name='document_uploaded_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:29
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_date_updated(apps, schema_editor):
+    # Existing documents were last changed, as far as anyone knows, when uploaded.
+    Document = apps.get_model('documents', 'Document')
+    Document.objects.update(date_updated=F('date_uploaded'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_alter_document_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='date_updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_date_updated, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['date_updated', 'id'], name='document_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['deleted_at', 'id'], name='document_deleted_idx'),
+        ),
+    ]
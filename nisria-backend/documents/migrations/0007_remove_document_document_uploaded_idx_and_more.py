@@ -0,0 +1,41 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0006_document_date_updated_document_document_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['date_uploaded', 'id'], name='document_date_u_b4bf91_live'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['document_type', 'date_uploaded', 'id'], name='document_docume_079e43_live'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['date_updated', 'id'], name='document_date_u_3c9a6d_live'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at', 'id'], name='document_delete_16cb6e_arch'),
+        ),
+        migrations.RemoveIndex(
+            model_name='document',
+            name='document_uploaded_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='document',
+            name='document_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='document',
+            name='document_deleted_idx',
+        ),
+    ]
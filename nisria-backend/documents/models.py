@@ -8,6 +8,11 @@ from core.models import SoftDeleteModel
 User = get_user_model()
 
 class Document(SoftDeleteModel):
+    # Hard deletes and reclassifications are remembered for delta sync
+    # (core.sync), keyed by type: bank statements only sync to super admins.
+    sync_tombstones = True
+    sync_scope = 'document_type'
+
     DOCUMENT_TYPE_CHOICES = [
         ('bank_statement', 'Bank Statement'),
         ('cbo_cert', 'CBO Certificate'),
@@ -44,6 +49,13 @@ class Document(SoftDeleteModel):
     document_link = models.URLField()
     division = models.CharField(max_length=20, choices=DIVISION_CHOICES)
     date_uploaded = models.DateTimeField(auto_now_add=True)
+    date_updated = models.DateTimeField(auto_now=True)
+
+    # Keyset pagination (core.pagination), the bank statement list and delta sync (core.sync).
+    live_indexes = (('date_uploaded', 'id'), ('document_type', 'date_uploaded', 'id'), ('date_updated', 'id'))
+
+    class Meta:
+        get_latest_by = 'date_uploaded'
 
     def __str__(self):
         return f"{self.name} ({self.get_document_type_display()})"
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from .models import Document
 from .models import BankStatementAccessRequest
+from core.fieldsets import SparseFieldsetMixin
 
-class DocumentSerializer(serializers.ModelSerializer):
+class DocumentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     document_type_display = serializers.CharField(source='get_document_type_display', read_only=True)
     document_format_display = serializers.CharField(source='get_document_format_display', read_only=True)
     division_display = serializers.CharField(source='get_division_display', read_only=True)
@@ -20,9 +21,10 @@ class DocumentSerializer(serializers.ModelSerializer):
             'document_link',
             'division',
             'division_display',
-            'date_uploaded'
+            'date_uploaded',
+            'date_updated'
         ]
-        read_only_fields = ['date_uploaded']
+        read_only_fields = ['date_uploaded', 'date_updated']
 
 class AccessRequestSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,9 +1,9 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 from django_filters.rest_framework import DjangoFilterBackend
@@ -12,6 +12,10 @@ from accounts.permissions import IsSuperAdmin
 from .models import Document, BankStatementAccessRequest
 from .serializers import DocumentSerializer, BankStatementPreviewSerializer, AccessRequestSerializer, ValidatedBankStatementAccessResponseSerializer
 from core.models import RecycleBinItem # Import RecycleBinItem for permanent delete
+from core.conditional import conditional_get
+from core import pagination
+from core.fieldsets import sparse_fieldset
+from core.sync import SYNC_QUERY_PARAMETERS, sync_response
 from drf_yasg import openapi # Import openapi for manual parameters
 from notifications.tasks import create_bank_statement_access_granted_notification_task
 from drf_yasg.utils import swagger_auto_schema # Import swagger_auto_schema
@@ -19,10 +23,8 @@ from .filters import DocumentFilter
 from django.contrib.contenttypes.models import ContentType # Add this import
 from django.utils import timezone
 
-# Reusable pagination class
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
+# Reusable pagination class (page numbers, or keyset with ?cursor=)
+class StandardResultsSetPagination(pagination.StandardResultsSetPagination):
     max_page_size = 50
 
 
@@ -47,15 +49,17 @@ class StandardResultsSetPagination(PageNumberPagination):
 )
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@conditional_get(Document)
 def document_list_create(request):
     if request.method == 'GET':
         if request.user.role == 'super_admin':
             documents = Document.objects.all().order_by('-date_uploaded')
         else:
             documents = Document.objects.exclude(document_type='bank_statement').order_by('-date_uploaded')
+        documents, fields = sparse_fieldset(request, documents, DocumentSerializer)
         paginator = StandardResultsSetPagination()
         result_page = paginator.paginate_queryset(documents, request)
-        serializer = DocumentSerializer(result_page, many=True)
+        serializer = DocumentSerializer(result_page, many=True, fields=fields)
         return paginator.get_paginated_response(serializer.data)
 
     elif request.method == 'POST':
@@ -160,12 +164,31 @@ class DocumentFilterView(ListAPIView):
 def document_search(request):
     query = request.query_params.get('name', '')
     documents = Document.objects.exclude(document_type='bank_statement').filter(name__icontains=query).order_by('-date_uploaded')
+    documents, fields = sparse_fieldset(request, documents, DocumentSerializer)
     paginator = StandardResultsSetPagination()
     result_page = paginator.paginate_queryset(documents, request)
-    serializer = DocumentSerializer(result_page, many=True)
+    serializer = DocumentSerializer(result_page, many=True, fields=fields)
     return paginator.get_paginated_response(serializer.data)
 
 
+# /api/documents/changes/ [GET]
+@swagger_auto_schema(
+    method='get',
+    operation_description="Documents created, updated or deleted since the sync token; omit the token for a full sync. Bank statements are only synced for super admins.",
+    manual_parameters=SYNC_QUERY_PARAMETERS,
+    responses={200: openapi.Response("Changed documents, deleted ids and the next sync token"), 400: 'Invalid token', 410: 'Token expired; sync again without one'}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def document_changes(request):
+    documents = Document.all_objects.all()
+    tombstone_scope = None
+    if request.user.role != 'super_admin':
+        documents = documents.exclude(document_type='bank_statement')
+        tombstone_scope = ~Q(scope='bank_statement')
+    return sync_response(request, documents, DocumentSerializer, 'date_updated', tombstone_scope=tombstone_scope)
+
+
 # /api/documents/<id>/request-access/ [POST]
 @swagger_auto_schema(
     method='post',
@@ -319,7 +342,7 @@ def document_restore(request, id):
         return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
 
     # Use the SoftDeleteModel's restore method
-    document.restore() # This will set is_deleted=False and update RecycleBinItem's restored_at
+    document.restore(user=request.user) # This will set is_deleted=False and update RecycleBinItem's restored_at/restored_by
     return Response({'detail': 'Restored.'})
 
 @api_view(['DELETE'])
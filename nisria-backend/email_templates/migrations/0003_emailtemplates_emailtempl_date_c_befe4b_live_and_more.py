@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('email_templates', '0002_emailtemplates_deleted_at_emailtemplates_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailtemplates',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['date_created', 'id'], name='emailtempl_date_c_befe4b_live'),
+        ),
+        migrations.AddIndex(
+            model_name='emailtemplates',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['template_type', 'date_created', 'id'], name='emailtempl_templa_8c2bc0_live'),
+        ),
+        migrations.AddIndex(
+            model_name='emailtemplates',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at', 'id'], name='emailtempl_delete_8b2eef_arch'),
+        ),
+    ]
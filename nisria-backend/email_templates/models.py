@@ -40,5 +40,7 @@ class EmailTemplates(SoftDeleteModel):
     date_created = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
 
+    live_indexes = (('date_created', 'id'), ('template_type', 'date_created', 'id'))
+
     def __str__(self):
         return self.name
\ No newline at end of file
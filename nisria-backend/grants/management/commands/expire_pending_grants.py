@@ -24,7 +24,7 @@ class Command(BaseCommand):
         updated_count = 0
         for grant in grants_to_expire:
             grant.status = 'expired'
-            grant.save(update_fields=['status']) # Efficiently update only the status field
+            grant.save(update_fields=['status', 'date_updated']) # Efficiently update only the status field
             updated_count += 1
             self.stdout.write(self.style.SUCCESS(f'Grant ID {grant.id} ("{grant.organization_name}") status updated to expired.'))
 
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grants', '0004_grant_associated_program'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='grant',
+            options={'get_latest_by': 'date_created'},
+        ),
+        migrations.AddIndex(
+            model_name='grant',
+            index=models.Index(fields=['date_created', 'id'], name='grant_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grants', '0005_alter_grant_options_grant_grant_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grant',
+            index=models.Index(fields=['date_updated', 'id'], name='grant_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='grant',
+            index=models.Index(fields=['deleted_at', 'id'], name='grant_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.25 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grants', '0006_grant_grant_updated_idx_grant_grant_deleted_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grant',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['date_created', 'id'], name='grant_date_c_ffcc7c_live'),
+        ),
+        migrations.AddIndex(
+            model_name='grant',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['date_updated', 'id'], name='grant_date_u_b1b5c0_live'),
+        ),
+        migrations.AddIndex(
+            model_name='grant',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at', 'id'], name='grant_delete_4d9a41_arch'),
+        ),
+        migrations.AddIndex(
+            model_name='grantexpenditure',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at', 'id'], name='grantexpen_delete_54a950_arch'),
+        ),
+        migrations.RemoveIndex(
+            model_name='grant',
+            name='grant_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='grant',
+            name='grant_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='grant',
+            name='grant_deleted_idx',
+        ),
+    ]
@@ -10,6 +10,9 @@ User = get_user_model()
 
 
 class Grant(SoftDeleteModel):
+    # Hard deletes are remembered for delta sync (core.sync).
+    sync_tombstones = True
+
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('applied', 'Applied'),
@@ -65,6 +68,12 @@ class Grant(SoftDeleteModel):
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
 
+    # Keyset pagination (core.pagination) and delta sync (core.sync).
+    live_indexes = (('date_created', 'id'), ('date_updated', 'id'))
+
+    class Meta:
+        get_latest_by = 'date_created'
+
     def save(self, *args, **kwargs):
         # Import Task model here to avoid circular imports at module level
         from task_manager.models import Task
@@ -3,6 +3,7 @@ from .models import Grant, GrantExpenditure
 from drf_yasg import openapi # Import openapi for schema hints
 from documents.models import Document  
 from divisions.models import Program 
+from core.fieldsets import SparseFieldsetMixin
 
 class BasicGrantSerializer(serializers.ModelSerializer):
     class Meta:
@@ -43,7 +44,7 @@ class GrantExpenditureSerializer(serializers.ModelSerializer):
         return round(obj.usage_percent(), 2)
 
 
-class GrantSerializer(serializers.ModelSerializer):
+class GrantSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # Changed to PrimaryKeyRelatedField to accept a list of document IDs on write.
     # The response will also contain a list of document IDs for these fields.
     required_documents = serializers.PrimaryKeyRelatedField(
@@ -10,6 +10,7 @@ urlpatterns = [
     # The following filter and search might be better integrated into grant-list-create as query params
     path('filter/', views.grant_filter, name='grant-filter-view'), # Renamed to avoid clash if integrated later
     path('search/', views.grant_search, name='grant-search-view'), # Renamed
+    path('changes/', views.grant_changes, name='grant-changes'),
     
     path('by-month/<int:year>/<int:month>/', views.grants_by_month, name='grants-by-month'),
     path('<int:id>/documents/', views.grant_documents, name='grant-documents'),
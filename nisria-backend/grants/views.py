@@ -15,8 +15,14 @@ import datetime
 
 from .models import Grant, GrantExpenditure
 from documents.models import Document 
+from divisions.models import Program
+from accounts.models import User
 from core.models import RecycleBinItem # For permanent delete
 from accounts.permissions import IsSuperAdmin 
+from core.conditional import conditional_get
+from core.pagination import StandardResultsSetPagination
+from core.fieldsets import sparse_fieldset
+from core.sync import SYNC_QUERY_PARAMETERS, sync_response
 
 from .serializers import GrantSerializer, DocumentSerializer, GrantExpenditureSerializer
 from .filters import GrantFilter, GrantExpenditureFilter
@@ -39,16 +45,16 @@ from .filters import GrantFilter, GrantExpenditureFilter
 )
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated]) 
+@conditional_get(Grant, GrantExpenditure, Program, User, Document)
 def grant_list_create(request):
     if request.method == 'GET':
         # Use GrantFilter for filtering grants
         grant_filter = GrantFilter(request.GET, queryset=Grant.objects.select_related('program', 'submitted_by').all())
-        queryset = grant_filter.qs
+        queryset, fields = sparse_fieldset(request, grant_filter.qs, GrantSerializer)
 
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
+        paginator = StandardResultsSetPagination()
         result_page = paginator.paginate_queryset(queryset, request)
-        serializer = GrantSerializer(result_page, many=True, context={'request': request})
+        serializer = GrantSerializer(result_page, many=True, context={'request': request}, fields=fields)
         return paginator.get_paginated_response(serializer.data)
     elif request.method == 'POST':
         serializer = GrantSerializer(data=request.data, context={'request': request})
@@ -86,10 +92,10 @@ def grant_detail(request, id):
 @permission_classes([IsAuthenticated]) 
 def grant_filter(request): # This view might be redundant if grant_list_create handles filtering
     f = GrantFilter(request.GET, queryset=Grant.objects.all())
-    paginator = PageNumberPagination()
-    paginator.page_size = 10
-    result_page = paginator.paginate_queryset(f.qs, request)
-    serializer = GrantSerializer(result_page, many=True, context={'request': request})
+    queryset, fields = sparse_fieldset(request, f.qs, GrantSerializer)
+    paginator = StandardResultsSetPagination()
+    result_page = paginator.paginate_queryset(queryset, request)
+    serializer = GrantSerializer(result_page, many=True, context={'request': request}, fields=fields)
     return paginator.get_paginated_response(serializer.data)
 
 
@@ -102,10 +108,10 @@ def grant_search(request): # This view might be redundant
         Q(location__icontains=query) |
         Q(notes__icontains=query)
     )
-    paginator = PageNumberPagination()
-    paginator.page_size = 10
+    grants, fields = sparse_fieldset(request, grants, GrantSerializer)
+    paginator = StandardResultsSetPagination()
     result_page = paginator.paginate_queryset(grants, request)
-    serializer = GrantSerializer(result_page, many=True, context={'request': request})
+    serializer = GrantSerializer(result_page, many=True, context={'request': request}, fields=fields)
     return paginator.get_paginated_response(serializer.data)
 
 
@@ -114,8 +120,7 @@ def grant_search(request): # This view might be redundant
 def grant_documents(request, id):
     grant = get_object_or_404(Grant, id=id)
     docs = grant.submitted_documents.all() # Consider prefetching or selecting related if Document has FKs
-    paginator = PageNumberPagination()
-    paginator.page_size = 10
+    paginator = StandardResultsSetPagination()
     result_page = paginator.paginate_queryset(docs, request)
     serializer = DocumentSerializer(result_page, many=True)
     return paginator.get_paginated_response(serializer.data)
@@ -147,6 +152,20 @@ def update_status(request, id):
     serializer = GrantSerializer(grant, context={'request': request}) 
     return Response(serializer.data)
 
+@swagger_auto_schema(
+    method='get',
+    operation_description="Grants created, updated or deleted since the sync token; omit the token for a full sync.",
+    manual_parameters=SYNC_QUERY_PARAMETERS,
+    responses={200: openapi.Response("Changed grants, deleted ids and the next sync token"), 400: 'Invalid token', 410: 'Token expired; sync again without one'}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def grant_changes(request):
+    queryset = Grant.all_objects.select_related('program__division', 'submitted_by', 'expenditure').prefetch_related(
+        'required_documents', 'submitted_documents'
+    )
+    return sync_response(request, queryset, GrantSerializer, 'date_updated')
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated]) 
 def grants_by_month(request, year, month):
@@ -264,11 +283,7 @@ def grant_restore(request, id):
         return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
     
     # Use the SoftDeleteModel's restore method
-    grant.restore() # This will set is_deleted=False and update RecycleBinItem's restored_at
-
-    # If you need to set restored_by on the RecycleBinItem, the model's restore()
-    # method or the RecycleBinItem logic would need to  be enhanced to accept a user.
-    # For now, the grant object is restored, and RecycleBinItem.restored_at is set.
+    grant.restore(user=request.user) # This will set is_deleted=False and update RecycleBinItem's restored_at/restored_by
     return Response({'detail': 'Restored.'})
 
 @api_view(['DELETE'])
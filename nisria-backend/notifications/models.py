@@ -18,10 +18,20 @@ class Notification(models.Model):
     notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES, default='general')
     read_status = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     link = models.URLField(blank=True, null=True, help_text="Optional link to the relevant item (e.g., task, grant)")
 
+    # Hard deletes are remembered for delta sync (core.sync), keyed by recipient.
+    sync_tombstones = True
+    sync_scope = 'recipient'
+
     def __str__(self):
         return f"Notification for {self.recipient.email} - Type: {self.get_notification_type_display()}"
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'created_at', 'id'], name='notification_recipient_idx'),
+            # Delta sync (core.sync)
+            models.Index(fields=['recipient', 'updated_at', 'id'], name='notification_updated_idx'),
+        ]
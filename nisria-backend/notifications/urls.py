@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.UserNotificationListView.as_view(), name='user-notification-list'),
+    path('changes/', views.notification_changes, name='notification-changes'),
     path('unread-count/', views.unread_notifications_count, name='user-unread-notifications-count'),
     path('<uuid:notification_id>/mark-as-read/', views.mark_notification_as_read, name='mark-notification-as-read'),
     path('mark-all-as-read/', views.mark_all_notifications_as_read, name='mark-all-notifications-as-read'),
@@ -2,15 +2,19 @@ from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from drf_yasg.utils import swagger_auto_schema
 from django.shortcuts import get_object_or_404
+from django.db.models import Q
+from django.utils import timezone
 from drf_yasg import openapi
 
+from core.pagination import StandardResultsSetPagination
+from core.sync import SYNC_QUERY_PARAMETERS, sync_response
+
 from .models import Notification
 from .serializers import NotificationSerializer
 
-class NotificationPagination(PageNumberPagination):
+class NotificationPagination(StandardResultsSetPagination):
     page_size = 15
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -35,7 +39,19 @@ class UserNotificationListView(generics.ListAPIView):
             is_read = read_status_query.lower() == 'true'
             queryset = queryset.filter(read_status=is_read)
         return queryset.order_by('-created_at')
-    
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="The authenticated user's notifications created, updated (e.g. read) or deleted since the sync token; omit the token for a full sync.",
+    manual_parameters=SYNC_QUERY_PARAMETERS,
+    responses={200: openapi.Response("Changed notifications, deleted ids and the next sync token"), 400: 'Invalid token', 410: 'Token expired; sync again without one'}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def notification_changes(request):
+    notifications = Notification.objects.filter(recipient=request.user).select_related('recipient', 'assigner')
+    return sync_response(request, notifications, NotificationSerializer, 'updated_at', tombstone_scope=Q(scope=str(request.user.pk)))
+
 @swagger_auto_schema(
     method='post',
     operation_description="Mark a specific notification as read.",
@@ -48,7 +64,7 @@ def mark_notification_as_read(request, notification_id):
         notification = Notification.objects.get(id=notification_id, recipient=request.user)
         if not notification.read_status:
             notification.read_status = True
-            notification.save(update_fields=['read_status'])
+            notification.save(update_fields=['read_status', 'updated_at'])
         return Response(NotificationSerializer(notification).data)
     except Notification.DoesNotExist:
         return Response({"error": "Notification not found or access denied."}, status=status.HTTP_404_NOT_FOUND)
@@ -66,7 +82,7 @@ def mark_notification_as_read(request, notification_id):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_all_notifications_as_read(request):
-    updated_count = Notification.objects.filter(recipient=request.user, read_status=False).update(read_status=True)
+    updated_count = Notification.objects.filter(recipient=request.user, read_status=False).update(read_status=True, updated_at=timezone.now())
     return Response({"message": f"{updated_count} notifications marked as read."}, status=status.HTTP_200_OK)
 
 @swagger_auto_schema(
@@ -48,8 +48,15 @@ class Task(models.Model):
     )
     is_grant_follow_up_task = models.BooleanField(default=False, help_text="True if this task was auto-created for a pending grant.")
 
+    # Hard deletes and reassignments are remembered for delta sync
+    # (core.sync), keyed by assignee.
+    sync_tombstones = True
+    sync_scope = 'assigned_to'
+
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ['-created_at']
+        # Delta sync (core.sync)
+        indexes = [models.Index(fields=['updated_at', 'id'], name='task_updated_idx')]
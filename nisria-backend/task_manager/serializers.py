@@ -3,13 +3,14 @@ from .models import Task
 from accounts.models import User 
 from grants.models import Grant 
 from grants.serializers import BasicGrantSerializer 
+from core.fieldsets import SparseFieldsetMixin
 
 class BasicUserSerializer(serializers.ModelSerializer): 
     class Meta:
         model = User
         fields = ['id', 'email', 'full_name']
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     assigned_to = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.filter(is_active=True), 
         allow_null=True, 
@@ -6,12 +6,14 @@ from .views import (
     update_task,
     delete_task,
     mark_task_as_complete,
-    change_task_status
+    change_task_status,
+    task_changes
 )
 
 urlpatterns = [
     path('', list_tasks, name='task-list'),
     path('create/', create_task, name='task-create'),
+    path('changes/', task_changes, name='task-changes'),
     path('<uuid:pk>/', retrieve_task, name='task-detail'),
     path('<uuid:pk>/update/', update_task, name='task-update'),
     path('<uuid:pk>/delete/', delete_task, name='task-delete'),
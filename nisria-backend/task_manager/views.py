@@ -11,6 +11,10 @@ from .models import Task
 from .serializers import TaskSerializer
 from .permissions import CanManageAllTasks, IsAssigneeOrManagerForTaskObject
 from accounts.models import User # For role comparison
+from grants.models import Grant
+from core.conditional import conditional_get
+from core.fieldsets import sparse_fieldset
+from core.sync import SYNC_QUERY_PARAMETERS, sync_response
 
 @swagger_auto_schema(
     method='get',
@@ -27,6 +31,7 @@ from accounts.models import User # For role comparison
 )
 @api_view(['GET'])
 @permission_classes([drf_permissions.IsAuthenticated])
+@conditional_get(Task, User, Grant)
 def list_tasks(request):
     user = request.user
     base_queryset = Task.objects.select_related('assigned_to', 'assigned_by') 
@@ -74,9 +79,27 @@ def list_tasks(request):
 
     # Add more filters as needed (e.g., due_date_before, due_date_after)
     
-    serializer = TaskSerializer(tasks_queryset, many=True)
+    tasks_queryset, fields = sparse_fieldset(request, tasks_queryset, TaskSerializer)
+    serializer = TaskSerializer(tasks_queryset, many=True, fields=fields)
     return Response(serializer.data)
 
+@swagger_auto_schema(
+    method='get',
+    operation_description="Tasks created, updated or deleted since the sync token; omit the token for a full sync. Managers sync all tasks, others their assigned tasks.",
+    manual_parameters=SYNC_QUERY_PARAMETERS,
+    responses={200: openapi.Response("Changed tasks, deleted ids and the next sync token"), 400: 'Invalid token', 410: 'Token expired; sync again without one'}
+)
+@api_view(['GET'])
+@permission_classes([drf_permissions.IsAuthenticated])
+def task_changes(request):
+    user = request.user
+    tasks_queryset = Task.objects.select_related('assigned_to', 'assigned_by', 'grant')
+    tombstone_scope = None
+    if user.role not in ['super_admin', 'management_lead']:
+        tasks_queryset = tasks_queryset.filter(assigned_to=user)
+        tombstone_scope = Q(scope=str(user.pk))
+    return sync_response(request, tasks_queryset, TaskSerializer, 'updated_at', tombstone_scope=tombstone_scope)
+
 @swagger_auto_schema(
     method='post',
     request_body=TaskSerializer,